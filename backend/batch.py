@@ -0,0 +1,260 @@
+"""Headless batch runner: Pass 1 -> Splitter 1 -> Pass 2 -> Pass 3 over a corpus of PDFs.
+
+Usage:
+    python batch.py INPUT --out results/ [--workers 4] [--toc-pages auto|3-5] [--skip-failed]
+
+INPUT is a directory (searched recursively for *.pdf) or a manifest file: one
+PDF path per line, optionally followed by a tab and its TOC range ("a.pdf\t2-4"),
+or a JSON list of {"path": ..., "index_pages": [start, end]}. Relative paths are
+resolved against the manifest's directory.
+
+Documents are spread across a process pool (each worker still runs Pass 2/3
+articles concurrently, see LLM_MAX_CONCURRENCY); PDF page extraction in each
+worker gets cpu_count // workers processes, so the default extracts in-process. Each document's final JSON is
+written to <out>/<name>-<hash>.json, and one line per finished document is
+appended to <out>/manifest.jsonl:
+
+    {"path", "status": "done" | "failed" | "skipped", "output", "index_pages",
+     "articles", "timings": {"pass_1", "splitter_1", "pass_2", "pass_3", "total"},
+     "error", "size", "mtime_ns", "finished_at"}
+
+Re-running the same command resumes: documents already done (same path, size
+and mtime) or skipped are not processed again; failed ones are retried unless
+--skip-failed is given. Documents with no TOC range given and none detected
+are skipped; giving them a range (or a different range for any document) in
+the manifest or with --toc-pages processes them on the next run.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+# ----------------------------
+# Inputs
+# ----------------------------
+
+def _parse_pages(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'3-5' -> (3, 5), '4' -> (4, 4); None / '' / 'auto' -> None (detect)."""
+    if value is None or str(value).strip().lower() in ("", "auto"):
+        return None
+    start, _, end = str(value).partition("-")
+    return int(start), int(end or start)
+
+
+def discover_inputs(source: str, default_pages: Optional[Tuple[int, int]] = None) -> List[dict]:
+    """[{'path', 'index_pages'}] from a directory of PDFs or a manifest file, in a stable order."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(".pdf"))
+        return [{"path": os.path.abspath(p), "index_pages": default_pages} for p in sorted(paths)]
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        raw = f.read()
+    entries: List[dict] = []
+    if raw.lstrip().startswith("["):
+        for item in json.loads(raw):
+            pages = item.get("index_pages")
+            entries.append({"path": item["path"], "index_pages": tuple(pages) if pages else default_pages})
+    else:
+        for line in raw.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path, _, pages = line.partition("\t")
+            entries.append({"path": path.strip(), "index_pages": _parse_pages(pages) or default_pages})
+    for entry in entries:
+        entry["path"] = os.path.abspath(os.path.join(base, entry["path"]))
+    return entries
+
+
+def output_name(path: str) -> str:
+    """Result file name: the PDF's stem plus a short hash of its path, so equal stems never collide."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}.json"
+
+
+# ----------------------------
+# Manifest
+# ----------------------------
+
+def load_manifest(out_dir: str) -> Dict[str, dict]:
+    """Latest record per path; a torn last line from a crash is ignored."""
+    records: Dict[str, dict] = {}
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["path"]] = record
+    return records
+
+
+def _append_manifest(handle, record: dict) -> None:
+    handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    handle.flush()
+    os.fsync(handle.fileno())
+
+
+def _needs_run(entry: dict, previous: Optional[dict], retry_failed: bool) -> bool:
+    if previous is None:
+        return True
+    try:
+        st = os.stat(entry["path"])
+    except OSError:
+        return True  # reported as failed by the worker
+    if previous.get("size") != st.st_size or previous.get("mtime_ns") != st.st_mtime_ns:
+        return True  # the file changed since it was processed
+    requested = list(entry["index_pages"]) if entry.get("index_pages") else None
+    if requested is not None and requested != previous.get("index_pages"):
+        return True  # a TOC range was given for a skipped document, or a different one than last time
+    if previous["status"] == "failed":
+        return retry_failed
+    return False
+
+
+# ----------------------------
+# Worker
+# ----------------------------
+
+def process_document(path: str, index_pages: Optional[Tuple[int, int]], out_dir: str) -> dict:
+    """Run the whole pipeline on one PDF (inside a pool worker) and write its result; returns the manifest record."""
+    record = {"path": path, "status": "failed", "output": None, "index_pages": None,
+              "articles": 0, "timings": {}, "error": None}
+    started = time.perf_counter()
+    doc = None
+    try:
+        # Imported here so --help and manifest handling work without OPENAI_API_KEY
+        from pdf_document import forget_document, get_document
+        from spans import to_json
+        from toc_detect import detect_toc
+        from utils import run_llm_pass_1, run_llm_pass_2, run_llm_pass_3, run_splitter_1
+
+        st = os.stat(path)
+        record["size"], record["mtime_ns"] = st.st_size, st.st_mtime_ns
+        doc = get_document(path)
+        debug_dir = os.path.join(out_dir, "debug_outputs")
+
+        if index_pages is None:
+            detection = detect_toc(doc)
+            if detection is None:
+                record["status"] = "skipped"
+                record["error"] = "no table of contents detected; give its pages in the manifest or --toc-pages"
+                return record
+            index_pages = (detection["toc_start"], detection["toc_end"])
+        record["index_pages"] = list(index_pages)
+
+        timings = record["timings"]
+        t = time.perf_counter()
+        data, excerpt, _ = run_llm_pass_1(doc, index_pages, out_dir=debug_dir)
+        timings["pass_1"] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        data, _ = run_splitter_1(doc, index_pages, data, source_excerpt=excerpt, out_dir=debug_dir, spans=True)
+        timings["splitter_1"] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        data, _ = run_llm_pass_2(data, out_dir=debug_dir)
+        timings["pass_2"] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        data, _ = run_llm_pass_3(data, out_dir=debug_dir, pdf_source=doc, index_pages=index_pages)
+        timings["pass_3"] = round(time.perf_counter() - t, 3)
+
+        output = os.path.join(out_dir, output_name(path))
+        tmp = output + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(to_json(data), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, output)
+
+        record.update(status="done", output=os.path.basename(output), articles=len(data.get("articles", [])))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    finally:
+        record["timings"]["total"] = round(time.perf_counter() - started, 3)
+        if doc is not None:
+            forget_document(doc.sha256)
+    return record
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+
+def _init_worker(extract_workers: int) -> None:
+    """Cap each document worker's PDF page extraction at its share of the cores (1: in-process)."""
+    import pdf_document
+
+    pdf_document.PDF_EXTRACT_WORKERS = min(pdf_document.PDF_EXTRACT_WORKERS, extract_workers)
+
+
+def run_batch(entries: List[dict], out_dir: str, workers: int, retry_failed: bool = True) -> Dict[str, int]:
+    """Process every entry not already finished; returns counts per status for this run."""
+    os.makedirs(out_dir, exist_ok=True)
+    previous = load_manifest(out_dir)
+    pending = [e for e in entries if _needs_run(e, previous.get(e["path"]), retry_failed)]
+    counts = {"done": 0, "failed": 0, "skipped": 0, "already_finished": len(entries) - len(pending)}
+    print(f"[BATCH] {len(entries)} documents, {len(pending)} to process, {counts['already_finished']} already finished")
+    if not pending:
+        return counts
+
+    # Documents already run in parallel; page extraction only gets the cores they leave
+    workers = max(1, workers)
+    extract_workers = max(1, (os.cpu_count() or 1) // workers)
+    with open(os.path.join(out_dir, MANIFEST_NAME), "a", encoding="utf-8") as manifest, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(extract_workers,)) as pool:
+        futures = {pool.submit(process_document, e["path"], e["index_pages"], out_dir): e for e in pending}
+        try:
+            for n, future in enumerate(as_completed(futures), start=1):
+                entry = futures[future]
+                try:
+                    record = future.result()
+                except BrokenProcessPool as e:
+                    record = {"path": entry["path"], "status": "failed", "error": f"worker process died: {e}", "timings": {}}
+                record["finished_at"] = time.time()
+                _append_manifest(manifest, record)
+                counts[record["status"]] += 1
+                print(
+                    f"[BATCH] {n}/{len(pending)} {record['status']} {os.path.basename(entry['path'])} "
+                    f"({record['timings'].get('total', 0)}s){' - ' + record['error'] if record.get('error') else ''}"
+                )
+        except KeyboardInterrupt:
+            print("[BATCH] Interrupted; finished documents are in the manifest, re-run to resume")
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="directory of PDFs or manifest file")
+    parser.add_argument("--out", required=True, help="directory for results and manifest.jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="documents processed at once")
+    parser.add_argument("--toc-pages", default="auto", help="TOC range for entries without one, e.g. 2-4 (default: detect)")
+    parser.add_argument("--skip-failed", action="store_true", help="do not retry documents that failed in an earlier run")
+    args = parser.parse_args()
+
+    entries = discover_inputs(args.input, _parse_pages(args.toc_pages))
+    counts = run_batch(entries, args.out, args.workers, retry_failed=not args.skip_failed)
+    print(json.dumps(counts))
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
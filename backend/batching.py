@@ -0,0 +1,67 @@
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+from logs import fields, get_logger
+
+# Articles packed into one Pass 2 / Pass 3 request, up to this many prompt tokens (0 = one article per request)
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "0"))
+LLM_BATCH_MAX_ARTICLES = int(os.getenv("LLM_BATCH_MAX_ARTICLES", "16"))
+
+log = get_logger("batching")
+
+
+# ----------------------------
+# Local token counting
+# ----------------------------
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # encodings are downloaded on first use
+        log.warning("tiktoken unavailable; estimating tokens from length", extra=fields(model=model, error=str(e)))
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Token count for `text` under `model` (tiktoken when installed, else ~4 chars per token)."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# ----------------------------
+# Packing
+# ----------------------------
+
+def pack_batches(sizes: List[int], budget: int, max_items: Optional[int] = None) -> List[List[int]]:
+    """Group consecutive indices so each group's summed size stays within `budget`.
+
+    Order is preserved; an entry larger than the budget gets a group of its own.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, size in enumerate(sizes):
+        full = max_items is not None and len(current) >= max_items
+        if current and (used + size > budget or full):
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += size
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,117 @@
+"""Benchmark: per-heading regex search vs. the single-scan heading locator.
+
+Usage:
+    python bench_heading_locator.py [--pages 1000] [--headings 100,500,1000,2000] [--legacy-max 1000]
+
+Builds a synthetic regulation body (~3,000 characters per page) with the
+requested number of article headings spread across it, then times locating
+every heading and computing article boundaries. Prints one JSON object per
+configuration.
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from typing import List, Optional
+
+from heading_locator import locate_article_spans
+
+_FILLER = (
+    "The provider shall maintain adequate systems and controls to ensure compliance with "
+    "this Act and shall notify the competent authority without undue delay of any material change. "
+).split()
+
+
+def _legacy_title_regex(heading: str) -> re.Pattern:
+    """Copy of utils.build_title_regex (kept here so the benchmark needs no API key)."""
+    raw = heading.strip().split()
+    tokens = [re.escape(t) for t in raw if t]
+    flexible = [t.replace("o", "[o0]").replace("i", "[il1]").replace("v", "[vw]") for t in tokens]
+    lead = r"(?<!\w)" if re.match(r"\w", raw[0][0]) else ""
+    trail = r"(?!\w)" if re.match(r"\w", raw[-1][-1]) else ""
+    return re.compile(r"\s*" + lead + r"\s+".join(flexible) + trail + r"\s*", flags=re.DOTALL | re.IGNORECASE)
+
+
+def legacy_spans(text: str, headings: List[str]) -> List[Optional[tuple]]:
+    """The original moving-cursor search plus nested-loop boundary computation."""
+    starts: List[Optional[int]] = []
+    cursor = 0
+    for title in headings:
+        m = _legacy_title_regex(title).search(text, pos=cursor)
+        if m:
+            starts.append(m.start())
+            cursor = m.start()
+        else:
+            starts.append(None)
+    spans: List[Optional[tuple]] = []
+    for i, s in enumerate(starts):
+        if s is None:
+            spans.append(None)
+            continue
+        end = len(text)
+        for j in range(i + 1, len(starts)):
+            if starts[j] is not None and starts[j] > s:
+                end = starts[j]
+                break
+        spans.append((s, end))
+    return spans
+
+
+def synthetic_body(pages: int, headings: int, missing_ratio: float, seed: int = 0):
+    """Return (body_text, heading_titles); a fraction of titles never occur in the body."""
+    rnd = random.Random(seed)
+    words_per_page = 3000 // 7
+    total_words = pages * words_per_page
+    every = max(1, total_words // max(1, headings))
+    titles: List[str] = []
+    lines: List[str] = []
+    line: List[str] = []
+    for w in range(total_words):
+        if w % every == 0 and len(titles) < headings:
+            n = len(titles) + 1
+            title = f"Article {n} {rnd.choice(['Scope', 'Definitions', 'Obligations', 'Powers', 'Sanctions'])}"
+            titles.append(title)
+            if rnd.random() >= missing_ratio:
+                lines.append(" ".join(line))
+                lines.append(title)
+                line = []
+        line.append(rnd.choice(_FILLER))
+        if len(line) >= 14:
+            lines.append(" ".join(line))
+            line = []
+        if w and w % words_per_page == 0:
+            lines.append(f"Page {w // words_per_page}")
+    lines.append(" ".join(line))
+    return "\n".join(lines), titles
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--headings", default="100,500,1000,2000")
+    parser.add_argument("--missing", type=float, default=0.02, help="fraction of headings absent from the body")
+    parser.add_argument("--legacy-max", type=int, default=1000, help="skip the legacy search above this many headings")
+    args = parser.parse_args()
+
+    for count in [int(x) for x in args.headings.split(",") if x]:
+        body, titles = synthetic_body(args.pages, count, args.missing)
+        result = {"pages": args.pages, "body_chars": len(body), "headings": count}
+
+        t0 = time.perf_counter()
+        spans = locate_article_spans(body, titles)
+        result["locator_seconds"] = round(time.perf_counter() - t0, 4)
+        result["located"] = sum(1 for s in spans if s is not None)
+
+        if count <= args.legacy_max:
+            t0 = time.perf_counter()
+            legacy = legacy_spans(body, titles)
+            result["legacy_seconds"] = round(time.perf_counter() - t0, 4)
+            result["identical"] = legacy == spans
+            result["speedup"] = round(result["legacy_seconds"] / max(result["locator_seconds"], 1e-9), 1)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
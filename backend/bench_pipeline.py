@@ -0,0 +1,208 @@
+"""Benchmark: the whole pipeline on synthetic regulations, against a local OpenAI stand-in.
+
+Usage:
+    python bench_pipeline.py [--sizes 10:10,100:60,500:300,1000:750,2000:1500]
+                             [--latency 0.05] [--per-token-delay 0] [--jitter 0]
+                             [--error-rate 0] [--workers 4] [--no-memory] [--output results.json]
+
+Each size is ARTICLES:PAGES. For every size a synthetic regulation PDF is built
+(a table of contents, then chapters of articles with numbered items, padded to
+the requested page count) and run through the pipeline with utils.llm sending
+requests to llm_stub.StubClient, so no API key or network is needed and the
+LLM response cache is disabled.
+
+Stages timed: extract_pdf_text_range (body text from a freshly parsed PDF),
+llm_pass_1, fill_contents_from_body, split_into_items_verbatim (every
+article), llm_pass_2 and llm_pass_3. Each stage reports wall seconds, peak
+traced memory (a second, traced run of the stage unless --no-memory) and stub
+call/error/token counts. Prints one JSON object per size; --output also writes
+them as a JSON list for comparing versions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+# The stub replaces the real client, and benchmarks must not write debug artifacts
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("DEBUG_ARTIFACTS_MODE", "off")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+
+import utils  # noqa: E402
+from llm_stub import StubClient  # noqa: E402
+from pdf_document import forget_document, get_document  # noqa: E402
+
+_FILLER = (
+    "The provider shall maintain adequate systems and controls to ensure compliance with "
+    "this Act and shall notify the competent authority without undue delay of any material change"
+).split()
+_NAMES = ["Scope", "Definitions", "Obligations of providers", "Powers of the authority", "Sanctions", "Reporting"]
+_ROMAN = [(100, "C"), (90, "XC"), (50, "L"), (40, "XL"), (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")]
+_LINES_PER_PAGE = 48
+_LINE_WORDS = 11
+
+
+# ----------------------------
+# Synthetic PDFs
+# ----------------------------
+
+def _roman(n: int) -> str:
+    out = ""
+    for value, symbol in _ROMAN:
+        while n >= value:
+            out += symbol
+            n -= value
+    return out
+
+
+def synthetic_regulation(articles: int, pages: int) -> Tuple[List[List[str]], int]:
+    """(lines per page, number of TOC pages): TOC, then chapters of 10 articles, padded to `pages`."""
+    titles = [f"Article {n} {_NAMES[n % len(_NAMES)]}" for n in range(1, articles + 1)]
+    toc = ["Synthetic Regulation on Benchmarking", "Table of Contents"] + titles
+    toc_pages = [toc[i:i + _LINES_PER_PAGE] for i in range(0, len(toc), _LINES_PER_PAGE)]
+
+    body_pages = max(1, pages - len(toc_pages))
+    # Items per article so the body roughly fills the requested pages
+    items = max(1, (body_pages * _LINES_PER_PAGE) // max(1, articles) - 2)
+    body: List[str] = []
+    word = 0
+    for n, title in enumerate(titles, start=1):
+        if (n - 1) % 10 == 0:
+            body += [f"CHAPTER {_roman((n - 1) // 10 + 1)}", f"Provisions group {(n - 1) // 10 + 1}"]
+        body.append(title)
+        for i in range(1, items + 1):
+            words = [_FILLER[(word + k) % len(_FILLER)] for k in range(_LINE_WORDS)]
+            word += _LINE_WORDS
+            body.append(f"({i}) " + " ".join(words) + ".")
+    return toc_pages + [body[i:i + _LINES_PER_PAGE] for i in range(0, len(body), _LINES_PER_PAGE)], len(toc_pages)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(pages: List[List[str]]) -> bytes:
+    """A minimal text-only PDF (Helvetica, one text line per row) without extra dependencies."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        rows = "".join(f"BT /F1 9 Tf 40 {800 - 16 * row} Td ({_pdf_escape(line)}) Tj ET\n" for row, line in enumerate(lines))
+        stream = rows.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"endstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+
+def measure(stub: StubClient, fn: Callable[[], object], memory: bool, reset: Callable[[], None] = lambda: None):
+    """(result, metrics) for one stage: wall time and stub counts from an untraced run, peak memory from a traced re-run."""
+    reset()
+    stub.reset()
+    t0 = time.perf_counter()
+    result = fn()
+    metrics = {"seconds": round(time.perf_counter() - t0, 4), **stub.stats()}
+    if memory:
+        reset()
+        tracemalloc.start()
+        fn()
+        metrics["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+    return result, metrics
+
+
+def run_size(articles: int, pages: int, stub: StubClient, workers: int, memory: bool) -> dict:
+    page_lines, toc_pages = synthetic_regulation(articles, pages)
+    pdf_bytes = write_pdf(page_lines)
+    toc = (1, toc_pages)
+    result = {"articles": articles, "pages": len(page_lines), "pdf_bytes": len(pdf_bytes), "stages": {}}
+    stages = result["stages"]
+
+    def fresh_document():
+        forget_document(get_document(pdf_bytes).sha256)
+
+    _, stages["extract_pdf_text_range"] = measure(
+        stub, lambda: utils.extract_pdf_text_range(pdf_bytes, toc_pages + 1, None), memory, fresh_document
+    )
+    (headings, _, _), stages["llm_pass_1"] = measure(stub, lambda: utils.run_llm_pass_1(pdf_bytes, toc), memory)
+    filled, stages["fill_contents_from_body"] = measure(
+        stub, lambda: utils.fill_contents_from_body(pdf_bytes, headings, index_pages=toc), memory
+    )
+    _, stages["split_into_items_verbatim"] = measure(
+        stub, lambda: [utils.split_into_items_verbatim(a.get("content", "")) for a in filled["articles"]], memory
+    )
+    (itemised, _), stages["llm_pass_2"] = measure(
+        stub, lambda: utils.run_llm_pass_2(filled, max_workers=workers), memory
+    )
+    (final, _), stages["llm_pass_3"] = measure(
+        stub, lambda: utils.run_llm_pass_3(itemised, max_workers=workers, pdf_source=pdf_bytes, index_pages=toc), memory
+    )
+
+    result["headings_found"] = len(headings.get("articles", []))
+    result["with_content"] = sum(1 for a in filled["articles"] if a.get("content"))
+    result["with_path"] = sum(1 for a in final["articles"] if a.get("path"))
+    result["total_seconds"] = round(sum(s["seconds"] for s in stages.values()), 4)
+    forget_document(get_document(pdf_bytes).sha256)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10:10,100:60,500:300,1000:750,2000:1500", help="ARTICLES:PAGES list")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per call")
+    parser.add_argument("--per-token-delay", type=float, default=0.0, help="stub seconds per prompt+completion token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stub extra random delay, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub calls failing with 429/500")
+    parser.add_argument("--workers", type=int, default=utils.LLM_MAX_CONCURRENCY, help="Pass 2/3 concurrency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced re-run of each stage")
+    parser.add_argument("--output", help="also write all results to this JSON file")
+    args = parser.parse_args()
+
+    utils.llm.raw = StubClient(
+        latency=args.latency,
+        per_token_delay=args.per_token_delay,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    stub = utils.llm.raw
+
+    results = []
+    for spec in [s for s in args.sizes.split(",") if s]:
+        articles, _, pages = spec.partition(":")
+        result = run_size(int(articles), int(pages or articles), stub, args.workers, not args.no_memory)
+        result["stub"] = {"latency": args.latency, "per_token_delay": args.per_token_delay,
+                          "jitter": args.jitter, "error_rate": args.error_rate}
+        result["python"] = platform.python_version()
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from logs import fields, get_logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+log = get_logger("concurrency")
+
+
+# ----------------------------
+# Rate limiting
+# ----------------------------
+
+class _TokenBucket:
+    """Token bucket refilled continuously at `per_minute / 60` units per second."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Blocking requests-per-minute / tokens-per-minute limiter shared across threads.
+
+    A limit of 0 (or None) disables that dimension.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self._rpm = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tpm = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request carrying `tokens` tokens may be sent."""
+        if self._rpm is None and self._tpm is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = 0.0
+                if self._rpm is not None:
+                    wait = max(wait, self._rpm.wait_time(1, now))
+                if self._tpm is not None and tokens:
+                    wait = max(wait, self._tpm.wait_time(tokens, now))
+                if wait <= 0:
+                    if self._rpm is not None:
+                        self._rpm.take(1)
+                    if self._tpm is not None and tokens:
+                        self._tpm.take(tokens)
+                    return
+            time.sleep(wait)
+
+
+# ----------------------------
+# Retry with jittered backoff
+# ----------------------------
+
+def retry_with_backoff(
+    fn: Callable[[], R],
+    is_retryable: Callable[[BaseException], bool],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    retry_after: Optional[Callable[[BaseException], Optional[float]]] = None,
+    deadline: Optional[float] = None,
+    on_retry: Optional[Callable[[BaseException], None]] = None,
+) -> R:
+    """Call `fn`, retrying retryable errors with exponential backoff and full jitter.
+
+    If `retry_after` returns a delay for an error (e.g. a Retry-After header),
+    that delay is used as the lower bound for the next sleep. With a `deadline`
+    (time.monotonic() value), no retry is started that would begin after it.
+    `on_retry` is called with each error that is about to be retried.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            hinted = retry_after(e) if retry_after else None
+            if hinted:
+                delay = max(delay, min(hinted, max_delay))
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            attempt += 1
+            if on_retry:
+                on_retry(e)
+            log.warning(
+                "Retrying after error",
+                extra=fields(attempt=attempt, max_retries=max_retries, delay=round(delay, 2), error_type=type(e).__name__, error=str(e)[:200]),
+            )
+            time.sleep(delay)
+
+
+# ----------------------------
+# Ordered bounded-concurrency map
+# ----------------------------
+
+def map_ordered(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int = 1,
+) -> List[R]:
+    """Apply `fn` to every item with at most `max_workers` in flight.
+
+    Results are returned in the order of `items`. The first exception raised
+    by any call is re-raised after in-flight calls finish; queued calls that
+    have not started yet are cancelled. Context variables of the caller are
+    visible inside every call.
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        try:
+            return [f.result() for f in futures]
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
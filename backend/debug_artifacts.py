@@ -0,0 +1,214 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from logs import fields, get_logger
+
+# What pipeline runs record for debugging:
+#   background  one gzipped JSONL record per run, written by a background thread (default)
+#   sampled     like background, for a DEBUG_ARTIFACTS_SAMPLE_RATE fraction of runs
+#   files       the legacy layout (one indented JSON file per artifact), also written in the background
+#   off         nothing
+DEBUG_ARTIFACTS_MODE = os.getenv("DEBUG_ARTIFACTS_MODE", "background").strip().lower()
+DEBUG_ARTIFACTS_SAMPLE_RATE = float(os.getenv("DEBUG_ARTIFACTS_SAMPLE_RATE", "0.1"))
+
+# Retention for the debug output directory
+DEBUG_ARTIFACTS_MAX_AGE_DAYS = float(os.getenv("DEBUG_ARTIFACTS_MAX_AGE_DAYS", "7"))
+DEBUG_ARTIFACTS_MAX_MB = float(os.getenv("DEBUG_ARTIFACTS_MAX_MB", "256"))
+
+log = get_logger("debug_artifacts")
+
+# How often (seconds) the writer applies the retention policy
+_RETENTION_SWEEP_SECONDS = 60
+# Files in the debug directory that the retention policy may delete
+_ARTIFACT_SUFFIXES = (".jsonl.gz", ".json", ".txt")
+
+
+def _jsonable(value: object) -> object:
+    """json.dumps fallback: objects with to_json() (e.g. spans.SpanDocument) serialise as their JSON."""
+    if hasattr(value, "to_json"):
+        return value.to_json()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def new_run_id() -> str:
+    """Sortable and unique even for runs started within the same second."""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+# ----------------------------
+# Per-run recorder
+# ----------------------------
+
+class DebugRun:
+    """Artifacts of one pipeline run, buffered in memory until close().
+
+    add() never touches the disk, so it is cheap inside per-article loops.
+    """
+
+    def __init__(self, stage: str, out_dir: str, enabled: bool):
+        self.stage = stage
+        self.out_dir = out_dir
+        self.run_id = new_run_id()
+        self.enabled = enabled
+        self._artifacts: dict = {}
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+
+    def add(self, name: str, value: object) -> None:
+        if self.enabled:
+            with self._lock:
+                self._artifacts[name] = value
+
+    def close(self) -> None:
+        """Queue the run for the writer thread, which serialises it.
+
+        Artifacts are the pipeline's own results, which are not modified once
+        a pass has returned them, so they are handed over without copying.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            artifacts, self._artifacts = self._artifacts, {}
+        if DEBUG_ARTIFACTS_MODE == "files":
+            for name, value in artifacts.items():
+                suffix = "txt" if isinstance(value, str) else "json"
+                _writer.submit(self.out_dir, f"{name}_{self.run_id}.{suffix}", value, append=False)
+        else:
+            record = {
+                "run_id": self.run_id,
+                "stage": self.stage,
+                "started_at": self._started_at,
+                "finished_at": time.time(),
+                "artifacts": artifacts,
+            }
+            _writer.submit(self.out_dir, None, record, append=True)
+
+
+def start_run(stage: str, out_dir: str) -> DebugRun:
+    """Recorder for one run of `stage`, enabled according to DEBUG_ARTIFACTS_MODE."""
+    if DEBUG_ARTIFACTS_MODE == "off":
+        enabled = False
+    elif DEBUG_ARTIFACTS_MODE == "sampled":
+        enabled = random.random() < DEBUG_ARTIFACTS_SAMPLE_RATE
+    else:
+        enabled = True
+    return DebugRun(stage, out_dir, enabled)
+
+
+# ----------------------------
+# Background writer
+# ----------------------------
+
+def _run_log_name() -> str:
+    """Today's run log for this process; one file per process, so concurrent workers never interleave appends."""
+    return f"runs_{datetime.now().strftime('%Y%m%d')}_{os.getpid()}.jsonl.gz"
+
+
+def _serialise(value: object, append: bool) -> str:
+    if isinstance(value, str):
+        return value
+    if append:
+        return json.dumps(value, ensure_ascii=False, default=_jsonable) + "\n"
+    return json.dumps(value, indent=2, ensure_ascii=False, default=_jsonable)
+
+
+class _ArtifactWriter:
+    """Single daemon thread that serialises and writes queued artifacts and enforces retention."""
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_sweep: dict = {}
+
+    def submit(self, out_dir: str, filename: Optional[str], value: object, append: bool) -> None:
+        """Queue `value` for writing; appends (filename None) go to this process's run log."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="debug-artifacts", daemon=True)
+                self._thread.start()
+        self._queue.put((out_dir, filename, value, append))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until everything queued so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        with self._lock:
+            alive = self._thread is not None and self._thread.is_alive()
+        if alive:
+            done.wait(timeout)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if isinstance(job, threading.Event):
+                job.set()
+                continue
+            out_dir, filename, value, append = job
+            filename = filename or _run_log_name()
+            try:
+                payload = _serialise(value, append)
+                os.makedirs(out_dir, exist_ok=True)
+                path = os.path.join(out_dir, filename)
+                if append:
+                    # Each append is its own gzip member; readers see one continuous stream
+                    with gzip.open(path, "ab") as f:
+                        f.write(payload.encode("utf-8"))
+                else:
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(payload)
+                self._maybe_sweep(out_dir)
+            except Exception as e:
+                log.warning("Failed to write debug artifact", extra=fields(file=filename, error=str(e)))
+
+    def _maybe_sweep(self, out_dir: str) -> None:
+        now = time.time()
+        if now - self._last_sweep.get(out_dir, 0.0) < _RETENTION_SWEEP_SECONDS:
+            return
+        self._last_sweep[out_dir] = now
+        apply_retention(out_dir)
+
+
+def apply_retention(
+    out_dir: str,
+    max_age_days: float = DEBUG_ARTIFACTS_MAX_AGE_DAYS,
+    max_bytes: float = DEBUG_ARTIFACTS_MAX_MB * 1024 * 1024,
+) -> int:
+    """Delete debug files older than max_age_days, then oldest first down to max_bytes; returns files removed."""
+    files = []
+    for entry in os.scandir(out_dir):
+        if entry.is_file() and entry.name.endswith(_ARTIFACT_SUFFIXES):
+            st = entry.stat()
+            files.append((st.st_mtime, st.st_size, entry.path))
+    files.sort()
+    now = time.time()
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in files:
+        too_old = max_age_days > 0 and now - mtime > max_age_days * 86400
+        too_big = max_bytes > 0 and total > max_bytes
+        if not (too_old or too_big):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        log.info("Removed old debug files", extra=fields(removed=removed, out_dir=out_dir))
+    return removed
+
+
+_writer = _ArtifactWriter()
+flush = _writer.flush
+atexit.register(flush, 5.0)
@@ -0,0 +1,242 @@
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ----------------------------
+# Normalisation
+# ----------------------------
+
+# OCR confusables a heading's own lower-case letters stand for, as in build_title_regex:
+# an 'o' in the heading also matches '0', an 'i' matches 'l'/'1', a 'v' matches 'w'.
+# Body text and every other heading character (digits included) match only themselves.
+_WIDEN = {"o": "[o0]", "i": "[il1]", "v": "[vw]"}
+_CLASS_CHARS = {unit: unit[1:-1] for unit in _WIDEN.values()}
+_CLASS_OF = {ch: unit for unit, chars in _CLASS_CHARS.items() for ch in chars}
+_TOKEN_RE = re.compile(r"\S+")
+
+
+def _lower_token(token: str) -> str:
+    """Lower-case, keeping a 1:1 character mapping."""
+    low = token.lower()
+    if len(low) != len(token):
+        # A few characters (e.g. 'İ') expand when lower-cased; keep one char each
+        low = "".join(ch.lower()[:1] or ch for ch in token)
+    return low
+
+
+def normalise_heading(heading: str) -> str:
+    """Lower-cased, whitespace-collapsed heading (no confusable folding), for comparing headings."""
+    return " ".join(_lower_token(t) for t in (heading or "").split())
+
+
+def heading_pattern(heading: str) -> Tuple[str, ...]:
+    """The heading as match units against NormalisedText.text.
+
+    Each unit is one literal character, or a class such as '[o0]' for a
+    lower-case o/i/v of the heading; tokens are separated by ' ' units.
+    """
+    units: List[str] = []
+    for token in (heading or "").split():
+        if units:
+            units.append(" ")
+        for ch, low in zip(token, _lower_token(token)):
+            units.append(_WIDEN.get(ch, low))
+    return tuple(units)
+
+
+class NormalisedText:
+    """Whitespace-collapsed, lower-cased view of a text with an offset map.
+
+    Every whitespace run becomes a single space; every other character maps
+    1:1 to a character of the original, so offsets translate exactly.
+    """
+
+    def __init__(self, text: str):
+        self.original = text
+        spans = [m.span() for m in _TOKEN_RE.finditer(text)]
+        self._orig_starts: List[int] = [a for a, _ in spans]
+        self._orig_ends: List[int] = [b for _, b in spans]
+        # token i starts after i separating spaces plus the lengths of tokens before it
+        self._norm_starts: List[int] = list(accumulate((b - a + 1 for a, b in spans), initial=0))[:-1]
+
+        collapsed = " ".join(text.split())
+        folded = collapsed.lower()
+        expected = self._norm_starts[-1] + spans[-1][1] - spans[-1][0] if spans else 0
+        if len(folded) != expected:
+            # Length-changing lower-casing (or a split() / \S+ disagreement): go token by token
+            folded = " ".join(_lower_token(text[a:b]) for a, b in spans)
+        self.text = folded
+
+    def to_original(self, norm_pos: int) -> int:
+        """Original offset of the (non-space) character at `norm_pos`."""
+        k = bisect_right(self._norm_starts, norm_pos) - 1
+        if k < 0:
+            return 0
+        return self._orig_starts[k] + (norm_pos - self._norm_starts[k])
+
+    def match_start(self, norm_pos: int) -> int:
+        """Original offset where a `\\s*`-prefixed match at `norm_pos` would start.
+
+        A heading found at the start of a token is treated as starting at the
+        beginning of the whitespace run before it, as the per-heading
+        `build_title_regex` search did.
+        """
+        k = bisect_right(self._norm_starts, norm_pos) - 1
+        if k < 0:
+            return 0
+        if norm_pos != self._norm_starts[k]:
+            return self._orig_starts[k] + (norm_pos - self._norm_starts[k])
+        return self._orig_ends[k - 1] if k > 0 else 0
+
+
+# ----------------------------
+# Single-scan multi-pattern search
+# ----------------------------
+
+_END = ""  # trie key holding the pattern that ends at a node
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _unit_is_word(unit: str) -> bool:
+    return unit in _CLASS_CHARS or _is_word(unit)
+
+
+def _unit_regex(unit: str) -> str:
+    return unit if unit in _CLASS_CHARS else re.escape(unit)
+
+
+def _build_trie(patterns: Iterable[Sequence[str]]) -> dict:
+    trie: dict = {}
+    for pat in patterns:
+        node = trie
+        for unit in pat:
+            node = node.setdefault(unit, {})
+        node[_END] = pat
+    return trie
+
+
+def _trie_to_regex(node: dict) -> str:
+    """Prefix-factored alternation for the patterns below `node`."""
+    # Collapse single-child chains into literals to keep the regex shallow
+    literal = []
+    while len(node) == 1 and _END not in node:
+        unit, node = next(iter(node.items()))
+        literal.append(_unit_regex(unit))
+    branches = [_unit_regex(unit) + _trie_to_regex(child) for unit, child in node.items() if unit != _END]
+    if not branches:
+        tail = ""
+    elif len(branches) == 1:
+        tail = branches[0]
+    else:
+        tail = "(?:" + "|".join(branches) + ")"
+    if _END in node and tail:
+        tail = "(?:" + tail + ")?"
+    return "".join(literal) + tail
+
+
+def _matches_at(text: str, start: int, trie: dict) -> Iterable[Sequence[str]]:
+    """Every pattern matching `text` at `start` on whole-word boundaries.
+
+    Literal and class units can overlap ('o' and '[o0]'), so all trie paths
+    the text allows are followed together.
+    """
+    after_word = start > 0 and _is_word(text[start - 1])
+    active = [trie]
+    pos = start
+    while active:
+        for node in active:
+            pat = node.get(_END)
+            if pat is None:
+                continue
+            # A match may not begin or end inside a word
+            if after_word and _unit_is_word(pat[0]):
+                continue
+            if pos < len(text) and _is_word(text[pos]) and _unit_is_word(pat[-1]):
+                continue
+            yield pat
+        if pos >= len(text):
+            break
+        ch = text[pos]
+        unit = _CLASS_OF.get(ch)
+        active = [child for node in active for child in (node.get(ch), node.get(unit) if unit else None) if child]
+        pos += 1
+
+
+def find_all_occurrences(text: str, patterns: Iterable[Sequence[str]]) -> Dict[Sequence[str], List[int]]:
+    """Start offsets of every (possibly overlapping) whole-word occurrence of each pattern.
+
+    A pattern is a string or a sequence of units (see heading_pattern). One
+    regex pass over `text` finds the positions where some pattern occurs;
+    the patterns occurring there are then read off the trie.
+    """
+    unique = {p for p in patterns if p}
+    found: Dict[Sequence[str], List[int]] = {p: [] for p in unique}
+    if not unique:
+        return found
+    trie = _build_trie(unique)
+    scanner = re.compile("(?=" + _trie_to_regex(trie) + ")")
+    for m in scanner.finditer(text):
+        for pat in _matches_at(text, m.start(), trie):
+            found[pat].append(m.start())
+    return found
+
+
+# ----------------------------
+# Heading location and article boundaries
+# ----------------------------
+
+def locate_headings(text: str, headings: List[str], normalised: Optional[NormalisedText] = None) -> List[Optional[int]]:
+    """Original-text start offset of each heading, searched in order with a moving cursor.
+
+    Equivalent to running `build_title_regex(h).search(text, pos=cursor)` for
+    each heading, but the body is normalised and scanned once for all headings.
+    Headings that are empty or not found get None and don't move the cursor.
+    """
+    norm = normalised or NormalisedText(text)
+    keys = [heading_pattern(h) for h in headings]
+    occurrences = find_all_occurrences(norm.text, keys)
+
+    starts: List[Optional[int]] = []
+    cursor = 0
+    last_orig = 0
+    for key in keys:
+        positions = occurrences.get(key) if key else None
+        k = bisect_left(positions, cursor) if positions else 0
+        if not positions or k >= len(positions):
+            starts.append(None)
+            continue
+        cursor = positions[k]
+        last_orig = max(last_orig, norm.match_start(cursor))
+        starts.append(last_orig)
+    return starts
+
+
+def article_boundaries(starts: List[Optional[int]], text_len: int) -> List[Optional[Tuple[int, int]]]:
+    """(start, end) for each located heading, ending at the next strictly later start.
+
+    `starts` is non-decreasing where not None (as produced by locate_headings),
+    so one reverse pass is enough.
+    """
+    spans: List[Optional[Tuple[int, int]]] = [None] * len(starts)
+    next_start: Optional[int] = None
+    next_end = text_len
+    for i in range(len(starts) - 1, -1, -1):
+        s = starts[i]
+        if s is None:
+            continue
+        if next_start is not None and next_start > s:
+            end = next_start
+        else:
+            end = next_end
+        spans[i] = (s, end)
+        next_start, next_end = s, end
+    return spans
+
+
+def locate_article_spans(text: str, headings: List[str]) -> List[Optional[Tuple[int, int]]]:
+    """Locate every heading in `text` and return each article's (start, end) slice."""
+    return article_boundaries(locate_headings(text, headings), len(text))
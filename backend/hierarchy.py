@@ -0,0 +1,144 @@
+import json
+import os
+import re
+from typing import Collection, List, Optional, Tuple
+
+from heading_locator import locate_headings
+
+# Pass 3 local path engine: derive paths from hierarchy headings in the body text,
+# optionally asking the LLM about articles whose local path is ambiguous
+PATH_LOCAL_ENGINE = os.getenv("PATH_LOCAL_ENGINE", "0") not in ("0", "false", "False")
+PATH_LLM_REFINE = os.getenv("PATH_LLM_REFINE", "1") not in ("0", "false", "False")
+# Optional JSON file: [{"level": "chapter", "pattern": "...", "weak": false}, ...], outermost level first
+# (patterns are compiled with re.MULTILINE; use (?i:...) for case-insensitive parts)
+HIERARCHY_PATTERNS_FILE = os.getenv("HIERARCHY_PATTERNS_FILE")
+
+# Outermost first. Each pattern matches one heading line (re.MULTILINE): a keyword, a
+# number and optionally a capitalised name without sentence punctuation, so wrapped
+# sentences such as "Part 2 of Annex I shall apply ..." are not taken for headings.
+# "weak" levels are plausible but error-prone; paths that depend on them count as ambiguous.
+_LABEL = r"[ \t]+(?:[IVXLCDM]+|\d+|[A-Z])\b"
+_NAME = r"(?:[ \t]*[-–—:.]?[ \t]*[A-Z0-9(\"'][^\n.;]{0,120})?[ \t]*$"
+
+DEFAULT_LEVELS: List[dict] = [
+    {"level": "part", "pattern": r"^[ \t]*(?i:part)" + _LABEL + _NAME},
+    {"level": "title", "pattern": r"^[ \t]*(?i:title)" + _LABEL + _NAME},
+    {"level": "chapter", "pattern": r"^[ \t]*(?i:chapter)" + _LABEL + _NAME},
+    {"level": "section", "pattern": r"^[ \t]*(?i:section)" + _LABEL + _NAME},
+    {"level": "subsection", "pattern": r"^[ \t]*(?i:sub-?section)" + _LABEL + _NAME},
+    {"level": "numbered", "pattern": r"^[ \t]*\d{1,2}(?:\.\d{1,2})*[ \t]+[A-Z][^\n.;:,]{2,80}$", "weak": True},
+]
+
+# A heading line that is only a label ("CHAPTER II") takes its name from the next line if it is this short
+_MAX_NAME_LINE = 120
+_LABEL_ONLY_RE = re.compile(r"^\s*\S+\s+\S+\s*$")
+
+
+def load_levels(path: Optional[str] = HIERARCHY_PATTERNS_FILE) -> List[dict]:
+    """Hierarchy levels from HIERARCHY_PATTERNS_FILE, or DEFAULT_LEVELS."""
+    if not path:
+        return DEFAULT_LEVELS
+    with open(path, "r", encoding="utf-8") as f:
+        levels = json.load(f)
+    if not isinstance(levels, list) or not all(isinstance(lv, dict) and "pattern" in lv for lv in levels):
+        raise ValueError(f"{path}: expected a list of {{'level', 'pattern'}} objects")
+    return levels
+
+
+# ----------------------------
+# Heading scan
+# ----------------------------
+
+class HierarchyHeading:
+    __slots__ = ("offset", "rank", "level", "text", "weak")
+
+    def __init__(self, offset: int, rank: int, level: str, text: str, weak: bool):
+        self.offset = offset
+        self.rank = rank
+        self.level = level
+        self.text = text
+        self.weak = weak
+
+
+def _combined_regex(levels: List[dict]) -> re.Pattern:
+    parts = [f"(?P<L{rank}>{lv['pattern']})" for rank, lv in enumerate(levels)]
+    return re.compile("|".join(parts), re.MULTILINE)
+
+
+def _skip_blanks(text: str, pos: int) -> int:
+    """First non-whitespace offset at or after pos (within the next 200 characters)."""
+    window = text[pos:pos + 200]
+    return pos + (len(window) - len(window.lstrip()))
+
+
+def scan_hierarchy(
+    text: str,
+    levels: Optional[List[dict]] = None,
+    article_offsets: Collection[int] = (),
+) -> List[HierarchyHeading]:
+    """Every hierarchy heading in `text`, in order, from a single regex scan.
+
+    `article_offsets` are where article headings start; such lines are never
+    taken as the name of a preceding label-only heading.
+    """
+    levels = levels or load_levels()
+    regex = _combined_regex(levels)
+    headings: List[HierarchyHeading] = []
+    for m in regex.finditer(text):
+        rank = int(m.lastgroup[1:])
+        weak = bool(levels[rank].get("weak"))
+        line = m.group(0).strip()
+        # "CHAPTER II" on its own line: the name follows on the next line
+        if not weak and _LABEL_ONLY_RE.match(line):
+            nxt_start = _skip_blanks(text, m.end())
+            nxt_end = text.find("\n", nxt_start)
+            nxt = text[nxt_start:nxt_end if nxt_end != -1 else len(text)].strip()
+            if nxt and len(nxt) <= _MAX_NAME_LINE and nxt_start not in article_offsets and not regex.match(nxt):
+                line = f"{line} {nxt}"
+        offset = _skip_blanks(text, m.start())
+        headings.append(HierarchyHeading(offset, rank, levels[rank].get("level", f"L{rank}"), line, weak))
+    return headings
+
+
+# ----------------------------
+# Path assignment
+# ----------------------------
+
+def assign_paths(
+    text: str,
+    titles: List[str],
+    levels: Optional[List[dict]] = None,
+    starts: Optional[List[Optional[int]]] = None,
+) -> List[Tuple[List[str], bool]]:
+    """(path, ambiguous) for each article title, from the headings above it in `text`.
+
+    The headings seen so far form a stack: a heading closes every open heading
+    at its level or below. An article's path is the stack at its own heading
+    line (so an article titled 'Chapter I ...' includes itself). A path is
+    ambiguous when the article was not found in the text or the path relies on
+    a weak level (e.g. bare numbered headings).
+    """
+    if starts is None:
+        starts = locate_headings(text, titles)
+    # The article's heading line: skip the whitespace run a match start includes
+    line_starts = [_skip_blanks(text, s) if s is not None else None for s in starts]
+    headings = scan_hierarchy(text, levels, {s for s in line_starts if s is not None})
+
+    results: List[Tuple[List[str], bool]] = []
+    stack: List[HierarchyHeading] = []
+    h = 0
+    last_position = 0
+    for line_start in line_starts:
+        if line_start is None:
+            results.append(([], True))
+            continue
+        position = max(line_start, last_position)
+        while h < len(headings) and headings[h].offset <= position:
+            heading = headings[h]
+            while stack and stack[-1].rank >= heading.rank:
+                stack.pop()
+            stack.append(heading)
+            h += 1
+        last_position = position
+        results.append(([hd.text for hd in stack], any(hd.weak for hd in stack)))
+    return results
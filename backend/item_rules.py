@@ -0,0 +1,120 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from heading_locator import normalise_heading
+
+# Pass 2 "rules-first": split locally and ask the LLM only when the split scores below the threshold
+ITEMS_RULES_FIRST = os.getenv("ITEMS_RULES_FIRST", "0") not in ("0", "false", "False")
+ITEMS_RULES_MIN_CONFIDENCE = float(os.getenv("ITEMS_RULES_MIN_CONFIDENCE", "0.9"))
+
+_ROMAN = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
+_ROMAN_RE = re.compile(r"^[ivxlcdm]+$")
+
+
+def _roman_value(s: str) -> Optional[int]:
+    if not _ROMAN_RE.match(s):
+        return None
+    total = 0
+    for ch, nxt in zip(s, s[1:] + " "):
+        v = _ROMAN[ch]
+        total += -v if nxt != " " and _ROMAN[nxt] > v else v
+    return total
+
+
+def _marker_kinds(marker: str) -> List[Tuple[str, Optional[int]]]:
+    """Possible (family, ordinal) readings of a marker; '(i)' may be roman or alphabetic."""
+    m = marker.strip()
+    if m in ("-", "•"):
+        return [("bullet", None)]
+    if m.endswith(".") and m[:-1].isdigit():
+        return [("num.", int(m[:-1]))]
+    if m.startswith("(") and m.endswith(")"):
+        inner = m[1:-1]
+        if inner.isdigit():
+            return [("(num)", int(inner))]
+        kinds = []
+        roman = _roman_value(inner.lower())
+        if roman is not None:
+            kinds.append(("(roman)", roman))
+        if len(inner) == 1 and inner.isalpha():
+            kinds.append(("(alpha)", ord(inner.lower()) - ord("a") + 1))
+        return kinds
+    if m.endswith(")") and len(m) == 2 and m[0].isalpha():
+        return [("alpha)", ord(m[0].lower()) - ord("a") + 1)]
+    return []
+
+
+# ----------------------------
+# Confidence scoring
+# ----------------------------
+
+def marker_sequence_violations(refs: List[str]) -> int:
+    """Markers that break numbering or nesting.
+
+    Markers are read as a stack of list levels: a known family must continue
+    its own sequence (previous + 1), a new family opens a nested level and must
+    start at its first value. Bullets only have to stay consistent in level.
+    """
+    stack: List[Tuple[str, Optional[int]]] = []
+    violations = 0
+    for ref in refs:
+        kinds = _marker_kinds(ref)
+        if not kinds:
+            violations += 1
+            continue
+        chosen = None
+        # Prefer continuing an open level (innermost first), e.g. '(i)' after '(h)' is alphabetic
+        for depth in range(len(stack) - 1, -1, -1):
+            family, last = stack[depth]
+            for kind, value in kinds:
+                if kind == family and (value is None or last is None or value == last + 1):
+                    chosen = (depth, kind, value)
+                    break
+            if chosen:
+                break
+        if chosen:
+            depth, kind, value = chosen
+            del stack[depth + 1:]
+            stack[depth] = (kind, value)
+            continue
+        # Otherwise this opens a nested level, which should start at 1 / a / i
+        opening = next(((k, v) for k, v in kinds if v in (None, 1)), None)
+        if opening is None or any(family == opening[0] for family, _ in stack):
+            violations += 1
+            kind, value = kinds[0]
+            depth = next((d for d, (family, _) in enumerate(stack) if family == kind), None)
+            if depth is not None:
+                del stack[depth + 1:]
+                stack[depth] = (kind, value)
+            else:
+                stack.append((kind, value))
+            continue
+        stack.append(opening)
+    return violations
+
+
+def score_item_split(title: str, content: str, items: List[dict], markers: List[str]) -> dict:
+    """Confidence in a rule-based split: marker monotonicity, nesting consistency and content coverage."""
+    total_chars = len("".join(content.split()))
+    if not markers or not items or not total_chars:
+        return {"confidence": 0.0, "markers": len(markers), "violations": 0, "coverage": 0.0}
+
+    covered = sum(len("".join(it["content"].split())) for it in items)
+    # Text before the first marker is fine when it is just the article heading
+    first = content.find(items[0]["content"])
+    preamble = normalise_heading(content[:first]) if first > 0 else ""
+    heading = normalise_heading(title or "")
+    if heading and preamble.startswith(heading):
+        covered += len(heading.replace(" ", ""))
+    coverage = min(1.0, covered / total_chars)
+
+    violations = marker_sequence_violations(markers)
+    monotonic = 1.0 - violations / len(markers)
+    confidence = round(min(monotonic, coverage) * (1.0 if violations == 0 else 0.5), 4)
+    return {
+        "confidence": confidence,
+        "markers": len(markers),
+        "violations": violations,
+        "coverage": round(coverage, 4),
+    }
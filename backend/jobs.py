@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from logs import fields, get_logger
+from storage import StorageBackend
+
+# Background pipeline jobs running at once in this process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# How often (seconds) a running job persists progress and checks for cancellation
+_SYNC_SECONDS = 0.5
+
+FINISHED = ("succeeded", "failed", "cancelled", "superseded")
+
+log = get_logger("jobs")
+
+
+# ----------------------------
+# Background jobs
+# ----------------------------
+
+class _RunningJob:
+    """Progress of a job executing in this process, persisted to storage periodically.
+
+    The job record carries only counters; finished articles are written once
+    each, in one partial-results chunk per sync (see JobManager.status).
+    """
+
+    def __init__(self, manager: "JobManager", record: dict):
+        self.manager = manager
+        self.record = record
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._pending: Dict[str, object] = {}
+        self._last_sync = 0.0
+
+    @property
+    def job_id(self) -> str:
+        return self.record["job_id"]
+
+    def progress(self, article_index: int, total: int, result: object) -> None:
+        """ProgressCallback for run_llm_pass_*: record one finished article."""
+        with self._lock:
+            self.record["total"] = total
+            self.record["completed"] += 1
+            self._pending[str(article_index)] = result
+            due = time.time() - self._last_sync >= _SYNC_SECONDS
+        # Skip if another thread is already syncing; its successor will pick these results up
+        if due and self._sync_lock.acquire(blocking=False):
+            try:
+                self._sync_locked()
+            finally:
+                self._sync_lock.release()
+
+    def sync(self) -> None:
+        """Persist progress and pick up cancellation requested by any worker."""
+        with self._sync_lock:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        self._write(self._take_snapshot())
+        if self.manager.storage.get_job(_cancel_key(self.job_id)) is not None:
+            self.cancel_event.set()
+
+    def _take_snapshot(self, **updates) -> Tuple[dict, Dict[str, object]]:
+        """(record to store, results finished since the last write); call with _sync_lock held."""
+        with self._lock:
+            self._last_sync = time.time()
+            self.record.update(updates)
+            pending, self._pending = self._pending, {}
+            if pending:
+                self.record["partial_chunks"] += 1
+            return dict(self.record), pending
+
+    def _write(self, snapshot: Tuple[dict, Dict[str, object]]) -> None:
+        record, pending = snapshot
+        storage = self.manager.storage
+        if pending:
+            # The chunk goes first so the record never points at a chunk that is not stored yet
+            storage.put_job(_partial_key(self.job_id, record["partial_chunks"] - 1), {
+                "document_id": record["document_id"],
+                "partial": pending,
+            })
+        storage.put_job(self.job_id, record)
+
+    def finish(self, status: str, error: Optional[str] = None, extra: Optional[dict] = None) -> None:
+        updates = dict(extra or {}, status=status, finished_at=time.time())
+        if error:
+            updates["error"] = error
+        with self._sync_lock:
+            self._write(self._take_snapshot(**updates))
+
+
+def _cancel_key(job_id: str) -> str:
+    return f"{job_id}-cancel"
+
+
+def _partial_key(job_id: str, chunk: int) -> str:
+    return f"{job_id}-partial-{chunk}"
+
+
+class JobManager:
+    """Runs pipeline passes in a background executor with progress and cancellation.
+
+    Job records live in the shared StorageBackend, so status and cancel
+    requests work from any worker process. Each document has at most one
+    active job: submitting a new one supersedes (cancels) the running one.
+    """
+
+    def __init__(self, storage: StorageBackend, max_workers: int = JOB_WORKERS):
+        self.storage = storage
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self._running: Dict[str, _RunningJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        document_id: str,
+        kind: str,
+        total: int,
+        run: Callable[[Callable, threading.Event], object],
+        on_success: Callable[[object], Optional[dict]],
+        cancelled_error: type = Exception,
+    ) -> dict:
+        """Start `run(progress, cancel_event)` in the background; returns the job record.
+
+        `on_success(result)` is called with the return value unless the job was
+        cancelled or superseded in the meantime; any dict it returns is merged
+        into the finished job record. `cancelled_error` is the
+        exception type `run` raises when it stops because of cancel_event.
+        """
+        previous = (self.storage.get_state(document_id) or {}).get("active_job")
+        record = {
+            "job_id": uuid.uuid4().hex,
+            "document_id": document_id,
+            "kind": kind,
+            "status": "queued",
+            "completed": 0,
+            "total": total,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "partial_chunks": 0,
+        }
+        if previous:
+            self.cancel(previous, superseded_by=record["job_id"])
+        self.storage.put_job(record["job_id"], record)
+        self.storage.put_state(document_id, active_job=record["job_id"])
+
+        job = _RunningJob(self, record)
+        with self._lock:
+            self._running[job.job_id] = job
+        ctx = contextvars.copy_context()
+        self._executor.submit(ctx.run, self._execute, job, run, on_success, cancelled_error)
+        return dict(record, partial={})
+
+    def _execute(self, job: _RunningJob, run, on_success, cancelled_error) -> None:
+        try:
+            job.sync()
+            if job.cancel_event.is_set():
+                job.finish(self._cancelled_status(job.job_id))
+                return
+            with job._lock:
+                job.record["status"] = "running"
+                job.record["started_at"] = time.time()
+            job.sync()
+            result = run(job.progress, job.cancel_event)
+            job.sync()
+            if job.cancel_event.is_set():
+                job.finish(self._cancelled_status(job.job_id))
+                return
+            extra = on_success(result)
+            job.finish("succeeded", extra=extra)
+        except cancelled_error:
+            job.finish(self._cancelled_status(job.job_id))
+        except Exception as e:
+            log.exception("Job failed", extra=fields(job_id=job.job_id))
+            job.finish("failed", error=str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job.job_id, None)
+
+    def _cancelled_status(self, job_id: str) -> str:
+        request = self.storage.get_job(_cancel_key(job_id)) or {}
+        return "superseded" if request.get("superseded_by") else "cancelled"
+
+    def cancel(self, job_id: str, superseded_by: Optional[str] = None) -> Optional[dict]:
+        """Ask a job to stop issuing LLM calls; returns its record, or None if unknown."""
+        record = self.storage.get_job(job_id)
+        if record is None:
+            return None
+        if record["status"] not in FINISHED:
+            self.storage.put_job(_cancel_key(job_id), {
+                "document_id": record["document_id"],
+                "requested_at": time.time(),
+                "superseded_by": superseded_by,
+            })
+            with self._lock:
+                local = self._running.get(job_id)
+            if local is not None:
+                local.cancel_event.set()
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """Job record with per-article partial results, elapsed time and a naive ETA from the average article time."""
+        record = self.storage.get_job(job_id)
+        if record is None:
+            return None
+        partial: Dict[str, object] = dict(record.get("partial") or {})
+        for chunk in range(record.pop("partial_chunks", 0)):
+            partial.update((self.storage.get_job(_partial_key(job_id, chunk)) or {}).get("partial", {}))
+        record["partial"] = partial
+        if record["status"] not in FINISHED and self.storage.get_job(_cancel_key(job_id)) is not None:
+            record["cancel_requested"] = True
+        started = record.get("started_at")
+        if started:
+            end = record.get("finished_at") or time.time()
+            elapsed = end - started
+            record["elapsed_seconds"] = round(elapsed, 2)
+            done, total = record.get("completed", 0), record.get("total", 0)
+            if record["status"] == "running" and done:
+                record["eta_seconds"] = round(elapsed / done * max(0, total - done), 2)
+        return record
@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+from typing import Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # the standard library encoder is used instead
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # zstd responses are only offered when installed
+    zstandard = None
+
+# Response compression: auto (zstd when the client accepts it and zstandard is
+# installed, else gzip), gzip, or off; bodies smaller than the minimum are sent as-is
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "auto").strip().lower()
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "4096"))
+_GZIP_LEVEL = 5
+_ZSTD_LEVEL = 3
+
+
+# ----------------------------
+# Encoding
+# ----------------------------
+
+def dumps_bytes(obj: object, sort_keys: bool = False) -> bytes:
+    """UTF-8 JSON (orjson when installed; values it rejects fall back to the standard encoder)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys).encode("utf-8")
+
+
+def dumps(obj: object, sort_keys: bool = False) -> str:
+    return dumps_bytes(obj, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data):
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# ----------------------------
+# Compression
+# ----------------------------
+
+def choose_encoding(accept_encodings, mode: str = RESPONSE_COMPRESSION) -> Optional[str]:
+    """Content-Encoding to use for a client's Accept-Encoding (werkzeug accept object), or None."""
+    if mode == "off":
+        return None
+    offered = ["gzip"] if mode == "gzip" or zstandard is None else ["zstd", "gzip"]
+    return accept_encodings.best_match(offered)
+
+
+def compress(payload: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(payload)
+    return gzip.compress(payload, compresslevel=_GZIP_LEVEL)
+
+
+def maybe_compress(payload: bytes, accept_encodings) -> Tuple[bytes, Optional[str]]:
+    """(body, content encoding or None) for a response body, per RESPONSE_COMPRESSION and its size."""
+    if len(payload) < RESPONSE_COMPRESS_MIN_BYTES:
+        return payload, None
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return payload, None
+    return compress(payload, encoding), encoding
@@ -0,0 +1,192 @@
+import copy
+from typing import List, Set
+
+# JSON Patch (RFC 6902) between pipeline documents, so clients can send and
+# receive changes instead of the whole regulation JSON. Neither function
+# modifies its inputs: make_patch skips subtrees shared by identity (passes
+# copy only what they change), and apply_patch copies only the containers on
+# the paths it touches.
+
+
+class JsonPatchError(ValueError):
+    """A malformed patch, or an operation that does not apply to the document."""
+
+
+def _escape(token: object) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _tokens(pointer: object) -> List[str]:
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [_unescape(t) for t in pointer.split("/")[1:]]
+
+
+# ----------------------------
+# Diff
+# ----------------------------
+
+def make_patch(old: object, new: object) -> List[dict]:
+    """Operations turning `old` into `new` (apply with apply_patch)."""
+    ops: List[dict] = []
+    _diff(old, new, "", ops)
+    return ops
+
+
+def _diff(old: object, new: object, path: str, ops: List[dict]) -> None:
+    if old is new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, f"{path}/{_escape(key)}", ops)
+            else:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+    elif isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        for i in range(common):
+            _diff(old[i], new[i], f"{path}/{i}", ops)
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        for i in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+    elif type(old) is not type(new) or old != new:
+        ops.append({"op": "replace", "path": path, "value": new})
+
+
+# ----------------------------
+# Apply
+# ----------------------------
+
+def _index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid list index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"List index out of range: {index}")
+    return index
+
+
+def _get(doc: object, tokens: List[str]) -> object:
+    node = doc
+    for token in tokens:
+        if isinstance(node, dict):
+            if token not in node:
+                raise JsonPatchError(f"Missing key: {token!r}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f"Cannot descend into a {type(node).__name__} at {token!r}")
+    return node
+
+
+class _Patcher:
+    """Applies operations, shallow-copying each container on a modified path once."""
+
+    def __init__(self, doc: object):
+        self.root = doc
+        self._owned: Set[int] = set()
+
+    def _own(self, node):
+        if id(node) in self._owned:
+            return node
+        own = dict(node) if isinstance(node, dict) else list(node)
+        self._owned.add(id(own))
+        return own
+
+    def _parent(self, tokens: List[str]):
+        """The (owned) container holding the last token, copying containers along the way."""
+        if not isinstance(self.root, (dict, list)):
+            raise JsonPatchError("The document root is not a container")
+        self.root = node = self._own(self.root)
+        for token in tokens[:-1]:
+            if isinstance(node, dict):
+                if token not in node:
+                    raise JsonPatchError(f"Missing key: {token!r}")
+                key = token
+            elif isinstance(node, list):
+                key = _index(node, token, allow_end=False)
+            else:
+                raise JsonPatchError(f"Cannot descend into a {type(node).__name__} at {token!r}")
+            child = node[key]
+            if not isinstance(child, (dict, list)):
+                raise JsonPatchError(f"Cannot descend into a {type(child).__name__} at {token!r}")
+            node[key] = child = self._own(child)
+            node = child
+        return node
+
+    def add(self, tokens: List[str], value: object) -> None:
+        if not tokens:
+            self.root = value
+            return
+        parent = self._parent(tokens)
+        if isinstance(parent, dict):
+            parent[tokens[-1]] = value
+        else:
+            parent.insert(_index(parent, tokens[-1], allow_end=True), value)
+
+    def remove(self, tokens: List[str]) -> object:
+        if not tokens:
+            raise JsonPatchError("Cannot remove the document root")
+        parent = self._parent(tokens)
+        if isinstance(parent, dict):
+            if tokens[-1] not in parent:
+                raise JsonPatchError(f"Missing key: {tokens[-1]!r}")
+            return parent.pop(tokens[-1])
+        return parent.pop(_index(parent, tokens[-1], allow_end=False))
+
+    def replace(self, tokens: List[str], value: object) -> None:
+        if not tokens:
+            self.root = value
+            return
+        parent = self._parent(tokens)
+        if isinstance(parent, dict):
+            if tokens[-1] not in parent:
+                raise JsonPatchError(f"Missing key: {tokens[-1]!r}")
+            parent[tokens[-1]] = value
+        else:
+            parent[_index(parent, tokens[-1], allow_end=False)] = value
+
+
+def apply_patch(doc: object, patch: List[dict]) -> object:
+    """A new document with `patch` applied; `doc` itself is left unchanged."""
+    if not isinstance(patch, list):
+        raise JsonPatchError("A JSON Patch must be a list of operations")
+    patcher = _Patcher(doc)
+    for n, op in enumerate(patch):
+        if not isinstance(op, dict) or "path" not in op:
+            raise JsonPatchError(f"Operation {n} needs an 'op' and a 'path'")
+        kind = op.get("op")
+        tokens = _tokens(op["path"])
+        if kind in ("add", "replace", "test") and "value" not in op:
+            raise JsonPatchError(f"Operation {n} ({kind}) needs a 'value'")
+        if kind == "add":
+            patcher.add(tokens, op["value"])
+        elif kind == "remove":
+            patcher.remove(tokens)
+        elif kind == "replace":
+            patcher.replace(tokens, op["value"])
+        elif kind in ("move", "copy"):
+            source = _tokens(op.get("from"))
+            if kind == "move" and tokens[:len(source)] == source and len(tokens) > len(source):
+                raise JsonPatchError(f"Operation {n} moves a value into itself")
+            # A copied value must not share containers this patch may still modify in place
+            value = patcher.remove(source) if kind == "move" else copy.deepcopy(_get(patcher.root, source))
+            patcher.add(tokens, value)
+        elif kind == "test":
+            if _get(patcher.root, tokens) != op["value"]:
+                raise JsonPatchError(f"Test failed at {op['path']!r}")
+        else:
+            raise JsonPatchError(f"Unknown operation {kind!r}")
+    return patcher.root
+
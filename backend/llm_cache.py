@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# How often (seconds) a process deletes expired rows; reads check the TTL of each row themselves
+_EXPIRY_SWEEP_SECONDS = 60
+
+# ----------------------------
+# Persistent, content-addressed LLM response cache
+# ----------------------------
+
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_cache(enabled: bool = True):
+    """Skip cache reads (responses are still stored) for calls made in this context."""
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def is_bypassed() -> bool:
+    return _bypass.get()
+
+
+def make_key(model: str, temperature: float, response_format: Optional[dict], messages: list) -> str:
+    """SHA-256 over the request parameters that determine the response."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "response_format": response_format,
+            "messages": messages,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed response cache with TTL and size-based LRU eviction.
+
+    Safe to share between threads and between processes using the same file.
+    The total size is kept in a one-row table by triggers, so a put only scans
+    for victims when the cache is actually over max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._last_expiry = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses(created_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL)")
+            # Caches created before the totals table start from the current sum
+            conn.execute("INSERT OR IGNORE INTO totals (id, bytes) SELECT 1, COALESCE(SUM(size), 0) FROM responses")
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses"
+                " BEGIN UPDATE totals SET bytes = bytes + NEW.size WHERE id = 1; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses"
+                " BEGIN UPDATE totals SET bytes = bytes - OLD.size WHERE id = 1; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_resize AFTER UPDATE OF size ON responses"
+                " BEGIN UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 1; END"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection for one transaction (committed on success), closed afterwards."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count(row is not None)
+        return row[0] if row else None
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._connect() as conn:
+            # An upsert (not INSERT OR REPLACE) so the size triggers see the replaced row
+            conn.execute(
+                "INSERT INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size,"
+                " created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, value, size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _total_bytes(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT bytes FROM totals WHERE id = 1").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows (at most once per sweep interval), then least recently used rows until under max_bytes."""
+        if self.ttl_seconds and now - self._last_expiry >= _EXPIRY_SWEEP_SECONDS:
+            self._last_expiry = now
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._total_bytes(conn)
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self._total_bytes(conn)
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": (hits / lookups) if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,259 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import openai
+
+from concurrency import RateLimiter, retry_with_backoff
+from metrics import llm_hedges, llm_retries
+
+try:
+    import httpx
+except ImportError:  # only needed to size the connection pool explicitly
+    httpx = None
+
+# Which API the passes talk to:
+#   openai             api.openai.com with OPENAI_API_KEY (default)
+#   openai_compatible  any server speaking the OpenAI chat API at LLM_BASE_URL (vLLM, Ollama, LM Studio, ...)
+#   stub               llm_stub.StubClient, no network (LLM_STUB_LATENCY seconds per call)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").strip().lower()
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0"))
+
+# HTTP keep-alive pool, per-attempt timeout and overall deadline per call including retries (0 = none)
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "32"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "300"))
+
+# Hedged requests: when a call is slower than the recent LLM_HEDGE_QUANTILE latency for its
+# model, send one duplicate and use whichever answers first (costs the duplicate's tokens)
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") not in ("0", "false", "False")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+
+_JSON_MODE = {"type": "json_object"}
+
+
+# ----------------------------
+# Errors and retry policy
+# ----------------------------
+
+class DeadlineExceeded(TimeoutError):
+    """The call's overall deadline passed before an answer arrived."""
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """429s, 5xx, timeouts and dropped connections are worth retrying."""
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Read a Retry-After hint from the error response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RetryPolicy:
+    """Jittered exponential backoff on retryable errors (see concurrency.retry_with_backoff)."""
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+
+# ----------------------------
+# Latency tracking
+# ----------------------------
+
+class LatencyTracker:
+    """Recent successful call latencies per model, for the hedging threshold."""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self._window)).append(seconds)
+
+    def quantile(self, model: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """The q-quantile of recent latencies, or None with fewer than min_samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            models = list(self._samples)
+        return {
+            m: {"samples": len(self._samples[m]), "p50": self.quantile(m, 0.5), "p95": self.quantile(m, 0.95)}
+            for m in models
+        }
+
+
+# ----------------------------
+# Client
+# ----------------------------
+
+class LLMClient:
+    """Chat completions with rate limiting, per-call deadlines, retries and optional hedging.
+
+    `raw` is any object with the OpenAI SDK's `chat.completions.create(...)`;
+    swap it (e.g. for llm_stub.StubClient) to change where requests go.
+    """
+
+    def __init__(
+        self,
+        raw,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry: Optional[RetryPolicy] = None,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        deadline: float = LLM_DEADLINE_SECONDS,
+        hedge: bool = LLM_HEDGE,
+        hedge_quantile: float = LLM_HEDGE_QUANTILE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        hedge_min_delay: float = LLM_HEDGE_MIN_DELAY,
+        max_in_flight: int = LLM_POOL_CONNECTIONS,
+    ):
+        self.raw = raw
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry = retry or RetryPolicy()
+        self.timeout = timeout
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+        self._max_in_flight = max(2, max_in_flight)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hedged, wins = self.hedged, self.hedge_wins
+        return {"hedged": hedged, "hedge_wins": wins, "latency": self.latency.summary()}
+
+    def complete(self, model: str, messages: List[dict], tokens: int = 0, response_format: Optional[dict] = _JSON_MODE):
+        """One chat completion (temperature 0, JSON mode by default); `tokens` is the estimate for the rate limiter."""
+        deadline = time.monotonic() + self.deadline if self.deadline > 0 else None
+
+        def attempt():
+            self.rate_limiter.acquire(tokens)
+            return self._hedged(model, messages, response_format, deadline)
+
+        return retry_with_backoff(
+            attempt,
+            is_retryable=is_retryable_error,
+            max_retries=self.retry.max_retries,
+            base_delay=self.retry.base_delay,
+            max_delay=self.retry.max_delay,
+            retry_after=retry_after_seconds,
+            deadline=deadline,
+            on_retry=lambda e: llm_retries.inc(model=model, error=type(e).__name__),
+        )
+
+    def _send(self, model: str, messages: List[dict], response_format: Optional[dict], deadline: Optional[float]):
+        timeout = self.timeout if self.timeout > 0 else None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"LLM call to {model} exceeded its {self.deadline:.0f}s deadline")
+            timeout = min(timeout, remaining) if timeout else remaining
+        params = {"model": model, "messages": messages, "temperature": 0, "timeout": timeout}
+        if response_format is not None:
+            params["response_format"] = response_format
+        started = time.monotonic()
+        response = self.raw.chat.completions.create(**params)
+        self.latency.record(model, time.monotonic() - started)
+        return response
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        threshold = self.latency.quantile(model, self.hedge_quantile, self.hedge_min_samples)
+        return None if threshold is None else max(threshold, self.hedge_min_delay)
+
+    def _submit(self, *args):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._max_in_flight, thread_name_prefix="llm-hedge")
+        return self._pool.submit(contextvars.copy_context().run, self._send, *args)
+
+    def _hedged(self, model: str, messages: List[dict], response_format: Optional[dict], deadline: Optional[float]):
+        """Send the request; if it is slower than the hedge threshold, race a duplicate against it."""
+        hedge_after = self._hedge_delay(model)
+        if hedge_after is None:
+            return self._send(model, messages, response_format, deadline)
+
+        primary = self._submit(model, messages, response_format, deadline)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+        with self._lock:
+            self.hedged += 1
+        backup = self._submit(model, messages, response_format, deadline)
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    llm_hedges.inc(outcome="won" if future is backup else "lost")
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+
+def build_llm_client(
+    backend: str = LLM_BACKEND,
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = LLM_BASE_URL,
+    **options,
+) -> LLMClient:
+    """LLMClient for LLM_BACKEND; `options` go to LLMClient (rate_limiter, retry, timeout, ...)."""
+    if backend == "stub":
+        from llm_stub import StubClient
+        return LLMClient(StubClient(latency=LLM_STUB_LATENCY), **options)
+    if backend not in ("openai", "openai_compatible"):
+        raise RuntimeError(f"Unknown LLM_BACKEND: {backend} (expected openai, openai_compatible or stub)")
+    if backend == "openai" and not api_key:
+        raise RuntimeError("OPENAI_API_KEY missing. Add it to your .env")
+    if backend == "openai_compatible" and not base_url:
+        raise RuntimeError("LLM_BASE_URL missing. Set it to the server's OpenAI-compatible /v1 URL")
+
+    http_client = None
+    if httpx is not None:
+        limits = httpx.Limits(max_connections=LLM_POOL_CONNECTIONS, max_keepalive_connections=LLM_POOL_CONNECTIONS)
+        http_client = openai.DefaultHttpxClient(limits=limits)
+    raw = openai.OpenAI(
+        api_key=api_key or "not-needed",
+        base_url=base_url if backend == "openai_compatible" else None,
+        timeout=LLM_TIMEOUT_SECONDS if LLM_TIMEOUT_SECONDS > 0 else None,
+        max_retries=0,  # LLMClient retries, with the shared backoff policy
+        http_client=http_client,
+    )
+    return LLMClient(raw, **options)
@@ -0,0 +1,190 @@
+import json
+import random
+import re
+import threading
+import time
+import types
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import openai
+
+# A local stand-in for the OpenAI client: same `client.chat.completions.create(...)`
+# surface, answers the pipeline's prompts with plausible JSON, and can simulate
+# latency, slow outliers and API errors. Used by the benchmarks; costs nothing.
+
+_BATCH_HEADER_RE = re.compile(r"^=== Article (\d+) ===$", re.MULTILINE)
+_TOC_LINE_RE = re.compile(r"^\s*((?:Article|Section|Chapter|Part)\s+[\dIVXLC]+\b[^\n]*?)(?:\s*\.{3,}\s*\d+|\s+\d+)?\s*$", re.MULTILINE)
+_ITEM_MARKER_RE = re.compile(r"^[ \t]*(\(\d+\)|\([a-z]\)|\d+\.)[ \t]+", re.MULTILINE)
+_HIERARCHY_RE = re.compile(r"^[ \t]*((?:CHAPTER|Chapter|PART|Part|TITLE|Title)[ \t]+[\dIVXLC]+\b[^\n]*)$", re.MULTILINE)
+
+Responder = Callable[[List[dict]], dict]
+
+
+# ----------------------------
+# Default answers
+# ----------------------------
+
+def _split_items(content: str) -> List[dict]:
+    marks = list(_ITEM_MARKER_RE.finditer(content))
+    if not marks:
+        return [{"ref": "1", "content": content.strip()}] if content.strip() else []
+    items = []
+    for m, nxt in zip(marks, marks[1:] + [None]):
+        items.append({"ref": m.group(1), "content": content[m.start():nxt.start() if nxt else len(content)].strip()})
+    return items
+
+
+def _path_for(content: str) -> List[str]:
+    return [m.group(1).strip() for m in _HIERARCHY_RE.finditer(content)][:2]
+
+
+def _after(text: str, marker: str) -> str:
+    return text.split(marker, 1)[1] if marker in text else ""
+
+
+def default_response(messages: List[dict]) -> dict:
+    """Answer a headings, items or path prompt (single or batched) from the prompt text itself."""
+    text = messages[-1].get("content") or ""
+    if "=== Article " in text:
+        headers = list(_BATCH_HEADER_RE.finditer(text))
+        answers = {}
+        for m, nxt in zip(headers, headers[1:] + [None]):
+            section = text[m.end():nxt.start() if nxt else len(text)]
+            if text.startswith("Task: Split"):
+                answers[m.group(1)] = {"items": _split_items(_after(section, "Article content (verbatim):\n"))}
+            else:
+                answers[m.group(1)] = {"path": _path_for(_after(section, "Article content:\n"))}
+        return {"articles": answers}
+    if text.startswith("Task: Split"):
+        return {"items": _split_items(_after(text, "Article content (verbatim):\n"))}
+    if "hierarchical path" in text:
+        return {"path": _path_for(_after(text, "Article content:\n"))}
+    if "PDF text:" in text:
+        excerpt = _after(text, "PDF text:\n")
+        first_line = next((ln.strip() for ln in excerpt.splitlines() if ln.strip()), "")
+        titles = [m.group(1).strip() for m in _TOC_LINE_RE.finditer(excerpt)]
+        return {
+            "regulation": {"title": first_line, "url": ""},
+            "articles": [{"title": t, "content": "", "items": [], "path": []} for t in titles],
+        }
+    return {}
+
+
+# ----------------------------
+# Stub client
+# ----------------------------
+
+class _StubResponse:
+    """Just enough of an httpx response for openai's error classes."""
+
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.headers = {}
+        self.request = None
+
+
+def _api_error(status: int) -> openai.APIStatusError:
+    response = _StubResponse(status)
+    if status == 429:
+        return openai.RateLimitError("stub: rate limited", response=response, body=None)
+    if status >= 500:
+        return openai.InternalServerError(f"stub: server error {status}", response=response, body=None)
+    return openai.APIStatusError(f"stub: error {status}", response=response, body=None)
+
+
+class StubClient:
+    """Drop-in for `OpenAI()`: `utils.llm.raw = StubClient(...)`, or LLM_BACKEND=stub.
+
+    Each call sleeps `latency + per_token_delay * tokens` (+ up to `jitter`),
+    and with probability `tail_rate` an extra `tail_latency`; a call slower than
+    its `timeout` argument raises openai.APITimeoutError. With probability
+    `error_rate` it raises an API error with a status from `error_statuses`.
+    `responses` is a list of (substring, payload or callable(messages)) pairs
+    checked against the last message before the default answers.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        per_token_delay: float = 0.0,
+        jitter: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Sequence[int] = (429, 500),
+        responses: Optional[List[Tuple[str, Union[dict, Responder]]]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.per_token_delay = per_token_delay
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.responses = list(responses or [])
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+    def _answer(self, messages: List[dict]) -> dict:
+        text = messages[-1].get("content") or ""
+        for needle, payload in self.responses:
+            if needle in text:
+                return payload(messages) if callable(payload) else payload
+        return default_response(messages)
+
+    def create(self, model: str, messages: List[dict], timeout: Optional[float] = None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            roll, jitter, tail = self._random.random(), self._random.random(), self._random.random()
+            status = self._random.choice(self.error_statuses) if self.error_statuses else 500
+
+        content = json.dumps(self._answer(messages), ensure_ascii=False)
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        delay = self.latency + self.per_token_delay * (prompt_tokens + completion_tokens) + jitter * self.jitter
+        if tail < self.tail_rate:
+            delay += self.tail_latency
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            with self._lock:
+                self.errors += 1
+            raise openai.APITimeoutError(request=None)
+        if delay > 0:
+            time.sleep(delay)
+
+        if roll < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise _api_error(status)
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        message = types.SimpleNamespace(role="assistant", content=content)
+        return types.SimpleNamespace(
+            model=model,
+            choices=[types.SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=types.SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
@@ -0,0 +1,132 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Optional
+
+# Structured logging: one JSON object per line on stderr (LOG_FORMAT=text for a readable
+# console), gated by LOG_LEVEL. Records are formatted on the calling thread (so request and
+# document ids are captured) and written by a background listener, so callers never block on I/O.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").strip().lower()
+
+_ROOT = "isplit"
+_context: contextvars.ContextVar = contextvars.ContextVar("isplit_log_context", default={})
+
+
+def fields(**values) -> dict:
+    """`extra=` argument carrying structured fields: log.info("...", extra=fields(articles=12))."""
+    return {"fields": values}
+
+
+def set_log_context(**values) -> None:
+    """Add ids (request_id, document_id, job_id, ...) to every record logged from this context."""
+    _context.set({**_context.get(), **{k: v for k, v in values.items() if v is not None}})
+
+
+def reset_log_context(**values) -> None:
+    """Start a fresh context (e.g. per request), optionally with initial ids."""
+    _context.set({k: v for k, v in values.items() if v is not None})
+
+
+def get_log_context() -> dict:
+    return dict(_context.get())
+
+
+# ----------------------------
+# Formatting
+# ----------------------------
+
+class _ContextFilter(logging.Filter):
+    """Copy the caller's context ids onto the record before it crosses to the listener thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _context.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", None) or {})
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        extras = {**(getattr(record, "context", None) or {}), **(getattr(record, "fields", None) or {})}
+        line = (
+            f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} "
+            f"[{record.name}] {record.getMessage()}"
+        )
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _PreformattedQueueHandler(logging.handlers.QueueHandler):
+    """Format on the caller's thread; the listener only writes the finished line."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        line = self.format(record)
+        return logging.makeLogRecord({"msg": line, "levelno": record.levelno, "levelname": record.levelname})
+
+
+# ----------------------------
+# Setup
+# ----------------------------
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None) -> None:
+    """Attach the queue handler to the 'isplit' logger (idempotent; call again to reconfigure)."""
+    global _listener
+    root = logging.getLogger(_ROOT)
+    if _listener is not None:
+        _listener.stop()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+    records: "queue.SimpleQueue" = queue.SimpleQueue()
+    handler = _PreformattedQueueHandler(records)
+    handler.addFilter(_ContextFilter())
+    handler.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter("%(message)s"))
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level, logging.INFO))
+    root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under 'isplit' (e.g. get_logger("utils") -> isplit.utils)."""
+    if _listener is None:
+        configure_logging()
+    return logging.getLogger(f"{_ROOT}.{name}")
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
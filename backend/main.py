@@ -1,7 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
-import json
+import contextvars
+import queue
+import threading
+import time
+import uuid
+from functools import partial
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 
 # Import the working pipeline functions
@@ -10,170 +17,500 @@ from utils import (
     run_splitter_1 as pipeline_splitter_1,
     run_llm_pass_2 as pipeline_llm_pass_2,
     run_llm_pass_3 as pipeline_llm_pass_3,
+    PassCancelled,
+    ResultReuse,
+    llm_cache,
 )
+import json_codec
+from jobs import JobManager
+from json_patch import JsonPatchError, apply_patch, make_patch
+from llm_cache import bypass_cache
+from logs import fields, get_log_context, get_logger, reset_log_context, set_log_context
+from metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, end_trace, http_request_seconds, start_trace
+from sessions import registry
+from toc_detect import TOC_DETECT_MAX_PAGES, detect_toc
+from validation_index import validation_report
+
+class _FastJSONProvider(DefaultJSONProvider):
+    """jsonify and request.get_json through json_codec (orjson when installed)."""
+
+    def dumps(self, obj, **kwargs):
+        if 'indent' in kwargs:  # pretty-printed responses in debug mode
+            return super().dumps(obj, **kwargs)
+        return json_codec.dumps(obj, sort_keys=self.sort_keys)
+
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s)
 
 app = Flask(__name__)
+app.json = _FastJSONProvider(app)
 CORS(app)
+log = get_logger("api")
+
+# Uploads larger than this are rejected with 413. Werkzeug spools file parts to a
+# temp file (TMPDIR) while parsing, and the PDF is then copied to storage in chunks
+# and memory-mapped, so a large upload is never held whole in memory.
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "256"))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024 if MAX_UPLOAD_MB > 0 else None
+
+# Background executor for {"async": true} pass requests
+jobs = JobManager(registry.storage)
+
+@app.before_request
+def _start_request_metrics():
+    """Time every request; start a trace when it asks for one (trace=1 in the query, form or JSON body)."""
+    g.request_started = time.perf_counter()
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12]
+    reset_log_context(request_id=g.request_id)
+    body = request.get_json(silent=True) if request.is_json else None
+    wants_trace = request.args.get('trace') or request.form.get('trace') or (body.get('trace') if isinstance(body, dict) else None)
+    if _truthy(wants_trace):
+        g.trace = start_trace(f"{request.method} {request.path}")
+
+@app.after_request
+def _compress_response(response):
+    """gzip/zstd-compress large JSON responses for clients that accept it (RESPONSE_COMPRESSION); runs last."""
+    if response.is_streamed or response.direct_passthrough or not response.is_json or 'Content-Encoding' in response.headers:
+        return response
+    payload, encoding = json_codec.maybe_compress(response.get_data(), request.accept_encodings)
+    if encoding:
+        response.set_data(payload)
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.after_request
+def _finish_request_metrics(response):
+    """Record the request latency, log it (sizes only) and attach the span tree to traced JSON responses (not streams)."""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    http_request_seconds.observe(elapsed, route=route, method=request.method, status=response.status_code)
+    trace = g.pop('trace', None)
+    if trace is not None:
+        tree = end_trace(*trace)
+        if response.is_json and not response.is_streamed:
+            payload = response.get_json()
+            if isinstance(payload, dict):
+                payload['trace'] = tree
+                response.set_data(json_codec.dumps_bytes(payload))
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    log.info(
+        "Request finished",
+        extra=fields(
+            method=request.method,
+            route=route,
+            status=response.status_code,
+            duration_ms=round(elapsed * 1000, 1),
+            request_bytes=request.content_length or 0,
+            response_bytes=None if response.is_streamed else response.calculate_content_length(),
+        ),
+    )
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def _upload_too_large(_error):
+    return jsonify({'status': 'error', 'message': f'Upload exceeds the {MAX_UPLOAD_MB} MB limit (MAX_UPLOAD_MB)'}), 413
+
+# Each upload gets a document id; every endpoint takes that id and reads the
+# PDF and intermediate JSON from the session registry, which is backed by shared
+# storage (STORAGE_URL) so any worker process can serve any step.
+
+def _session_or_error(payload):
+    """Return (session, None) for payload['document_id'], or (None, error response)."""
+    document_id = payload.get('document_id')
+    if not document_id:
+        return None, (jsonify({'status': 'error', 'message': 'No document_id provided. Upload a PDF with LLM Pass 1 first.'}), 400)
+    set_log_context(document_id=document_id)
+    session = registry.get(document_id)
+    if session is None:
+        return None, (jsonify({'status': 'error', 'message': f'Unknown or expired document_id: {document_id}'}), 404)
+    return session, None
+
+def _input_document(session, body):
+    """
+    (document, None) for a pass: json_data, else the document's last state, with
+    json_patch (a JSON Patch list of operations) applied when given; or (None, error response).
+    """
+    data_in = body.get('json_data') or session.data
+    patch = body.get('json_patch')
+    if patch is not None:
+        try:
+            data_in = apply_patch(data_in or {}, patch)
+        except JsonPatchError as e:
+            return None, (jsonify({'status': 'error', 'message': f'Invalid json_patch: {e}'}), 400)
+        log.info("Applied json_patch", extra=fields(operations=len(patch)))
+    return data_in, None
+
+def _document_payload(body, data_in, data_out):
+    """{'data': data_out}, or {'patch': ...} turning data_in into data_out when the client sent delta=true."""
+    if _truthy(body.get('delta')):
+        return {'patch': make_patch(data_in, data_out)}
+    return {'data': data_out}
+
+def _truthy(value) -> bool:
+    """Interpret form/JSON flags such as no_cache=1 / "true" / true."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def _result_reuse(session, field, body):
+    """
+    Results of the document's previous run of a pass, so unchanged articles are not re-sent.
+    Pass incremental=false (or no_cache) to recompute every article.
+    """
+    if _truthy(body.get('no_cache')) or not _truthy(body.get('incremental', True)):
+        return ResultReuse(field)
+    return ResultReuse(field, session.fingerprints.get(field))
 
-# No persistent upload directory needed; process PDFs in memory
+def _start_pass_job(session, kind, pipeline_fn, data_in, no_cache, reuse):
+    """Run a per-article pass in the background; returns a 202 response with the job id."""
+    document_id = session.document_id
+    log_context = get_log_context()
 
-# In-memory state for the current session
-STATE = {
-    'pdf_bytes': None,  # in-memory PDF
-    'pdf_name': None,
-    'excerpt': '',
-    'data': None,
-}
+    def run(progress, cancel_event):
+        reset_log_context(**log_context, job=kind)
+        with bypass_cache(no_cache):
+            data_working, _ = pipeline_fn(
+                data_in,
+                out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs'),
+                progress=progress,
+                cancel_event=cancel_event,
+                reuse=reuse,
+            )
+        return data_working
+
+    def on_success(data_working):
+        latest = registry.get(document_id)
+        if latest is not None:
+            latest.set_data(data_working)
+            latest.set_fingerprints(reuse.field, reuse.current)
+            registry.save(latest)
+        return {'reuse': reuse.summary()}
+
+    record = jobs.submit(document_id, kind, len(data_in.get('articles', [])), run, on_success, cancelled_error=PassCancelled)
+    log.info("Started background job", extra=fields(kind=kind, job_id=record['job_id']))
+    return jsonify({'status': 'accepted', 'document_id': document_id, 'job_id': record['job_id'], 'job': record}), 202
+
+def _stream_format(body):
+    """'ndjson' or 'sse' when the client asked for a streamed response, else None."""
+    stream = body.get('stream')
+    if isinstance(stream, str) and stream.strip().lower() in ('ndjson', 'sse'):
+        return stream.strip().lower()
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        return 'sse'
+    return 'ndjson' if _truthy(stream) else None
+
+def _encode_event(event, fmt):
+    line = json_codec.dumps(event)
+    if fmt == 'sse':
+        return f"event: {event['event']}\ndata: {line}\n\n"
+    return line + "\n"
+
+def _stream_pass(session, field, pipeline_fn, data_in, no_cache, reuse, fmt):
+    """
+    Run a per-article pass and stream each article's result as soon as it is ready,
+    then a final summary event (with the updated JSON). Stops issuing LLM calls if
+    the client disconnects.
+    """
+    articles = data_in.get('articles', [])
+    events = queue.Queue()
+    cancel_event = threading.Event()
+    finished = object()
+
+    def progress(article_index, total, result):
+        events.put({
+            'event': 'article',
+            'index': article_index,
+            'total': total,
+            'title': articles[article_index].get('title', ''),
+            field: result,
+        })
+
+    def run():
+        started = time.time()
+        try:
+            with bypass_cache(no_cache):
+                data_working, _ = pipeline_fn(
+                    data_in,
+                    out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs'),
+                    progress=progress,
+                    cancel_event=cancel_event,
+                    reuse=reuse,
+                )
+            session.set_data(data_working)
+            session.set_fingerprints(field, reuse.current)
+            registry.save(session)
+            events.put({
+                'event': 'summary',
+                'status': 'success',
+                'document_id': session.document_id,
+                'articles': len(articles),
+                'reuse': reuse.summary(),
+                'elapsed_seconds': round(time.time() - started, 2),
+                'data': data_working,
+            })
+        except PassCancelled:
+            log.info("Client disconnected; stopped streamed pass", extra=fields(field=field))
+        except Exception as e:
+            log.exception("Streamed pass failed", extra=fields(field=field))
+            events.put({'event': 'summary', 'status': 'error', 'message': str(e)})
+        finally:
+            events.put(finished)
+
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+
+    def generate():
+        try:
+            while True:
+                event = events.get()
+                if event is finished:
+                    break
+                yield _encode_event(event, fmt)
+        finally:
+            cancel_event.set()
+
+    mimetype = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    return Response(generate(), mimetype=mimetype, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/llm-pass-1', methods=['POST'])
 def llm_pass_1():
     """
     LLM Pass 1 endpoint
-    Accepts multipart/form-data with 'pdf' file and JSON fields index_page_start, index_page_end.
-    Processes the PDF entirely in memory and returns the headings JSON.
+    Accepts multipart/form-data with 'pdf' file and fields index_page_start, index_page_end
+    (or document_id instead of 'pdf' to re-run on an uploaded document).
+    Omit index_page_start (or send "auto") to detect the TOC pages from the page text.
+    The upload is streamed to storage and memory-mapped; returns the document id and headings JSON.
     """
     try:
-        # Try file upload first (multipart)
+        data = request.form.to_dict() if request.form else (request.get_json(silent=True) or {})
+
+        # Try file upload first (multipart); otherwise re-run on an existing document
         pdf_file = request.files.get('pdf')
         if pdf_file:
             filename = secure_filename(pdf_file.filename)
-            STATE['pdf_bytes'] = pdf_file.read()
-            STATE['pdf_name'] = filename
-            print(f"[LLM-PASS-1] PDF received: {filename} ({len(STATE['pdf_bytes'] or b'')} bytes)")
-        
-        # Fallback to JSON body
-        data = request.form.to_dict() if request.form else (request.json or {})
-        index_page_start = int(data.get('index_page_start') or 1)
-        index_page_end = int(data.get('index_page_end') or index_page_start)
-
-        if not STATE.get('pdf_bytes'):
+            if data.get('document_id'):
+                # A fresh upload replaces the caller's previous document
+                registry.remove(data['document_id'])
+            try:
+                session = registry.create(pdf_file.stream, filename)
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            set_log_context(document_id=session.document_id)
+            log.info("PDF received", extra=fields(pdf_bytes=session.document.size, mapped=session.document.mapped))
+        elif data.get('document_id'):
+            session, error = _session_or_error(data)
+            if error:
+                return error
+        else:
             return jsonify({'status': 'error', 'message': 'No PDF uploaded'}), 400
 
-        print(f"[LLM-PASS-1] Processing TOC pages: {index_page_start}-{index_page_end}")
+        toc_detection = None
+        if str(data.get('index_page_start') or 'auto').strip().lower() == 'auto':
+            toc_detection = detect_toc(session.document)
+            index_page_start, index_page_end = (
+                (toc_detection['toc_start'], toc_detection['toc_end']) if toc_detection else (1, 1)
+            )
+            log.info("Detected TOC pages", extra=fields(detected=toc_detection is not None, index_pages=[index_page_start, index_page_end]))
+        else:
+            index_page_start = int(data.get('index_page_start'))
+            index_page_end = int(data.get('index_page_end') or index_page_start)
 
-        headings_json, excerpt, _ = pipeline_llm_pass_1(
-            STATE['pdf_bytes'],
-            (index_page_start, index_page_end),
-            out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs'),
-        )
-        STATE['excerpt'] = excerpt
-        STATE['data'] = headings_json
-        STATE['last_index_start'] = index_page_start
-        STATE['last_index_end'] = index_page_end
+        with bypass_cache(_truthy(data.get('no_cache'))):
+            headings_json, excerpt, _ = pipeline_llm_pass_1(
+                session.document,
+                (index_page_start, index_page_end),
+                out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs'),
+            )
+        session.set_excerpt(excerpt)
+        session.set_data(headings_json)
+        session.set_index_pages((index_page_start, index_page_end))
+        registry.save(session)
 
-        print(f"[LLM-PASS-1] Extracted {len(headings_json.get('articles', []))} articles")
-        return jsonify({'status': 'success', 'data': headings_json})
+        return jsonify({
+            'status': 'success',
+            'document_id': session.document_id,
+            'data': headings_json,
+            'index_pages': [index_page_start, index_page_end],
+            'toc_detection': toc_detection,
+        })
     
     except Exception as e:
-        print(f"[LLM-PASS-1 ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("LLM Pass 1 failed")
         return jsonify({'status': 'error', 'message': f'LLM Pass 1 error: {str(e)}'}), 500
 
 @app.route('/api/llm-pass-2', methods=['POST'])
 def llm_pass_2():
     """
     LLM Pass 2 endpoint
-    Payload (JSON): json_data (optional; defaults to last state)
-    Processes items for each article sequentially and returns updated JSON.
+    Payload (JSON): document_id, json_data (optional; defaults to the document's last state),
+    async (optional; run as a background job and return its id immediately),
+    stream (optional; "ndjson" / "sse" / true to stream each article's result as it finishes),
+    incremental (optional, default true; reuse results for articles unchanged since the last run),
+    rules_first (optional; split locally and send only low-confidence articles to the LLM),
+    json_patch (optional; JSON Patch operations applied to json_data / the last state instead of resending it),
+    delta (optional; respond with 'patch', the operations turning the input into the result, instead of 'data')
+    Processes items for each article (concurrently, in order) and returns updated JSON.
     """
     try:
         body = request.json or {}
-        data_in = body.get('json_data') or STATE.get('data')
+        session, error = _session_or_error(body)
+        if error:
+            return error
+        data_in, error = _input_document(session, body)
+        if error:
+            return error
         if not data_in:
             return jsonify({'status': 'error', 'message': 'No JSON provided. Run previous steps first.'}), 400
 
-        print(f"[LLM-PASS-2] Processing {len(data_in.get('articles', []))} articles for items extraction")
-        
-        data_working, _ = pipeline_llm_pass_2(
-            data_in,
-            out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs')
-        )
+        reuse = _result_reuse(session, 'items', body)
+        pass_2 = pipeline_llm_pass_2
+        if 'rules_first' in body:
+            pass_2 = partial(pipeline_llm_pass_2, rules_first=_truthy(body.get('rules_first')))
+        if _truthy(body.get('async')):
+            return _start_pass_job(session, 'llm-pass-2', pass_2, data_in, _truthy(body.get('no_cache')), reuse)
+        stream_format = _stream_format(body)
+        if stream_format:
+            return _stream_pass(session, 'items', pass_2, data_in, _truthy(body.get('no_cache')), reuse, stream_format)
 
-        STATE['data'] = data_working
-        print(f"[LLM-PASS-2] Completed items extraction for all articles")
-        return jsonify({'status': 'success', 'data': data_working})
+        with bypass_cache(_truthy(body.get('no_cache'))):
+            data_working, _ = pass_2(
+                data_in,
+                out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs'),
+                reuse=reuse,
+            )
+
+        session.set_data(data_working)
+        session.set_fingerprints('items', reuse.current)
+        registry.save(session)
+        return jsonify({'status': 'success', 'document_id': session.document_id, **_document_payload(body, data_in, data_working), 'reuse': reuse.summary()})
     
     except Exception as e:
-        print(f"[LLM-PASS-2 ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("LLM Pass 2 failed")
         return jsonify({'status': 'error', 'message': f'LLM Pass 2 error: {str(e)}'}), 500
 
 @app.route('/api/splitter-1', methods=['POST'])
 def splitter_1():
     """
     Splitter 1 endpoint
-    Payload (JSON): json_data (user-corrected headings)
+    Payload (JSON): document_id, json_data (user-corrected headings),
+    json_patch / delta (optional; see llm_pass_2)
     """
     try:
         body = request.json or {}
-        print(f"[SPLITTER-1] Received body: {body}")
-        print(f"[SPLITTER-1] Current STATE keys: {list(STATE.keys())}")
-        print(f"[SPLITTER-1] STATE data exists: {STATE.get('data') is not None}")
-        
-        json_in = body.get('json_data') or STATE.get('data')
-        
+        session, error = _session_or_error(body)
+        if error:
+            return error
+
+        json_in, error = _input_document(session, body)
+        if error:
+            return error
+
         # TOC range belongs to LLM Pass 1 only; Splitter derives body as (TOC end + 1 .. end)
-        index_page_start = int(STATE.get('last_index_start') or 1)
-        index_page_end = int(STATE.get('last_index_end') or index_page_start)
+        index_page_start, index_page_end = session.index_pages or (1, 1)
 
-        if not STATE.get('pdf_bytes'):
-            return jsonify({'status': 'error', 'message': 'No PDF uploaded yet'}), 400
         if not json_in:
             return jsonify({'status': 'error', 'message': 'No JSON provided. Run LLM Pass 1 first.'}), 400
 
-        print(f"[SPLITTER-1] Processing with TOC range: {index_page_start}-{index_page_end}")
-        print(f"[SPLITTER-1] PDF in memory: {STATE.get('pdf_name')} ({len(STATE.get('pdf_bytes') or b'')} bytes)")
-        print(f"[SPLITTER-1] Articles count: {len(json_in.get('articles', []))}")
-        print(f"[SPLITTER-1] JSON data source: {'from request' if body.get('json_data') else 'from STATE'}")
+        log.info(
+            "Splitter 1 started",
+            extra=fields(
+                index_pages=[index_page_start, index_page_end],
+                articles=len(json_in.get('articles', [])),
+                json_source='request' if body.get('json_data') else 'session',
+                patched='json_patch' in body,
+            ),
+        )
 
         final_json, _ = pipeline_splitter_1(
-            STATE['pdf_bytes'],
+            session.document,
             (index_page_start, index_page_end),
             json_in,
             source_excerpt=None,
             out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs'),
         )
-        STATE['data'] = final_json
-        return jsonify({'status': 'success', 'data': final_json})
+        session.set_data(final_json)
+        registry.save(session)
+        return jsonify({'status': 'success', 'document_id': session.document_id, **_document_payload(body, json_in, final_json)})
     
     except Exception as e:
-        print(f"[SPLITTER-1 ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Splitter 1 failed")
         return jsonify({'status': 'error', 'message': f'Splitter error: {str(e)}'}), 500
 
 @app.route('/api/llm-pass-3', methods=['POST'])
 def llm_pass_3():
     """
     LLM Pass 3 endpoint
-    Payload (JSON): json_data (optional; defaults to last state)
+    Payload (JSON): document_id, json_data (optional; defaults to the document's last state),
+    async (optional; run as a background job and return its id immediately),
+    stream (optional; "ndjson" / "sse" / true to stream each article's result as it finishes),
+    incremental (optional, default true; reuse results for articles unchanged since the last run),
+    local_paths (optional; derive paths from hierarchy headings in the PDF body),
+    refine (optional, default true; send articles with an ambiguous local path to the LLM),
+    json_patch / delta (optional; see llm_pass_2)
     Processes hierarchical path for each article and returns updated JSON.
     """
     try:
         body = request.json or {}
-        data_in = body.get('json_data') or STATE.get('data')
+        session, error = _session_or_error(body)
+        if error:
+            return error
+        data_in, error = _input_document(session, body)
+        if error:
+            return error
         if not data_in:
             return jsonify({'status': 'error', 'message': 'No JSON provided. Run previous steps first.'}), 400
 
-        print(f"[LLM-PASS-3] Processing {len(data_in.get('articles', []))} articles for path extraction")
-        
-        data_working, _ = pipeline_llm_pass_3(
-            data_in,
-            out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs')
-        )
+        reuse = _result_reuse(session, 'path', body)
+        options = {name: _truthy(body[name]) for name in ('local_paths', 'refine') if name in body}
+        pass_3 = partial(pipeline_llm_pass_3, pdf_source=session.document, index_pages=session.index_pages, **options)
+        if _truthy(body.get('async')):
+            return _start_pass_job(session, 'llm-pass-3', pass_3, data_in, _truthy(body.get('no_cache')), reuse)
+        stream_format = _stream_format(body)
+        if stream_format:
+            return _stream_pass(session, 'path', pass_3, data_in, _truthy(body.get('no_cache')), reuse, stream_format)
 
-        STATE['data'] = data_working
-        print(f"[LLM-PASS-3] Completed path extraction for all articles")
-        return jsonify({'status': 'success', 'data': data_working})
+        with bypass_cache(_truthy(body.get('no_cache'))):
+            data_working, _ = pass_3(
+                data_in,
+                out_dir=os.path.join(os.path.dirname(__file__), 'debug_outputs'),
+                reuse=reuse,
+            )
+
+        session.set_data(data_working)
+        session.set_fingerprints('path', reuse.current)
+        registry.save(session)
+        return jsonify({'status': 'success', 'document_id': session.document_id, **_document_payload(body, data_in, data_working), 'reuse': reuse.summary()})
     
     except Exception as e:
-        print(f"[LLM-PASS-3 ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("LLM Pass 3 failed")
         return jsonify({'status': 'error', 'message': f'LLM Pass 3 error: {str(e)}'}), 500
 
+@app.route('/api/validate', methods=['POST'])
+def validate():
+    """
+    Validate JSON values against the uploaded PDF text.
+    Payload (JSON): document_id, json_data (optional; defaults to the document's last state), snippets (optional list of strings)
+    Returns per-field match status ('match' / 'partial' / 'missing'), coverage ratio and page numbers.
+    """
+    try:
+        body = request.json or {}
+        session, error = _session_or_error(body)
+        if error:
+            return error
+
+        snippets = body.get('snippets')
+        json_in = body.get('json_data') or (None if snippets else session.data)
+        if not json_in and not snippets:
+            return jsonify({'status': 'error', 'message': 'Nothing to validate. Provide json_data or snippets.'}), 400
+
+        report = validation_report(session.document, json_in, snippets)
+        return jsonify({'status': 'success', **report})
+
+    except Exception as e:
+        log.exception("Validation failed")
+        return jsonify({'status': 'error', 'message': f'Validation error: {str(e)}'}), 500
+
 @app.route('/api/ask-ai', methods=['POST'])
 def ask_ai():
     """
@@ -185,8 +522,8 @@ def ask_ai():
         snippet = data.get('snippet', '')
         path = data.get('path', '')
         
-        print(f"[ASK-AI] Request for snippet: {snippet[:50]}... at path: {path}")
-        
+        log.info("Ask AI request", extra=fields(snippet_chars=len(snippet), path=path))
+
         # For now, return a placeholder response
         # TODO: Implement actual AI-powered content fixing
         return jsonify({
@@ -198,9 +535,74 @@ def ask_ai():
         })
     
     except Exception as e:
-        print(f"[ASK-AI ERROR] {str(e)}")
+        log.exception("Ask AI failed")
         return jsonify({'status': 'error', 'message': f'Ask AI error: {str(e)}'}), 500
 
+@app.route('/api/detect-toc', methods=['POST'])
+def detect_toc_pages():
+    """Propose the TOC page range and first body page of an uploaded document, without any LLM call."""
+    try:
+        data = request.json or {}
+        session, error = _session_or_error(data)
+        if error:
+            return error
+        detection = detect_toc(session.document, max_pages=int(data.get('max_pages') or TOC_DETECT_MAX_PAGES))
+        if detection is None:
+            return jsonify({'status': 'error', 'message': 'No table of contents recognised'}), 404
+        return jsonify({'status': 'success', 'document_id': session.document_id, 'detection': detection})
+
+    except Exception as e:
+        log.exception("TOC detection failed")
+        return jsonify({'status': 'error', 'message': f'TOC detection error: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Background job status: articles completed/total, elapsed time, ETA and partial results.
+    Includes the updated document JSON once the job has succeeded.
+    """
+    record = jobs.status(job_id)
+    if record is None:
+        return jsonify({'status': 'error', 'message': f'Unknown job_id: {job_id}'}), 404
+    response = {'status': 'success', 'job': record}
+    if record['status'] == 'succeeded':
+        session = registry.get(record['document_id'])
+        if session is not None:
+            response['data'] = session.data
+    return jsonify(response)
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def job_cancel(job_id):
+    """Stop a background job from issuing further LLM calls."""
+    record = jobs.cancel(job_id)
+    if record is None:
+        return jsonify({'status': 'error', 'message': f'Unknown job_id: {job_id}'}), 404
+    return jsonify({'status': 'success', 'job': record})
+
+@app.route('/api/documents', methods=['GET'])
+def list_documents():
+    """Stored documents, and the memory held by documents cached in this worker."""
+    return jsonify({'status': 'success', 'documents': registry.list(), 'memory_bytes': registry.total_bytes()})
+
+@app.route('/api/documents/<document_id>', methods=['DELETE'])
+def delete_document(document_id):
+    """Close a document and free its memory."""
+    if not registry.remove(document_id):
+        return jsonify({'status': 'error', 'message': f'Unknown or expired document_id: {document_id}'}), 404
+    return jsonify({'status': 'success'})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters and size of the LLM response cache."""
+    if llm_cache is None:
+        return jsonify({'status': 'success', 'enabled': False})
+    return jsonify({'status': 'success', 'enabled': True, 'stats': llm_cache.stats()})
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Stage/LLM latency histograms, token usage, cache lookups, retries and errors of this worker (Prometheus text format)."""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy'})
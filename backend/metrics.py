@@ -0,0 +1,238 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# In-process metrics (Prometheus text format at /api/metrics) and optional per-run traces.
+# Each worker process keeps its own counters; scrape every worker (or run one) for totals.
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# ----------------------------
+# Metric types
+# ----------------------------
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = _LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            for bound, n in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {n}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = _LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines: List[str] = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The pipeline's metrics
+stage_seconds = REGISTRY.histogram("isplit_stage_seconds", "Wall time of pipeline stages")
+llm_call_seconds = REGISTRY.histogram("isplit_llm_call_seconds", "Wall time of LLM calls including retries, by pass")
+llm_tokens = REGISTRY.counter("isplit_llm_tokens_total", "LLM tokens used, by pass and kind (prompt/completion)")
+llm_cache_lookups = REGISTRY.counter("isplit_llm_cache_lookups_total", "LLM response cache lookups, by pass and result")
+llm_retries = REGISTRY.counter("isplit_llm_retries_total", "LLM request retries, by error type")
+llm_errors = REGISTRY.counter("isplit_llm_errors_total", "LLM calls that failed after retries, by pass and error type")
+llm_hedges = REGISTRY.counter("isplit_llm_hedged_requests_total", "Hedged LLM requests, by outcome (won/lost)")
+http_request_seconds = REGISTRY.histogram("isplit_http_request_seconds", "API request latency, by route, method and status")
+
+
+# ----------------------------
+# Tracing
+# ----------------------------
+
+class Span:
+    """One timed operation in a trace; children may be added from worker threads."""
+
+    __slots__ = ("name", "attrs", "start", "end", "children", "_lock")
+
+    def __init__(self, name: str, attrs: Optional[dict] = None):
+        self.name = name
+        self.attrs = dict(attrs or {})
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+        self._lock = threading.Lock()
+
+    def add_child(self, child: "Span") -> None:
+        with self._lock:
+            self.children.append(child)
+
+    def to_dict(self, origin: Optional[float] = None) -> dict:
+        origin = self.start if origin is None else origin
+        end = self.end if self.end is not None else time.perf_counter()
+        with self._lock:
+            children = sorted(self.children, key=lambda s: s.start)
+        node = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+        }
+        if self.attrs:
+            node["attrs"] = self.attrs
+        if children:
+            node["children"] = [c.to_dict(origin) for c in children]
+        return node
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("isplit_current_span", default=None)
+
+
+def start_trace(name: str, **attrs) -> Tuple[Span, contextvars.Token]:
+    """Make a new root span current; pass the token to end_trace()."""
+    root = Span(name, attrs)
+    return root, _current_span.set(root)
+
+
+def end_trace(root: Span, token: contextvars.Token) -> dict:
+    root.end = time.perf_counter()
+    _current_span.reset(token)
+    return root.to_dict()
+
+
+def annotate(**attrs) -> None:
+    """Add attributes to the current span, if a trace is active."""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """Child span of the current one; a no-op (yields None) when no trace is active."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attrs)
+    parent.add_child(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def timed_stage(stage: str) -> Callable:
+    """Decorator: record the function's wall time in isplit_stage_seconds and as a trace span."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with span(stage):
+                    return fn(*args, **kwargs)
+            finally:
+                stage_seconds.observe(time.perf_counter() - started, stage=stage)
+        return wrapper
+    return decorator
@@ -0,0 +1,265 @@
+import hashlib
+import mmap
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO, IOBase
+from typing import Callable, List, Optional, Union
+
+from pypdf import PdfReader
+
+from logs import fields, get_logger
+
+# Number of parsed documents kept in memory (least recently used are dropped)
+PDF_DOCUMENT_CACHE_SIZE = int(os.getenv("PDF_DOCUMENT_CACHE_SIZE", "8"))
+
+# Multi-process extraction: page count at which a process pool is used (0 disables)
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "48"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+log = get_logger("pdf")
+
+
+# ----------------------------
+# Process-pool page extraction
+# ----------------------------
+
+_worker_reader: Optional[PdfReader] = None
+# Readers a shared-pool worker keeps open, by (path, size, mtime_ns)
+_worker_readers: "OrderedDict[tuple, PdfReader]" = OrderedDict()
+_WORKER_READERS_MAX = 4
+
+_shared_pool: Optional[ProcessPoolExecutor] = None
+_shared_pool_workers = 0
+_shared_pool_lock = threading.Lock()
+
+
+def _init_extract_worker(pdf_source: Union[bytes, str]) -> None:
+    """Open the PDF once per worker process (mapping the file when given a path)."""
+    global _worker_reader
+    _worker_reader = PdfReader(map_file(pdf_source) if isinstance(pdf_source, str) else BytesIO(pdf_source))
+
+
+def _extract_pages_in_worker(indices: List[int]) -> List[str]:
+    return [_worker_reader.pages[i].extract_text() or "" for i in indices]  # type: ignore[union-attr]
+
+
+def _extract_file_pages_in_worker(key: tuple, indices: List[int]) -> List[str]:
+    """Shared-pool task: pages of the file at key[0], reusing this worker's reader for it."""
+    reader = _worker_readers.get(key)
+    if reader is None:
+        reader = _worker_readers[key] = PdfReader(map_file(key[0]))
+        while len(_worker_readers) > _WORKER_READERS_MAX:
+            _worker_readers.popitem(last=False)
+    else:
+        _worker_readers.move_to_end(key)
+    return [reader.pages[i].extract_text() or "" for i in indices]
+
+
+def _extract_pool(workers: int) -> ProcessPoolExecutor:
+    """The process-wide extraction pool, (re)created for `workers` processes."""
+    global _shared_pool, _shared_pool_workers
+    with _shared_pool_lock:
+        if _shared_pool is None or _shared_pool_workers != workers:
+            if _shared_pool is not None:
+                _shared_pool.shutdown(wait=False)
+            # spawn: the server is multi-threaded, so forking it is not safe
+            _shared_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _shared_pool_workers = workers
+        return _shared_pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken shared pool so the next extraction starts a fresh one."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is pool:
+            _shared_pool = None
+    pool.shutdown(wait=False)
+
+
+def extract_pages_parallel(pdf_source: Union[bytes, str], indices: List[int], workers: Optional[int] = None) -> List[str]:
+    """Extract the text of `indices` (0-based) across a process pool, in order.
+
+    `pdf_source` is the PDF's bytes or, cheaper to hand over, its file path.
+    Pages are split into contiguous runs, a few per worker so that slow pages
+    don't leave the other workers idle. Paths go to one long-lived pool whose
+    workers keep recently used files open; bytes get a pool of their own.
+    """
+    pool_size = max(1, workers or PDF_EXTRACT_WORKERS)
+    workers = min(pool_size, len(indices))
+    run_len = max(1, -(-len(indices) // (workers * 4)))
+    runs = [indices[i:i + run_len] for i in range(0, len(indices), run_len)]
+    texts: List[str] = []
+    if isinstance(pdf_source, str):
+        st = os.stat(pdf_source)
+        key = (pdf_source, st.st_size, st.st_mtime_ns)
+        pool = _extract_pool(pool_size)
+        try:
+            for run_texts in pool.map(_extract_file_pages_in_worker, [key] * len(runs), runs):
+                texts.extend(run_texts)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+        return texts
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_extract_worker, initargs=(pdf_source,)) as pool:
+        for run_texts in pool.map(_extract_pages_in_worker, runs):
+            texts.extend(run_texts)
+    return texts
+
+
+# ----------------------------
+# Parse-once document
+# ----------------------------
+
+def map_file(path: str) -> mmap.mmap:
+    """Read-only memory map of a file: pages are loaded (and evicted) by the OS, not held on the heap."""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_pdf_bytes(pdf_source: object) -> Union[bytes, mmap.mmap]:
+    """Return the raw bytes of a path (memory-mapped), bytes, or file-like PDF source."""
+    if isinstance(pdf_source, (bytes, bytearray)):
+        return bytes(pdf_source)
+    if isinstance(pdf_source, IOBase) or hasattr(pdf_source, "read"):
+        data = pdf_source.read()  # type: ignore[union-attr]
+        if hasattr(pdf_source, "seek"):
+            pdf_source.seek(0)  # type: ignore[union-attr]
+        return data
+    # assume string-like path
+    return map_file(os.fspath(pdf_source))  # type: ignore[arg-type]
+
+
+class PdfDocument:
+    """A PDF identified by its SHA-256 whose page texts are extracted lazily, once.
+
+    `pdf_bytes` is either bytes or a read-only mmap of the file at `path`
+    (see PdfDocument.open); pypdf reads a mapped file in place. `on_grow`, if
+    set, is called with the document after newly extracted text is cached.
+    """
+
+    def __init__(self, pdf_bytes: Union[bytes, mmap.mmap], sha256: Optional[str] = None, path: Optional[str] = None):
+        self.pdf_bytes = pdf_bytes
+        self.path = path
+        self.sha256 = sha256 or hashlib.sha256(pdf_bytes).hexdigest()
+        self._reader: Optional[PdfReader] = None
+        self._pages: dict = {}
+        self._text_bytes = 0
+        self._lock = threading.RLock()
+        self.on_grow: Optional[Callable[["PdfDocument"], None]] = None
+
+    @classmethod
+    def open(cls, path: str, sha256: Optional[str] = None) -> "PdfDocument":
+        """Document backed by a memory map of the PDF file at `path`."""
+        return cls(map_file(path), sha256=sha256, path=path)
+
+    @property
+    def mapped(self) -> bool:
+        return isinstance(self.pdf_bytes, mmap.mmap)
+
+    @property
+    def size(self) -> int:
+        return len(self.pdf_bytes)
+
+    @property
+    def reader(self) -> PdfReader:
+        with self._lock:
+            if self._reader is None:
+                self._reader = PdfReader(self.pdf_bytes if self.mapped else BytesIO(self.pdf_bytes))
+            return self._reader
+
+    @property
+    def num_pages(self) -> int:
+        return len(self.reader.pages)
+
+    def memory_bytes(self) -> int:
+        """Heap held by the document: PDF bytes (unless memory-mapped) plus the page text extracted so far."""
+        held = 0 if self.mapped else len(self.pdf_bytes)
+        return held + self._text_bytes
+
+    def page_text(self, index: int) -> str:
+        """Text of the page at 0-based `index` (extracted on first access)."""
+        text = self._pages.get(index)
+        if text is None:
+            with self._lock:
+                text = self._pages.get(index)
+                if text is None:
+                    text = self.reader.pages[index].extract_text() or ""
+                    self._pages[index] = text
+                    self._text_bytes += len(text)
+            self._grew()
+        return text
+
+    def pages_text(self, indices: List[int]) -> List[str]:
+        self.prefetch(indices)
+        return [self.page_text(i) for i in indices]
+
+    def prefetch(self, indices: List[int]) -> None:
+        """Extract every not-yet-cached page in `indices`, in parallel when there are many."""
+        missing = [i for i in indices if i not in self._pages]
+        if not PDF_PARALLEL_MIN_PAGES or len(missing) < PDF_PARALLEL_MIN_PAGES or PDF_EXTRACT_WORKERS <= 1:
+            return
+        try:
+            texts = extract_pages_parallel(self.path or bytes(self.pdf_bytes), missing)
+        except Exception as e:
+            # Fall back to in-process extraction (e.g. process creation not permitted)
+            log.warning("Parallel extraction failed; continuing single-process", extra=fields(pages=len(missing), error=str(e)))
+            return
+        with self._lock:
+            for i, text in zip(missing, texts):
+                if i not in self._pages:
+                    self._pages[i] = text
+                    self._text_bytes += len(text)
+        self._grew()
+
+    def _grew(self) -> None:
+        # Outside self._lock: the callback may take other locks (e.g. the session registry's)
+        if self.on_grow is not None:
+            self.on_grow(self)
+
+    def text_range(self, start_page_1based: int, end_page_1based: Optional[int] = None) -> str:
+        """Concatenate text from start_page_1based..end_page_1based (inclusive)."""
+        total = self.num_pages
+        s = max(1, start_page_1based)
+        e = end_page_1based if end_page_1based is not None else total
+        e = min(e, total)
+        return "\n".join(self.pages_text(list(range(s - 1, e))))
+
+
+# ----------------------------
+# Document cache
+# ----------------------------
+
+_DOCUMENTS: "OrderedDict[str, PdfDocument]" = OrderedDict()
+_DOCUMENTS_LOCK = threading.Lock()
+
+
+def get_document(pdf_source: object) -> PdfDocument:
+    """Return the cached PdfDocument for a path (memory-mapped), bytes, file-like or PdfDocument."""
+    if isinstance(pdf_source, PdfDocument):
+        return pdf_source
+    pdf_bytes = _read_pdf_bytes(pdf_source)
+    sha = hashlib.sha256(pdf_bytes).hexdigest()
+    path = os.fspath(pdf_source) if isinstance(pdf_bytes, mmap.mmap) else None  # type: ignore[arg-type]
+    with _DOCUMENTS_LOCK:
+        doc = _DOCUMENTS.get(sha)
+        if doc is None:
+            doc = PdfDocument(pdf_bytes, sha256=sha, path=path)
+            _DOCUMENTS[sha] = doc
+            while len(_DOCUMENTS) > max(1, PDF_DOCUMENT_CACHE_SIZE):
+                _DOCUMENTS.popitem(last=False)
+        else:
+            _DOCUMENTS.move_to_end(sha)
+        return doc
+
+
+def forget_document(sha256: str) -> None:
+    """Drop a document (and its extracted text) from the cache."""
+    with _DOCUMENTS_LOCK:
+        _DOCUMENTS.pop(sha256, None)
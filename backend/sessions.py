@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from logs import fields, get_logger
+from pdf_document import PdfDocument, forget_document
+from storage import STORAGE_URL, PdfSource, StorageBackend, storage_from_url
+
+# Memory budget for documents held in this process (page text, plus PDF bytes not memory-mapped), and idle expiry
+SESSION_MEMORY_BUDGET_MB = int(os.getenv("SESSION_MEMORY_BUDGET_MB", "1024"))
+SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", "3600"))
+
+# How often (seconds) a worker sweeps storage for idle documents
+_EXPIRY_SWEEP_SECONDS = 60
+
+log = get_logger("sessions")
+
+
+# ----------------------------
+# Document sessions
+# ----------------------------
+
+class DocumentSession:
+    """One uploaded PDF and the intermediate pipeline state derived from it.
+
+    State is loaded from storage when the session is fetched; changes are
+    written back by DocumentRegistry.save().
+    """
+
+    def __init__(self, document_id: str, meta: dict, state: dict, document: PdfDocument):
+        self.document_id = document_id
+        self.pdf_name = meta.get("pdf_name")
+        self.created_at = meta.get("created_at")
+        self.document = document
+        self.excerpt: str = state.get("excerpt", "")
+        self.data: Optional[dict] = state.get("data")
+        pages = state.get("index_pages")
+        self.index_pages: Optional[Tuple[int, int]] = tuple(pages) if pages else None  # type: ignore[assignment]
+        # Per pass ('items' / 'path'): input fingerprint -> result of the last run
+        self.fingerprints: dict = state.get("fingerprints") or {}
+        self._dirty: set = set()
+
+    @property
+    def pdf_bytes(self) -> bytes:
+        return self.document.pdf_bytes
+
+    def set_data(self, data: Optional[dict]) -> None:
+        self.data = data
+        self._dirty.add("data")
+
+    def set_excerpt(self, excerpt: str) -> None:
+        self.excerpt = excerpt
+        self._dirty.add("excerpt")
+
+    def set_index_pages(self, index_pages: Tuple[int, int]) -> None:
+        self.index_pages = index_pages
+        self._dirty.add("index_pages")
+
+    def set_fingerprints(self, field: str, results: dict) -> None:
+        self.fingerprints = dict(self.fingerprints, **{field: results})
+        self._dirty.add("fingerprints")
+
+    def pop_changes(self) -> dict:
+        changes = {}
+        for key in self._dirty:
+            value = getattr(self, key)
+            changes[key] = list(value) if isinstance(value, tuple) else value
+        self._dirty.clear()
+        return changes
+
+
+class DocumentRegistry:
+    """Documents by id, persisted in a shared StorageBackend.
+
+    Any worker process can serve any step: PDFs and stage outputs are read
+    from storage, while parsed PdfDocuments (with their extracted page text)
+    are cached per process under a memory budget with LRU eviction. Documents
+    idle for longer than idle_seconds are deleted from storage.
+    """
+
+    def __init__(self, storage: StorageBackend, max_bytes: int, idle_seconds: float):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._documents: "OrderedDict[str, PdfDocument]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_sweep = 0.0
+
+    def _cache_document(self, document: PdfDocument) -> PdfDocument:
+        with self._lock:
+            cached = self._documents.get(document.sha256)
+            if cached is not None:
+                self._documents.move_to_end(document.sha256)
+                return cached
+            self._documents[document.sha256] = document
+            document.on_grow = self._document_grew
+            self._evict(keep=document.sha256)
+            return document
+
+    def _document_grew(self, document: PdfDocument) -> None:
+        """Page text extracted after caching counts against the budget too: re-check it as documents grow."""
+        with self._lock:
+            if self._documents.get(document.sha256) is document:
+                self._evict(keep=document.sha256)
+
+    def _load_document(self, document_id: str, sha: str) -> Optional[PdfDocument]:
+        with self._lock:
+            cached = self._documents.get(sha)
+            if cached is not None:
+                self._documents.move_to_end(sha)
+                return cached
+        document = self._open_document(document_id, sha)
+        return self._cache_document(document) if document is not None else None
+
+    def _open_document(self, document_id: str, sha: str) -> Optional[PdfDocument]:
+        """Memory-map the stored PDF when storage has it on local disk, else read its bytes."""
+        path = self.storage.pdf_path(document_id)
+        if path is not None:
+            try:
+                return PdfDocument.open(path, sha256=sha)
+            except FileNotFoundError:
+                return None
+        pdf_bytes = self.storage.read_pdf(document_id)
+        return PdfDocument(pdf_bytes, sha256=sha) if pdf_bytes is not None else None
+
+    def create(self, pdf: PdfSource, pdf_name: Optional[str] = None) -> DocumentSession:
+        """New document from PDF bytes or a binary stream (streamed to storage, then memory-mapped)."""
+        self._sweep()
+        document_id = uuid.uuid4().hex
+        sha = self.storage.create_document(document_id, pdf, pdf_name)
+        document = self._load_document(document_id, sha)
+        if document is None:
+            raise RuntimeError(f"Stored PDF for document {document_id} could not be opened")
+        meta = {"pdf_name": pdf_name, "created_at": time.time()}
+        return DocumentSession(document_id, meta, {}, document)
+
+    def get(self, document_id: Optional[str]) -> Optional[DocumentSession]:
+        if not document_id:
+            return None
+        self._sweep()
+        try:
+            meta = self.storage.get_meta(document_id)
+        except ValueError:
+            return None
+        if meta is None:
+            return None
+        document = self._load_document(document_id, meta["sha256"])
+        if document is None:
+            return None
+        self.storage.touch(document_id)
+        return DocumentSession(document_id, meta, self.storage.get_state(document_id), document)
+
+    def save(self, session: DocumentSession) -> None:
+        """Persist the session's changed state."""
+        changes = session.pop_changes()
+        if changes:
+            self.storage.put_state(session.document_id, **changes)
+        else:
+            self.storage.touch(session.document_id)
+
+    def remove(self, document_id: str) -> bool:
+        meta = self.storage.get_meta(document_id)
+        if meta is None:
+            return False
+        self.storage.delete_document(document_id)
+        self._forget(meta["sha256"])
+        return True
+
+    def total_bytes(self) -> int:
+        """Memory held by documents cached in this process."""
+        with self._lock:
+            return sum(d.memory_bytes() for d in self._documents.values())
+
+    def list(self) -> list:
+        return [{"document_id": doc_id, **meta} for doc_id, meta in self.storage.list_documents()]
+
+    def _forget(self, sha: str) -> None:
+        with self._lock:
+            document = self._documents.pop(sha, None)
+        if document is not None:
+            document.on_grow = None
+        forget_document(sha)
+
+    def _sweep(self) -> None:
+        """Delete idle documents from storage, at most once per sweep interval."""
+        now = time.time()
+        if not self.idle_seconds or now - self._last_sweep < _EXPIRY_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        expired = self.storage.expire_idle(self.idle_seconds)
+        for document_id in expired:
+            log.info("Expired idle document", extra=fields(document_id=document_id))
+        if expired:
+            # Unmap documents whose PDF is no longer referenced by any stored document
+            live = {meta["sha256"] for _, meta in self.storage.list_documents()}
+            with self._lock:
+                stale = [sha for sha in self._documents if sha not in live]
+            for sha in stale:
+                self._forget(sha)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while self.max_bytes and self.total_bytes() > self.max_bytes:
+            victim = next((sha for sha in self._documents if sha != keep), None)
+            if victim is None:
+                break
+            log.info("Dropping cached document over memory budget", extra=fields(sha256=victim[:12], budget_bytes=self.max_bytes))
+            self._forget(victim)
+
+
+registry = DocumentRegistry(
+    storage_from_url(STORAGE_URL),
+    SESSION_MEMORY_BUDGET_MB * 1024 * 1024,
+    SESSION_IDLE_SECONDS,
+)
@@ -0,0 +1,261 @@
+import re
+from bisect import bisect_right
+from collections.abc import MutableMapping
+from typing import Iterator, List, Optional, Tuple, Union
+
+# Span-based regulation JSON: article contents and items are (start, end) offsets
+# into one shared body text, materialised as strings only when read or serialised.
+# Views behave like the plain dicts the passes use; to_json() gives those dicts.
+
+_FOOTER_RE = re.compile(r"(?i)page\s*\d+")
+
+Segment = Tuple[int, int]
+
+
+# ----------------------------
+# Shared body text
+# ----------------------------
+
+class BodyText:
+    """The PDF body (pages joined by newlines, as extract_body_text returns it) with page boundaries."""
+
+    def __init__(self, pages: List[str], first_page: int = 1):
+        self.text = "\n".join(pages)
+        self.first_page = first_page
+        self._page_starts: List[int] = []
+        pos = 0
+        for page in pages:
+            self._page_starts.append(pos)
+            pos += len(page) + 1
+
+    def page_at(self, offset: int) -> int:
+        """1-based page number of the character at `offset`."""
+        return self.first_page + max(0, bisect_right(self._page_starts, offset) - 1)
+
+    def page_range(self, start: int, end: int) -> List[int]:
+        """[first, last] page of text[start:end]."""
+        return [self.page_at(start), self.page_at(max(start, end - 1))]
+
+    def line_segments(self, start: int, end: int, drop_footers: bool = False) -> List[Segment]:
+        """(start, end) of every non-blank line of text[start:end], without its surrounding whitespace.
+
+        Joined with newlines these give the stripped-lines form the splitter
+        produces; `drop_footers` also leaves out standalone 'Page N' lines.
+        """
+        segments: List[Segment] = []
+        offset = start
+        for line in self.text[start:end].split("\n"):
+            stripped = line.strip()
+            if stripped and not (drop_footers and _FOOTER_RE.fullmatch(stripped)):
+                lead = len(line) - len(line.lstrip())
+                segments.append((offset + lead, offset + lead + len(stripped)))
+            offset += len(line) + 1
+        return segments
+
+    def join(self, segments: List[Segment]) -> str:
+        return "\n".join(self.text[a:b] for a, b in segments)
+
+
+def _to_body_offset(segments: List[Segment], joined_starts: List[int], pos: int, is_end: bool) -> int:
+    """Body offset of position `pos` in the newline-joined `segments` (an exclusive end maps after its character)."""
+    if is_end:
+        k = bisect_right(joined_starts, pos - 1) - 1
+        return segments[k][0] + (pos - joined_starts[k])
+    k = bisect_right(joined_starts, pos) - 1
+    return segments[k][0] + (pos - joined_starts[k])
+
+
+# ----------------------------
+# Items and articles
+# ----------------------------
+
+class SpanItem:
+    """An item whose content is body[start:end] in stripped-lines form (footer lines dropped).
+
+    The usual {'ref', 'content'} item keeps just its ref; any other shape
+    keeps its fields (content None) in `extra`.
+    """
+
+    __slots__ = ("ref", "start", "end", "extra")
+
+    def __init__(self, ref: object, start: int, end: int, extra: Optional[dict] = None):
+        self.ref = ref
+        self.start = start
+        self.end = end
+        self.extra = extra
+
+    def to_json(self, body: BodyText) -> dict:
+        content = body.join(body.line_segments(self.start, self.end, drop_footers=True))
+        if self.extra is None:
+            return {"ref": self.ref, "content": content}
+        item = dict(self.extra)
+        item["content"] = content
+        return item
+
+
+class SpanArticle(MutableMapping):
+    """One article as a dict-like view: 'content' is body[start:end] in stripped-lines form, 'items' are spans.
+
+    Reading 'content' or 'items' materialises fresh values (assign to change
+    them); assigning 'content' detaches the article from the body.
+    """
+
+    def __init__(self, body: BodyText, fields: dict, start: Optional[int] = None, end: Optional[int] = None):
+        self.body = body
+        self.fields = fields
+        self.start = start
+        self.end = end
+        self._items: List[Union[SpanItem, dict]] = list(fields.get("items") or [])
+        if "items" in fields:
+            fields["items"] = None  # keeps the key's position; values live in _items
+
+    @property
+    def located(self) -> bool:
+        return self.start is not None
+
+    def _segments(self, drop_footers: bool = False) -> List[Segment]:
+        return self.body.line_segments(self.start, self.end, drop_footers=drop_footers)
+
+    def __getitem__(self, key: str):
+        if key == "content" and self.located:
+            return self.body.join(self._segments())
+        if key == "items":
+            return [it.to_json(self.body) if isinstance(it, SpanItem) else it for it in self._items]
+        return self.fields[key]
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == "content":
+            self.start = self.end = None
+            self.fields["content"] = value
+        elif key == "items":
+            self._items = self._as_spans(value if isinstance(value, list) else [])
+            self.fields.setdefault("items", None)
+        else:
+            self.fields[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self.fields[key]
+        if key == "content":
+            self.start = self.end = None
+        elif key == "items":
+            self._items = []
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def _as_spans(self, items: List[dict]) -> List[Union[SpanItem, dict]]:
+        """Items whose content appears verbatim in the (footer-free) article become spans; others stay dicts."""
+        if not self.located or not items:
+            return list(items)
+        segments = self._segments(drop_footers=True)
+        if not segments:
+            return list(items)
+        joined = self.body.join(segments)
+        joined_starts, pos = [], 0
+        for a, b in segments:
+            joined_starts.append(pos)
+            pos += b - a + 1
+
+        out: List[Union[SpanItem, dict]] = []
+        cursor = 0
+        for item in items:
+            text = item.get("content") if isinstance(item, dict) else None
+            found = -1
+            if isinstance(text, str) and text:
+                found = joined.find(text, cursor)
+                if found < 0:
+                    found = joined.find(text)
+            if found < 0:
+                out.append(item)
+                continue
+            start = _to_body_offset(segments, joined_starts, found, is_end=False)
+            end = _to_body_offset(segments, joined_starts, found + len(text), is_end=True)
+            # Keep a span only if it reproduces the item exactly
+            if self.body.join(self.body.line_segments(start, end, drop_footers=True)) != text:
+                out.append(item)
+                continue
+            if list(item) == ["ref", "content"]:
+                out.append(SpanItem(item["ref"], start, end))
+            else:
+                out.append(SpanItem(None, start, end, extra=dict(item, content=None)))
+            cursor = found + len(text)
+        return out
+
+    def copy(self) -> "SpanArticle":
+        art = SpanArticle(self.body, dict(self.fields), self.start, self.end)
+        art._items = list(self._items)
+        return art
+
+    def to_json(self) -> dict:
+        return {key: self[key] for key in self.fields}
+
+
+class SpanDocument(MutableMapping):
+    """A regulation JSON ({'regulation': ..., 'articles': [...]}) whose articles are SpanArticles."""
+
+    def __init__(self, body: BodyText, fields: dict):
+        self.body = body
+        self.fields = fields
+
+    def __getitem__(self, key: str):
+        return self.fields[key]
+
+    def __setitem__(self, key: str, value) -> None:
+        self.fields[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self.fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def copy(self) -> "SpanDocument":
+        """Independent article views over the same body (nothing is materialised)."""
+        fields = dict(self.fields)
+        fields["articles"] = [
+            art.copy() if isinstance(art, SpanArticle) else dict(art) for art in self.fields.get("articles", [])
+        ]
+        return SpanDocument(self.body, fields)
+
+    def to_json(self) -> dict:
+        """The plain JSON dict, with every content and item materialised."""
+        out = dict(self.fields)
+        out["articles"] = [
+            art.to_json() if isinstance(art, SpanArticle) else art for art in self.fields.get("articles", [])
+        ]
+        return out
+
+
+def split_articles(body: BodyText, headings_json: dict, spans: List[Optional[Tuple[int, int]]]) -> SpanDocument:
+    """SpanDocument for `headings_json` with each article's content at its located span (None: not found).
+
+    Located articles also get 'pages': the [first, last] body page of their content.
+    """
+    articles: List[Union[SpanArticle, dict]] = []
+    for art, span in zip(headings_json.get("articles", []), spans):
+        fields = dict(art)
+        fields["content"] = ""
+        if span is None:
+            articles.append(SpanArticle(body, fields))
+            continue
+        start, end = span
+        newline = body.text.find("\n", start, end)
+        content_start = end if newline < 0 else newline + 1
+        segments = body.line_segments(content_start, end)
+        fields["content"] = None
+        fields["pages"] = body.page_range(segments[0][0], segments[-1][1]) if segments else body.page_range(start, end)
+        articles.append(SpanArticle(body, fields, content_start, end))
+    fields = dict(headings_json)
+    fields["articles"] = articles
+    return SpanDocument(body, fields)
+
+
+def to_json(data: object) -> object:
+    """Plain JSON for a SpanDocument (or anything with to_json()); other values unchanged."""
+    return data.to_json() if hasattr(data, "to_json") else data
@@ -0,0 +1,406 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+import json_codec
+
+# Where documents and stage outputs live, shared by every worker process:
+#   sqlite:///path/to/isplit.sqlite3  (default; PDFs stored as files next to it)
+#   file:///path/to/dir               (plain directories, one per document)
+STORAGE_URL = os.getenv(
+    "STORAGE_URL",
+    "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "isplit.sqlite3"),
+)
+
+# Uploads are copied to disk in chunks of this size, never held whole in memory
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+# A PDF as bytes or as a readable binary stream (e.g. an uploaded file)
+PdfSource = Union[bytes, BinaryIO]
+
+
+# ----------------------------
+# Storage interface
+# ----------------------------
+
+class StorageBackend:
+    """Persistent store for uploaded PDFs and per-document pipeline state.
+
+    State is a flat dict of JSON-serialisable values (e.g. 'data',
+    'index_pages', 'excerpt') updated key by key.
+    """
+
+    def create_document(self, document_id: str, pdf: PdfSource, pdf_name: Optional[str]) -> str:
+        """Store a new document from bytes or a binary stream; returns the PDF's SHA-256."""
+        raise NotImplementedError
+
+    def get_meta(self, document_id: str) -> Optional[dict]:
+        """{'pdf_name', 'sha256', 'created_at', 'last_access'} or None if unknown."""
+        raise NotImplementedError
+
+    def read_pdf(self, document_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def pdf_path(self, document_id: str) -> Optional[str]:
+        """Local path of the stored PDF (for memory-mapping), or None if it has no local file."""
+        return None
+
+    def get_state(self, document_id: str) -> dict:
+        raise NotImplementedError
+
+    def put_state(self, document_id: str, **values) -> None:
+        raise NotImplementedError
+
+    def touch(self, document_id: str) -> None:
+        raise NotImplementedError
+
+    def delete_document(self, document_id: str) -> bool:
+        raise NotImplementedError
+
+    def list_documents(self) -> List[Tuple[str, dict]]:
+        raise NotImplementedError
+
+    def put_job(self, job_id: str, record: dict) -> None:
+        """Store a background job's status record (replacing any previous one)."""
+        raise NotImplementedError
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def expire_idle(self, idle_seconds: float) -> List[str]:
+        """Delete documents not accessed for idle_seconds; returns their ids."""
+        now = time.time()
+        expired = [doc_id for doc_id, meta in self.list_documents() if now - meta["last_access"] > idle_seconds]
+        for doc_id in expired:
+            self.delete_document(doc_id)
+        return expired
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write via a temp file + rename so other processes never see partial files.
+
+    The temp file is unique per call, so threads of one worker writing the
+    same key never share it; the last rename wins.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _spool(pdf: PdfSource, directory: str) -> Tuple[str, str]:
+    """Copy a PDF into a temp file in `directory` chunk by chunk, hashing as it goes; returns (temp path, SHA-256)."""
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".upload")
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(pdf, (bytes, bytearray)):
+                digest.update(pdf)
+                f.write(pdf)
+            else:
+                for chunk in iter(lambda: pdf.read(_COPY_CHUNK_BYTES), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+        if os.path.getsize(tmp) == 0:
+            raise ValueError("The uploaded PDF is empty")
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp, digest.hexdigest()
+
+
+# ----------------------------
+# SQLite (+ content-addressed PDF files)
+# ----------------------------
+
+class SQLiteStorage(StorageBackend):
+    """Metadata and state in SQLite; PDFs as files named by SHA-256 next to the database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.blob_dir = os.path.join(os.path.dirname(os.path.abspath(path)), "pdfs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " id TEXT PRIMARY KEY,"
+                " pdf_name TEXT,"
+                " sha256 TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                " document_id TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " PRIMARY KEY (document_id, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " document_id TEXT,"
+                " record TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection for one transaction (committed on success), closed afterwards."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.blob_dir, f"{sha}.pdf")
+
+    def create_document(self, document_id: str, pdf: PdfSource, pdf_name: Optional[str]) -> str:
+        tmp, sha = _spool(pdf, self.blob_dir)
+        try:
+            # Under the write lock, so a concurrent delete of the last other
+            # document with this PDF cannot remove the blob in between
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if os.path.exists(self._blob_path(sha)):
+                    os.remove(tmp)
+                else:
+                    os.replace(tmp, self._blob_path(sha))
+                now = time.time()
+                conn.execute(
+                    "INSERT INTO documents (id, pdf_name, sha256, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (document_id, pdf_name, sha, now, now),
+                )
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return sha
+
+    def get_meta(self, document_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT pdf_name, sha256, created_at, last_access FROM documents WHERE id = ?", (document_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"pdf_name": row[0], "sha256": row[1], "created_at": row[2], "last_access": row[3]}
+
+    def read_pdf(self, document_id: str) -> Optional[bytes]:
+        meta = self.get_meta(document_id)
+        if meta is None:
+            return None
+        with open(self._blob_path(meta["sha256"]), "rb") as f:
+            return f.read()
+
+    def pdf_path(self, document_id: str) -> Optional[str]:
+        meta = self.get_meta(document_id)
+        return self._blob_path(meta["sha256"]) if meta is not None else None
+
+    def get_state(self, document_id: str) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, value FROM state WHERE document_id = ?", (document_id,)).fetchall()
+        return {key: json_codec.loads(value) for key, value in rows}
+
+    def put_state(self, document_id: str, **values) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO state (document_id, key, value) VALUES (?, ?, ?)",
+                [(document_id, k, json_codec.dumps(v)) for k, v in values.items()],
+            )
+            conn.execute("UPDATE documents SET last_access = ? WHERE id = ?", (time.time(), document_id))
+
+    def touch(self, document_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE documents SET last_access = ? WHERE id = ?", (time.time(), document_id))
+
+    def delete_document(self, document_id: str) -> bool:
+        with self._connect() as conn:
+            # The reference check and the unlink happen under one write lock (see create_document)
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT sha256 FROM documents WHERE id = ?", (document_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM state WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM jobs WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+            shared = conn.execute("SELECT 1 FROM documents WHERE sha256 = ? LIMIT 1", (row[0],)).fetchone()
+            if not shared:
+                try:
+                    os.remove(self._blob_path(row[0]))
+                except FileNotFoundError:
+                    pass
+        return True
+
+    def list_documents(self) -> List[Tuple[str, dict]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, pdf_name, sha256, created_at, last_access FROM documents").fetchall()
+        return [(r[0], {"pdf_name": r[1], "sha256": r[2], "created_at": r[3], "last_access": r[4]}) for r in rows]
+
+    def put_job(self, job_id: str, record: dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, document_id, record, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, record.get("document_id"), json.dumps(record, ensure_ascii=False), time.time()),
+            )
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+# ----------------------------
+# Plain filesystem
+# ----------------------------
+
+class FileSystemStorage(StorageBackend):
+    """One directory per document: source.pdf, meta.json and one <key>.json per state value.
+
+    Job records live in <root>/.jobs; each document's jobs/ directory holds
+    an empty marker per record so deleting the document removes them too.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, document_id: str) -> str:
+        if not document_id or os.sep in document_id or document_id.startswith("."):
+            raise ValueError(f"Invalid document id: {document_id!r}")
+        return os.path.join(self.root, document_id)
+
+    def _read_json(self, path: str):
+        with open(path, "rb") as f:
+            return json_codec.loads(f.read())
+
+    def create_document(self, document_id: str, pdf: PdfSource, pdf_name: Optional[str]) -> str:
+        d = self._dir(document_id)
+        os.makedirs(os.path.join(d, "state"), exist_ok=True)
+        os.makedirs(os.path.join(d, "jobs"), exist_ok=True)
+        try:
+            tmp, sha = _spool(pdf, d)
+        except BaseException:
+            shutil.rmtree(d, ignore_errors=True)
+            raise
+        os.replace(tmp, os.path.join(d, "source.pdf"))
+        now = time.time()
+        meta = {"pdf_name": pdf_name, "sha256": sha, "created_at": now, "last_access": now}
+        _atomic_write(os.path.join(d, "meta.json"), json.dumps(meta).encode("utf-8"))
+        return sha
+
+    def get_meta(self, document_id: str) -> Optional[dict]:
+        try:
+            meta = self._read_json(os.path.join(self._dir(document_id), "meta.json"))
+        except (FileNotFoundError, ValueError):
+            return None
+        meta["last_access"] = os.path.getmtime(os.path.join(self._dir(document_id), "state"))
+        return meta
+
+    def read_pdf(self, document_id: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self._dir(document_id), "source.pdf"), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def pdf_path(self, document_id: str) -> Optional[str]:
+        path = os.path.join(self._dir(document_id), "source.pdf")
+        return path if os.path.exists(path) else None
+
+    def get_state(self, document_id: str) -> dict:
+        state_dir = os.path.join(self._dir(document_id), "state")
+        state = {}
+        for name in os.listdir(state_dir) if os.path.isdir(state_dir) else []:
+            if name.endswith(".json"):
+                state[name[:-5]] = self._read_json(os.path.join(state_dir, name))
+        return state
+
+    def put_state(self, document_id: str, **values) -> None:
+        state_dir = os.path.join(self._dir(document_id), "state")
+        for key, value in values.items():
+            _atomic_write(os.path.join(state_dir, f"{key}.json"), json_codec.dumps_bytes(value))
+        self.touch(document_id)
+
+    def touch(self, document_id: str) -> None:
+        # The state directory's mtime doubles as the last-access time
+        os.utime(os.path.join(self._dir(document_id), "state"))
+
+    def delete_document(self, document_id: str) -> bool:
+        d = self._dir(document_id)
+        if not os.path.isdir(d):
+            return False
+        job_dir = os.path.join(d, "jobs")
+        for job_id in os.listdir(job_dir) if os.path.isdir(job_dir) else []:
+            try:
+                os.remove(self._job_path(job_id))
+            except (FileNotFoundError, ValueError):
+                pass
+        shutil.rmtree(d, ignore_errors=True)
+        return True
+
+    def list_documents(self) -> List[Tuple[str, dict]]:
+        out = []
+        for name in os.listdir(self.root):
+            meta = self.get_meta(name) if not name.startswith(".") else None
+            if meta is not None:
+                out.append((name, meta))
+        return out
+
+    def _job_path(self, job_id: str) -> str:
+        if not job_id or os.sep in job_id or job_id.startswith("."):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        job_dir = os.path.join(self.root, ".jobs")
+        os.makedirs(job_dir, exist_ok=True)
+        return os.path.join(job_dir, f"{job_id}.json")
+
+    def put_job(self, job_id: str, record: dict) -> None:
+        _atomic_write(self._job_path(job_id), json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        document_id = record.get("document_id")
+        if document_id:
+            self._mark_job(document_id, job_id)
+
+    def _mark_job(self, document_id: str, job_id: str) -> None:
+        """Record that job_id belongs to the document (a no-op once the document is gone)."""
+        try:
+            d = self._dir(document_id)
+        except ValueError:
+            return
+        marker_dir = os.path.join(d, "jobs")
+        if not os.path.isdir(marker_dir) and os.path.isdir(os.path.join(d, "state")):
+            os.makedirs(marker_dir, exist_ok=True)  # documents stored before job markers existed
+        try:
+            # Never creates the document directory itself, so a deleted document stays deleted
+            with open(os.path.join(marker_dir, job_id), "ab"):
+                pass
+        except FileNotFoundError:
+            pass
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        try:
+            return self._read_json(self._job_path(job_id))
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+def storage_from_url(url: str) -> StorageBackend:
+    """Build the backend named by a sqlite:/// or file:/// URL."""
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SQLiteStorage(path)
+    if url.startswith("file:///"):
+        return FileSystemStorage(url[len("file://"):])
+    raise ValueError(f"Unsupported STORAGE_URL: {url}")
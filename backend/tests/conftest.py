@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Backend modules import each other as top-level modules (`from utils import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# No network, no on-disk cache or debug artifacts while testing
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("DEBUG_ARTIFACTS_MODE", "off")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
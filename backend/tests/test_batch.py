@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import Future
+
+import pytest
+
+import batch
+import pdf_document
+from batch import _needs_run, discover_inputs
+
+
+def _record(path, status, index_pages=None):
+    st = os.stat(path)
+    return {"path": path, "status": status, "index_pages": index_pages, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def test_finished_documents_are_not_run_again(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    path = str(pdf)
+    assert _needs_run({"path": path, "index_pages": None}, None, retry_failed=True)
+    assert not _needs_run({"path": path, "index_pages": None}, _record(path, "done", [2, 3]), retry_failed=True)
+    assert not _needs_run({"path": path, "index_pages": (2, 3)}, _record(path, "done", [2, 3]), retry_failed=True)
+    assert not _needs_run({"path": path, "index_pages": None}, _record(path, "skipped"), retry_failed=True)
+
+
+def test_failed_documents_are_retried_unless_skipped(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    path = str(pdf)
+    assert _needs_run({"path": path, "index_pages": None}, _record(path, "failed"), retry_failed=True)
+    assert not _needs_run({"path": path, "index_pages": None}, _record(path, "failed"), retry_failed=False)
+
+
+def test_changed_file_runs_again(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    record = _record(str(pdf), "done", [1, 1])
+    pdf.write_bytes(b"%PDF-1.4 changed")
+    assert _needs_run({"path": str(pdf), "index_pages": None}, record, retry_failed=False)
+
+
+def test_skipped_document_runs_once_given_a_toc_range(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    path = str(pdf)
+    (tmp_path / "manifest.txt").write_text("a.pdf\t2-4\n")
+    entry = discover_inputs(str(tmp_path / "manifest.txt"))[0]
+    assert entry == {"path": path, "index_pages": (2, 4)}
+    assert _needs_run(entry, _record(path, "skipped"), retry_failed=False)
+    assert _needs_run(entry, _record(path, "done", [2, 3]), retry_failed=False)
+    assert not _needs_run(entry, _record(path, "done", [2, 4]), retry_failed=False)
+
+
+class InlinePool:
+    """ProcessPoolExecutor stand-in that runs the initializer and every task in this process."""
+
+    def __init__(self, max_workers, initializer, initargs):
+        initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.mark.parametrize("workers, expected", [(4, 1), (2, 2), (1, 4)])
+def test_page_extraction_gets_the_cores_left_by_document_workers(tmp_path, monkeypatch, workers, expected):
+    seen = []
+
+    def process(path, index_pages, out_dir):
+        seen.append(pdf_document.PDF_EXTRACT_WORKERS)
+        return {"path": path, "status": "skipped", "error": None, "timings": {}}
+
+    monkeypatch.setattr(batch.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(pdf_document, "PDF_EXTRACT_WORKERS", 8)
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(batch, "process_document", process)
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4")
+    batch.run_batch(discover_inputs(str(tmp_path)), str(tmp_path / "out"), workers=workers)
+    assert seen == [expected]
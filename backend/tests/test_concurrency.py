@@ -0,0 +1,150 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+import concurrency
+from concurrency import RateLimiter, _TokenBucket, map_ordered, retry_with_backoff
+
+
+class FakeClock:
+    """time.monotonic / time.sleep stand-ins: sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(concurrency.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(concurrency.time, "sleep", clock.sleep)
+    # Full jitter drawn at its upper bound, so delays are the backoff caps
+    monkeypatch.setattr(concurrency.random, "uniform", lambda low, high: high)
+    return clock
+
+
+def _failing(times, error=TimeoutError):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= times:
+            raise error(f"attempt {len(calls)}")
+        return "ok"
+
+    return fn, calls
+
+
+def test_retries_with_exponential_backoff_capped_at_max_delay(clock):
+    fn, calls = _failing(4)
+    assert retry_with_backoff(fn, lambda e: True, max_retries=5, base_delay=1.0, max_delay=5.0) == "ok"
+    assert len(calls) == 5
+    assert clock.sleeps == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_gives_up_after_max_retries(clock):
+    fn, calls = _failing(10)
+    with pytest.raises(TimeoutError, match="attempt 3"):
+        retry_with_backoff(fn, lambda e: True, max_retries=2, base_delay=0.5)
+    assert len(calls) == 3
+
+
+def test_non_retryable_errors_are_raised_at_once(clock):
+    fn, calls = _failing(1, error=ValueError)
+    with pytest.raises(ValueError):
+        retry_with_backoff(fn, lambda e: isinstance(e, TimeoutError))
+    assert len(calls) == 1 and clock.sleeps == []
+
+
+def test_retry_after_hint_is_a_lower_bound(clock):
+    fn, _ = _failing(1)
+    retry_with_backoff(fn, lambda e: True, base_delay=0.1, max_delay=30.0, retry_after=lambda e: 7.0)
+    assert clock.sleeps == [7.0]
+    fn, _ = _failing(1)
+    retry_with_backoff(fn, lambda e: True, base_delay=0.1, max_delay=3.0, retry_after=lambda e: 7.0)
+    assert clock.sleeps[-1] == 3.0
+
+
+def test_no_retry_starts_after_the_deadline(clock):
+    fn, calls = _failing(10)
+    retried = []
+    with pytest.raises(TimeoutError):
+        retry_with_backoff(fn, lambda e: True, base_delay=1.0, deadline=clock.now + 3.5, on_retry=retried.append)
+    # sleeps of 1 and 2 fit before the deadline; the next (4) would not
+    assert clock.sleeps == [1.0, 2.0]
+    assert len(calls) == 3 and len(retried) == 2
+
+
+def test_token_bucket_refills_continuously():
+    bucket = _TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    # More than the capacity waits only for a full bucket
+    assert bucket.wait_time(1000, now + 60) == 0.0
+
+
+def test_rate_limiter_spaces_requests_and_tokens(clock):
+    limiter = RateLimiter(requests_per_minute=120, tokens_per_minute=600)
+    start = clock.now
+    for _ in range(120):
+        limiter.acquire()
+    assert clock.now == start  # the initial burst is the bucket size
+    limiter.acquire()
+    assert clock.now - start == pytest.approx(0.5)
+    # 600 tokens per minute are exhausted by two 300-token requests
+    limiter.acquire(300)
+    limiter.acquire(300)
+    before = clock.now
+    limiter.acquire(300)
+    assert clock.now - before == pytest.approx(30.0, rel=0.05)
+
+
+def test_disabled_rate_limiter_never_waits(clock):
+    limiter = RateLimiter(0, None)
+    for _ in range(1000):
+        limiter.acquire(10_000)
+    assert clock.sleeps == []
+
+
+def test_map_ordered_keeps_order_and_bounds_concurrency():
+    lock = threading.Lock()
+    running = [0, 0]  # current, peak
+
+    def work(i):
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.01 * (5 - i % 5))
+        with lock:
+            running[0] -= 1
+        return i * i
+
+    assert map_ordered(work, range(20), max_workers=4) == [i * i for i in range(20)]
+    assert 1 < running[1] <= 4
+
+
+def test_map_ordered_reraises_and_sees_caller_context():
+    var = contextvars.ContextVar("var", default=None)
+    var.set("caller")
+    assert map_ordered(lambda _: var.get(), range(3), max_workers=3) == ["caller"] * 3
+
+    def boom(i):
+        if i == 2:
+            raise RuntimeError("item 2")
+        return i
+
+    with pytest.raises(RuntimeError, match="item 2"):
+        map_ordered(boom, range(5), max_workers=2)
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from heading_locator import (
+    NormalisedText,
+    article_boundaries,
+    find_all_occurrences,
+    heading_pattern,
+    locate_article_spans,
+    locate_headings,
+    normalise_heading,
+)
+from utils import build_title_regex
+
+
+def _regex_starts(text, headings):
+    """The per-heading build_title_regex search the locator replaces."""
+    starts, cursor = [], 0
+    for heading in headings:
+        m = build_title_regex(heading).search(text, pos=cursor) if heading.strip() else None
+        starts.append(m.start() if m else None)
+        if m:
+            cursor = m.start()
+    return starts
+
+
+def test_heading_after_prose_containing_article_is():
+    body = (
+        "This Regulation lays down rules; this article is without prejudice to national law.\n\n"
+        "Article 1\nSubject matter\n\nArticle 2\nScope\n"
+    )
+    starts = locate_headings(body, ["Article 1", "Article 2"])
+    assert starts == [body.index("\n\nArticle 1"), body.index("\n\nArticle 2")]
+    spans = locate_article_spans(body, ["Article 1", "Article 2"])
+    assert "Subject matter" in body[spans[0][0]:spans[0][1]]
+    assert "without prejudice" not in body[spans[0][0]:spans[0][1]]
+
+
+def test_digits_are_not_widened():
+    assert locate_headings("Article 10\ntext", ["Article 1O"]) == [None]
+    assert locate_headings("Article 1o\ntext", ["Article 1O"]) == [0]
+    assert locate_headings("Annex 1\ntext", ["Annex l"]) == [None]
+
+
+def test_heading_letters_match_ocr_confusables():
+    # Lower-case o/i/v of the heading also match 0, l/1 and w in the body
+    assert locate_headings("Art1cle 5\nx", ["Article 5"]) == [0]
+    assert locate_headings("Secti0n 2\nx", ["Section 2"]) == [0]
+    assert locate_headings("Rewiew\nx", ["Review"]) == [0]
+    # ...but the body is not folded back onto the heading
+    assert locate_headings("Article 5\nx", ["Art1cle 5"]) == [None]
+
+
+def test_matches_whole_words_only():
+    body = "Article 10\nten\nArticle 1\none\n"
+    assert locate_headings(body, ["Article 1"]) == [body.index("\nArticle 1\n")]
+    assert locate_headings("Subarticle 3\nArticle 3\n", ["Article 3"]) == [12]
+    # Non-word edges need no boundary
+    assert locate_headings("x(a) first", ["(a)"]) == [1]
+
+
+def test_whitespace_and_case_are_collapsed():
+    body = "intro\n  ARTICLE\n\n 7   General\tprovisions\nbody"
+    assert locate_headings(body, ["Article 7 General provisions"]) == [body.index("\n  ARTICLE")]
+
+
+def test_cursor_moves_forward_and_missing_headings_do_not_move_it():
+    body = "Article 2\nb\nArticle 1\na\nArticle 2\nc\n"
+    starts = locate_headings(body, ["Article 1", "Missing", "Article 2"])
+    assert starts == [body.index("\nArticle 1"), None, body.index("\nArticle 2\nc")]
+
+
+def test_article_boundaries_end_at_next_later_start():
+    assert article_boundaries([0, None, 10, 10, 25], 40) == [(0, 10), None, (10, 25), (10, 25), (25, 40)]
+
+
+def test_find_all_occurrences_reports_overlapping_patterns():
+    found = find_all_occurrences("ab abc", ["ab", "abc", "b"])
+    assert found == {"ab": [0], "abc": [3], "b": []}
+
+
+def test_heading_pattern_units():
+    assert heading_pattern("Art iV") == ("a", "r", "t", " ", "[il1]", "v")
+    assert heading_pattern("  ") == ()
+
+
+def test_normalise_heading_does_not_fold_confusables():
+    assert normalise_heading("  Article  1O ") == "article 1o"
+    assert normalise_heading("Article 10") != normalise_heading("Article 1O")
+
+
+def test_normalised_text_maps_offsets_back():
+    text = "  Foo \n\tBAR baz"
+    norm = NormalisedText(text)
+    assert norm.text == "foo bar baz"
+    assert text[norm.to_original(norm.text.index("bar"))] == "B"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_agrees_with_build_title_regex(seed):
+    rng = random.Random(seed)
+    words = ["Article", "article", "is", "1", "10", "1O", "Annex", "l", "I", "IV", "iv", "W", "(a)", "10.", "o", "0"]
+    for _ in range(300):
+        body = " ".join(rng.choice(words) for _ in range(rng.randint(5, 60))).replace("  ", "\n ")
+        headings = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 6))]
+        assert locate_headings(body, headings) == _regex_starts(body, headings), (body, headings)
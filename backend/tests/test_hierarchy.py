@@ -0,0 +1,66 @@
+from hierarchy import assign_paths, scan_hierarchy
+
+BODY = """PART I
+GENERAL PROVISIONS
+
+CHAPTER 1
+Scope
+
+Article 1
+Subject matter
+This Regulation lays down rules.
+
+Article 2
+Definitions
+For the purposes of this Regulation, article 1 applies.
+
+CHAPTER 2
+Obligations
+
+Article 3
+Duties of providers
+Providers shall comply.
+
+PART II
+FINAL PROVISIONS
+
+Article 4
+Entry into force
+"""
+
+
+def test_scan_hierarchy_joins_label_only_lines_with_their_name():
+    headings = scan_hierarchy(BODY)
+    assert [(h.level, h.text) for h in headings] == [
+        ("part", "PART I GENERAL PROVISIONS"),
+        ("chapter", "CHAPTER 1 Scope"),
+        ("chapter", "CHAPTER 2 Obligations"),
+        ("part", "PART II FINAL PROVISIONS"),
+    ]
+
+
+def test_assign_paths_uses_the_headings_above_each_article():
+    titles = ["Article 1", "Article 2", "Article 3", "Article 4"]
+    assert assign_paths(BODY, titles) == [
+        (["PART I GENERAL PROVISIONS", "CHAPTER 1 Scope"], False),
+        (["PART I GENERAL PROVISIONS", "CHAPTER 1 Scope"], False),
+        (["PART I GENERAL PROVISIONS", "CHAPTER 2 Obligations"], False),
+        (["PART II FINAL PROVISIONS"], False),
+    ]
+
+
+def test_heading_mentioned_earlier_in_prose_is_not_the_anchor():
+    body = (
+        "PART I\nPRELIMINARY\n\n"
+        "Recital: this article is without prejudice to Article 10 of the Directive.\n\n"
+        "CHAPTER 1\nScope\n\nArticle 1\nSubject matter\n"
+    )
+    assert assign_paths(body, ["Article 1"]) == [(["PART I PRELIMINARY", "CHAPTER 1 Scope"], False)]
+
+
+def test_missing_articles_and_weak_levels_are_ambiguous():
+    body = "CHAPTER I\nGeneral\n\n1.2 Numbered heading\n\nArticle 1\nText\n"
+    assert assign_paths(body, ["Article 1", "Article 9"]) == [
+        (["CHAPTER I General", "1.2 Numbered heading"], True),
+        ([], True),
+    ]
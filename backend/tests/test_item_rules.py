@@ -0,0 +1,89 @@
+import pytest
+
+import utils
+from item_rules import marker_sequence_violations, score_item_split
+from utils import run_llm_pass_2, split_items_by_rules
+
+
+@pytest.mark.parametrize("refs", [
+    ["1.", "2.", "3."],
+    ["(1)", "(2)"],
+    ["(a)", "(b)", "(c)"],
+    ["a)", "b)"],
+    ["-", "•", "-"],
+    ["1.", "(a)", "(b)", "2.", "(a)", "(i)", "(ii)", "(b)", "3."],
+    ["(a)", "(b)", "(c)", "(d)", "(e)", "(f)", "(g)", "(h)", "(i)", "(j)"],  # (i) after (h) is alphabetic
+    ["(1)", "(a)", "(i)", "(ii)", "(iii)", "(iv)", "(b)", "(2)"],
+])
+def test_well_formed_marker_runs_have_no_violations(refs):
+    assert marker_sequence_violations(refs) == 0
+
+
+@pytest.mark.parametrize("refs, violations", [
+    (["(a)", "(c)"], 1),               # skipped marker
+    (["1.", "2.", "2.", "3."], 1),     # duplicated marker, numbering resumes after it
+    (["1.", "1."], 1),
+    (["2.", "3."], 1),                 # a list must start at its first value
+    (["1.", "(b)", "(c)"], 1),         # nested level not starting at (a)
+    (["1.", "x", "2."], 1),            # not a marker at all
+    (["(a)", "(c)", "(e)"], 2),
+])
+def test_skipped_or_duplicated_markers_are_violations(refs, violations):
+    assert marker_sequence_violations(refs) == violations
+
+
+def _items(*contents):
+    return [{"ref": str(n), "content": c} for n, c in enumerate(contents, start=1)]
+
+
+def test_clean_split_scores_full_confidence_and_tolerates_the_heading():
+    content = "Article 5 Scope\n1. First point.\n2. Second point."
+    score = score_item_split("Article 5 Scope", content, _items("1. First point.", "2. Second point."), ["1.", "2."])
+    assert score == {"confidence": 1.0, "markers": 2, "violations": 0, "coverage": 1.0}
+
+
+def test_violations_halve_confidence():
+    content = "1. First point.\n3. Third point."
+    score = score_item_split("Article 5", content, _items("1. First point.", "3. Third point."), ["1.", "3."])
+    assert score["violations"] == 1 and score["confidence"] == 0.25
+
+
+def test_uncovered_text_lowers_confidence():
+    content = "A long introductory paragraph that no item covers.\n1. First point.\n2. Second point."
+    score = score_item_split("Article 5", content, _items("1. First point.", "2. Second point."), ["1.", "2."])
+    assert score["violations"] == 0 and score["confidence"] == score["coverage"] < 0.5
+
+
+def test_no_markers_scores_zero():
+    assert split_items_by_rules("Article 5", "Plain text without any list.")[1]["confidence"] == 0.0
+    assert score_item_split("Article 5", "", [], [])["confidence"] == 0.0
+
+
+def test_split_items_by_rules_drops_footers_before_scoring():
+    items, score = split_items_by_rules("Article 5", "1. First point.\nPage 3\n2. Second point.")
+    assert [it["content"] for it in items] == ["1. First point.", "2. Second point."]
+    assert score["confidence"] == 1.0
+
+
+def test_only_low_confidence_articles_fall_through_to_the_llm(monkeypatch):
+    sent = []
+    call = utils.call_openai_for_items
+
+    def recording_call(messages):
+        sent.append(messages[-1]["content"])
+        return call(messages)
+
+    monkeypatch.setattr(utils, "call_openai_for_items", recording_call)
+    data = {"regulation": {"title": "R", "url": ""}, "articles": [
+        {"title": "Article 1", "content": "1. Clean first.\n2. Clean second.", "items": [], "path": []},
+        {"title": "Article 2", "content": "1. Broken first.\n3. Broken third.", "items": [], "path": []},
+        {"title": "Article 3", "content": "Only prose, no list.", "items": [], "path": []},
+    ]}
+    out, _ = run_llm_pass_2(data, max_workers=1, batch_token_budget=0, rules_first=True)
+    assert len(sent) == 2
+    assert "Broken third" in sent[0] and "Only prose" in sent[1]
+    assert [it["content"] for it in out["articles"][0]["items"]] == ["1. Clean first.", "2. Clean second."]
+
+    sent.clear()
+    run_llm_pass_2(data, max_workers=1, batch_token_budget=0, rules_first=False)
+    assert len(sent) == 3
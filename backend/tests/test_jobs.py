@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import JobManager
+from storage import SQLiteStorage
+
+
+class Cancelled(Exception):
+    pass
+
+
+class RecordingStorage(SQLiteStorage):
+    """SQLiteStorage that remembers every job record written."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.writes = []
+
+    def put_job(self, job_id, record):
+        self.writes.append((job_id, record))
+        super().put_job(job_id, record)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return RecordingStorage(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def manager(storage):
+    return JobManager(storage, max_workers=2)
+
+
+def _wait(manager, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        record = manager.status(job_id)
+        if record["status"] in jobs.FINISHED:
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_reports_progress_partial_results_and_success(manager):
+    def run(progress, cancel_event):
+        for i in range(3):
+            progress(i, 3, {"items": [i]})
+        return "done"
+
+    record = manager.submit("doc", "llm_pass_2", 3, run, lambda result: {"result": result}, Cancelled)
+    assert record["status"] == "queued" and record["partial"] == {}
+    final = _wait(manager, record["job_id"])
+    assert final["status"] == "succeeded"
+    assert final["result"] == "done"
+    assert final["completed"] == final["total"] == 3
+    assert final["partial"] == {"0": {"items": [0]}, "1": {"items": [1]}, "2": {"items": [2]}}
+    assert "partial_chunks" not in final
+
+
+def test_job_failure_is_recorded(manager):
+    def run(progress, cancel_event):
+        raise RuntimeError("boom")
+
+    record = manager.submit("doc", "llm_pass_3", 1, run, lambda result: None, Cancelled)
+    final = _wait(manager, record["job_id"])
+    assert final["status"] == "failed"
+    assert final["error"] == "boom"
+
+
+def test_cancel_stops_a_running_job(manager):
+    started = threading.Event()
+
+    def run(progress, cancel_event):
+        started.set()
+        for i in range(1000):
+            if cancel_event.is_set():
+                raise Cancelled()
+            progress(i, 1000, i)
+            time.sleep(0.005)
+        return "finished"
+
+    record = manager.submit("doc", "llm_pass_2", 1000, run, lambda result: None, Cancelled)
+    assert started.wait(5)
+    assert manager.cancel(record["job_id"])["cancel_requested"] is True
+    final = _wait(manager, record["job_id"])
+    assert final["status"] == "cancelled"
+    assert final["completed"] < 1000
+    assert len(final["partial"]) == final["completed"]
+
+
+def test_new_job_supersedes_the_running_one(manager, storage):
+    release = threading.Event()
+
+    def slow(progress, cancel_event):
+        while not cancel_event.wait(0.01):
+            if release.is_set():
+                return None
+        raise Cancelled()
+
+    first = manager.submit("doc", "llm_pass_2", 1, slow, lambda result: None, Cancelled)
+    storage.put_state("doc", active_job=first["job_id"])
+    second = manager.submit("doc", "llm_pass_2", 1, lambda progress, cancel_event: None, lambda result: None, Cancelled)
+    release.set()
+    assert _wait(manager, first["job_id"])["status"] == "superseded"
+    assert _wait(manager, second["job_id"])["status"] == "succeeded"
+
+
+def test_progress_writes_each_result_once(manager, storage, monkeypatch):
+    monkeypatch.setattr(jobs, "_SYNC_SECONDS", 0.0)
+    articles = 200
+
+    def run(progress, cancel_event):
+        for i in range(articles):
+            progress(i, articles, {"path": ["Chapter", str(i)]})
+        return None
+
+    record = manager.submit("doc", "llm_pass_3", articles, run, lambda result: None, Cancelled)
+    final = _wait(manager, record["job_id"])
+    assert len(final["partial"]) == articles
+    job_writes = [rec for key, rec in storage.writes if key == record["job_id"]]
+    chunk_writes = [rec for key, rec in storage.writes if key.startswith(f"{record['job_id']}-partial-")]
+    # The job record carries counters only; every result is stored exactly once
+    assert all("partial" not in rec for rec in job_writes)
+    assert sum(len(rec["partial"]) for rec in chunk_writes) == articles
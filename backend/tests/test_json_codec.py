@@ -0,0 +1,75 @@
+import gzip
+import json
+
+import pytest
+from werkzeug.datastructures import Accept
+
+import json_codec
+
+SAMPLES = [
+    {"b": 1, "a": [1, 2.5, None, True, False], "c": {"z": "ü", "y": "😀", "x": "\"quoted\"\n"}},
+    {"articles": [{"title": "Article 1", "content": "text", "items": [{"ref": "(a)", "content": "x"}], "path": []}]},
+    [1, -2, 3.25, 1e-7, "", {}],
+    {1: "int key", "s": "str key"},
+    "plain string",
+    2 ** 70,  # beyond 64 bits: orjson refuses it, the standard encoder takes over
+]
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def codec(request, monkeypatch):
+    if request.param == "orjson":
+        if json_codec.orjson is None:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(json_codec, "orjson", None)
+    return json_codec
+
+
+@pytest.mark.parametrize("value", SAMPLES)
+def test_dumps_matches_the_standard_library(codec, value):
+    expected = json.loads(json.dumps(value, ensure_ascii=False))
+    assert json.loads(codec.dumps(value)) == expected
+    assert codec.loads(codec.dumps_bytes(value)) == expected
+    assert codec.loads(codec.dumps(value)) == expected
+
+
+def test_sort_keys_orders_like_the_standard_library(codec):
+    value = {"b": {"d": 1, "c": 2}, "a": 0}
+    assert list(json.loads(codec.dumps(value, sort_keys=True))) == ["a", "b"]
+    assert codec.dumps(value, sort_keys=True).index('"c"') < codec.dumps(value, sort_keys=True).index('"d"')
+
+
+def test_output_is_utf8_without_ascii_escapes(codec):
+    assert "ü" in codec.dumps({"k": "ü"})
+    assert codec.dumps_bytes({"k": "ü"}) == codec.dumps({"k": "ü"}).encode("utf-8")
+
+
+def test_unserialisable_values_raise_type_error(codec):
+    with pytest.raises(TypeError):
+        codec.dumps({"k": object()})
+
+
+def test_choose_encoding_respects_mode_and_client(monkeypatch):
+    monkeypatch.setattr(json_codec, "zstandard", None)
+    assert json_codec.choose_encoding(Accept([("gzip", 1), ("br", 1)]), mode="auto") == "gzip"
+    assert json_codec.choose_encoding(Accept([("br", 1)]), mode="auto") is None
+    assert json_codec.choose_encoding(Accept([("gzip", 1)]), mode="off") is None
+    assert json_codec.choose_encoding(Accept([("zstd", 1), ("gzip", 0.5)]), mode="gzip") == "gzip"
+
+
+def test_zstd_is_preferred_when_installed(monkeypatch):
+    monkeypatch.setattr(json_codec, "zstandard", object())
+    assert json_codec.choose_encoding(Accept([("zstd", 1), ("gzip", 1)]), mode="auto") == "zstd"
+    assert json_codec.choose_encoding(Accept([("zstd", 0.5), ("gzip", 1)]), mode="auto") == "gzip"
+
+
+def test_maybe_compress_leaves_small_bodies_alone(monkeypatch):
+    monkeypatch.setattr(json_codec, "RESPONSE_COMPRESS_MIN_BYTES", 100)
+    monkeypatch.setattr(json_codec, "RESPONSE_COMPRESSION", "auto")
+    monkeypatch.setattr(json_codec, "zstandard", None)
+    accept = Accept([("gzip", 1)])
+    assert json_codec.maybe_compress(b"{}", accept) == (b"{}", None)
+    payload = json_codec.dumps_bytes({"content": "x" * 1000})
+    body, encoding = json_codec.maybe_compress(payload, accept)
+    assert encoding == "gzip" and gzip.decompress(body) == payload and len(body) < len(payload)
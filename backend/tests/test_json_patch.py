@@ -0,0 +1,135 @@
+import copy
+import random
+
+import pytest
+
+from json_patch import JsonPatchError, apply_patch, make_patch
+
+
+@pytest.mark.parametrize("doc, patch, expected", [
+    ({"foo": "bar"}, [{"op": "add", "path": "/baz", "value": "qux"}], {"foo": "bar", "baz": "qux"}),
+    ({"foo": ["bar", "baz"]}, [{"op": "add", "path": "/foo/1", "value": "qux"}], {"foo": ["bar", "qux", "baz"]}),
+    ({"foo": ["bar"]}, [{"op": "add", "path": "/foo/-", "value": "x"}], {"foo": ["bar", "x"]}),
+    ({"baz": "qux", "foo": "bar"}, [{"op": "remove", "path": "/baz"}], {"foo": "bar"}),
+    ({"foo": ["bar", "qux", "baz"]}, [{"op": "remove", "path": "/foo/1"}], {"foo": ["bar", "baz"]}),
+    ({"baz": "qux", "foo": "bar"}, [{"op": "replace", "path": "/baz", "value": "boo"}], {"baz": "boo", "foo": "bar"}),
+    (
+        {"foo": {"bar": "baz", "waldo": "fred"}, "qux": {"corge": "grault"}},
+        [{"op": "move", "from": "/foo/waldo", "path": "/qux/thud"}],
+        {"foo": {"bar": "baz"}, "qux": {"corge": "grault", "thud": "fred"}},
+    ),
+    ({"foo": ["all", "grass", "cows", "eat"]}, [{"op": "move", "from": "/foo/1", "path": "/foo/3"}],
+     {"foo": ["all", "cows", "eat", "grass"]}),
+    ({"a": {"x": 1}}, [{"op": "copy", "from": "/a", "path": "/b"}], {"a": {"x": 1}, "b": {"x": 1}}),
+    ({"/": 1, "~": 2}, [{"op": "replace", "path": "/~1", "value": 3}, {"op": "remove", "path": "/~0"}], {"/": 3}),
+    ({"foo": 1}, [{"op": "replace", "path": "", "value": [1]}], [1]),
+])
+def test_rfc6902_operations(doc, patch, expected):
+    before = copy.deepcopy(doc)
+    assert apply_patch(doc, patch) == expected
+    assert doc == before
+
+
+def test_test_operation():
+    doc = {"baz": "qux", "foo": ["a", 2, "c"]}
+    patch = [{"op": "test", "path": "/baz", "value": "qux"}, {"op": "test", "path": "/foo/1", "value": 2}]
+    assert apply_patch(doc, patch) == doc
+    with pytest.raises(JsonPatchError, match="Test failed"):
+        apply_patch(doc, [{"op": "test", "path": "/baz", "value": "bar"}])
+
+
+@pytest.mark.parametrize("patch", [
+    {"op": "add"},
+    [{"op": "add", "path": "/x"}],
+    [{"op": "frobnicate", "path": "/x", "value": 1}],
+    [{"op": "remove", "path": "/missing"}],
+    [{"op": "replace", "path": "/a/5", "value": 1}],
+    [{"op": "add", "path": "/a/01", "value": 1}],
+    [{"op": "add", "path": "no-slash", "value": 1}],
+    [{"op": "add", "path": "/b/c/d", "value": 1}],
+    [{"op": "move", "from": "/a", "path": "/a/0"}],
+    [{"op": "remove", "path": ""}],
+])
+def test_invalid_patches_raise(patch):
+    with pytest.raises(JsonPatchError):
+        apply_patch({"a": [1], "b": 2}, patch)
+
+
+def test_patch_error_is_a_value_error():
+    assert issubclass(JsonPatchError, ValueError)
+
+
+def test_copied_values_do_not_share_later_edits():
+    out = apply_patch({"a": {"x": 1}}, [
+        {"op": "copy", "from": "/a", "path": "/b"},
+        {"op": "replace", "path": "/b/x", "value": 2},
+        {"op": "replace", "path": "/a/x", "value": 3},
+    ])
+    assert out == {"a": {"x": 3}, "b": {"x": 2}}
+
+
+def test_apply_copies_only_the_touched_path():
+    doc = {"regulation": {"title": "T"}, "articles": [{"title": "A", "items": [1]}, {"title": "B", "items": [2]}]}
+    out = apply_patch(doc, [{"op": "replace", "path": "/articles/1/title", "value": "B2"}])
+    assert out["articles"][1]["title"] == "B2" and doc["articles"][1]["title"] == "B"
+    assert out["regulation"] is doc["regulation"]
+    assert out["articles"][0] is doc["articles"][0]
+    assert out["articles"][1]["items"] is doc["articles"][1]["items"]
+
+
+def test_make_patch_skips_shared_subtrees():
+    shared = {"content": "x" * 1000}
+    old = {"articles": [shared, {"title": "a"}]}
+    new = {"articles": [shared, {"title": "b", "path": ["Chapter 1"]}]}
+    assert make_patch(old, new) == [
+        {"op": "replace", "path": "/articles/1/title", "value": "b"},
+        {"op": "add", "path": "/articles/1/path", "value": ["Chapter 1"]},
+    ]
+    assert make_patch(old, old) == []
+
+
+def test_make_patch_distinguishes_types():
+    assert make_patch({"a": 1}, {"a": True}) == [{"op": "replace", "path": "/a", "value": True}]
+    assert make_patch({"a": 1}, {"a": 1.0}) == [{"op": "replace", "path": "/a", "value": 1.0}]
+
+
+def _random_value(rng, depth=0):
+    kind = rng.random()
+    if depth > 3 or kind < 0.4:
+        return rng.choice([0, 1, 2, "a", "b", "a/b", "~x", None, True, False, 1.5])
+    if kind < 0.7:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {rng.choice(["a", "b", "c", "d/e", "f~g", ""]): _random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def _mutate(rng, value, depth=0):
+    if isinstance(value, dict) and rng.random() < 0.8:
+        out = dict(value)
+        for key in list(out):
+            roll = rng.random()
+            if roll < 0.2:
+                del out[key]
+            elif roll < 0.6:
+                out[key] = _mutate(rng, out[key], depth + 1)
+        if rng.random() < 0.3:
+            out[rng.choice(["a", "z", "d/e"])] = _random_value(rng, depth + 1)
+        return out
+    if isinstance(value, list) and rng.random() < 0.8:
+        out = [_mutate(rng, v, depth + 1) if rng.random() < 0.4 else v for v in value]
+        if out and rng.random() < 0.3:
+            del out[rng.randrange(len(out))]
+        if rng.random() < 0.3:
+            out.append(_random_value(rng, depth + 1))
+        return out
+    return _random_value(rng, depth) if rng.random() < 0.5 else value
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_make_then_apply_round_trips(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        old = {"root": _random_value(rng)}
+        new = _mutate(rng, old)
+        before = copy.deepcopy(old), copy.deepcopy(new)
+        assert apply_patch(old, make_patch(old, new)) == new
+        assert (old, new) == before
@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMCache, bypass_cache, is_bypassed, make_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+def _sum_sizes(cache):
+    with sqlite3.connect(cache.path) as conn:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def test_make_key_is_stable_and_sensitive_to_every_parameter():
+    messages = [{"role": "user", "content": "hi"}]
+    key = make_key("m", 0.0, {"type": "json_object"}, messages)
+    assert key == make_key("m", 0.0, {"type": "json_object"}, [dict(messages[0])])
+    assert key != make_key("m2", 0.0, {"type": "json_object"}, messages)
+    assert key != make_key("m", 0.5, {"type": "json_object"}, messages)
+    assert key != make_key("m", 0.0, None, messages)
+
+
+def test_bypass_is_scoped_to_the_context():
+    assert not is_bypassed()
+    with bypass_cache():
+        assert is_bypassed()
+    assert not is_bypassed()
+
+
+def test_round_trip_and_hit_counters(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "c.sqlite3"))
+    assert cache.get("k") is None
+    cache.put("k", "välue")
+    assert cache.get("k") == "välue"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["bytes"] == len("välue".encode("utf-8"))
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "c.sqlite3"), ttl_seconds=100)
+    cache.put("old", "x")
+    clock.now += 50
+    assert cache.get("old") == "x"
+    clock.now += 51
+    assert cache.get("old") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_rows_are_swept_on_put(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "c.sqlite3"), ttl_seconds=100)
+    cache.put("old", "x" * 10)
+    clock.now += llm_cache._EXPIRY_SWEEP_SECONDS + 101
+    cache.put("new", "y")
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 1
+
+
+def test_size_eviction_drops_least_recently_used(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "c.sqlite3"), max_bytes=30, ttl_seconds=0)
+    for key in "abc":
+        cache.put(key, key * 10)
+        clock.now += 1
+    cache.get("a")  # now more recent than b
+    clock.now += 1
+    cache.put("d", "d" * 10)
+    assert cache.get("b") is None
+    assert [cache.get(k) is not None for k in "acd"] == [True, True, True]
+    assert cache.stats()["bytes"] == 30
+
+
+def test_running_total_tracks_replacements_and_clear(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "c.sqlite3"))
+    cache.put("k", "short")
+    cache.put("k", "a much longer value")
+    cache.put("j", "x")
+    assert cache.stats()["bytes"] == _sum_sizes(cache) == len("a much longer value") + 1
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
+
+
+def test_existing_cache_files_get_their_total_on_open(tmp_path, clock):
+    path = str(tmp_path / "c.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO responses VALUES ('k', 'abc', 3, ?, ?)", (clock.now, clock.now))
+    cache = LLMCache(path)
+    assert cache.stats()["bytes"] == 3
+    assert cache.get("k") == "abc"
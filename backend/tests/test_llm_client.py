@@ -0,0 +1,124 @@
+import threading
+import time
+import types
+
+import openai
+import pytest
+
+from llm_client import (
+    LatencyTracker,
+    LLMClient,
+    RetryPolicy,
+    build_llm_client,
+    is_retryable_error,
+    retry_after_seconds,
+)
+from llm_stub import StubClient, _api_error
+
+
+class ScriptedRaw:
+    """Raw client whose n-th call sleeps delays[n] seconds and answers with its call number."""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.params = []
+        self._lock = threading.Lock()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, **params):
+        with self._lock:
+            n = len(self.params)
+            self.params.append(params)
+        time.sleep(self.delays[n] if n < len(self.delays) else 0)
+        return n
+
+
+def test_retryable_errors():
+    assert is_retryable_error(_api_error(429))
+    assert is_retryable_error(_api_error(503))
+    assert is_retryable_error(openai.APITimeoutError(request=None))
+    assert not is_retryable_error(_api_error(400))
+    assert not is_retryable_error(ValueError("bad json"))
+
+
+def test_retry_after_header_is_read():
+    error = _api_error(429)
+    assert retry_after_seconds(error) is None
+    error.response.headers["retry-after"] = "2.5"
+    assert retry_after_seconds(error) == 2.5
+    error.response.headers["retry-after"] = "Wed, 21 Oct 2026 07:28:00 GMT"
+    assert retry_after_seconds(error) is None
+
+
+def test_latency_quantile_needs_enough_samples():
+    tracker = LatencyTracker(window=10)
+    for seconds in range(1, 21):
+        tracker.record("m", float(seconds))
+    assert tracker.quantile("m", 0.5) == 16.0  # only the last 10 samples (11..20) count
+    assert tracker.quantile("m", 0.95, min_samples=11) is None
+    assert tracker.quantile("other", 0.5) is None
+
+
+def test_complete_sends_deterministic_json_mode_requests():
+    raw = ScriptedRaw([0])
+    client = LLMClient(raw, timeout=5, deadline=0)
+    assert client.complete("m", [{"role": "user", "content": "hi"}]) == 0
+    params = raw.params[0]
+    assert params["temperature"] == 0
+    assert params["response_format"] == {"type": "json_object"}
+    assert params["timeout"] == 5
+    client.complete("m", [], response_format=None)
+    assert "response_format" not in raw.params[1]
+
+
+def test_retryable_errors_are_retried_then_raised():
+    stub = StubClient(error_rate=1.0, error_statuses=(500,), seed=1)
+    client = LLMClient(stub, retry=RetryPolicy(max_retries=2, base_delay=0.001, max_delay=0.001), deadline=0)
+    with pytest.raises(openai.InternalServerError):
+        client.complete("m", [{"role": "user", "content": "x"}])
+    assert stub.stats()["calls"] == 3
+
+
+def test_non_retryable_errors_are_not_retried():
+    stub = StubClient(error_rate=1.0, error_statuses=(400,), seed=1)
+    client = LLMClient(stub, retry=RetryPolicy(max_retries=5, base_delay=0.001), deadline=0)
+    with pytest.raises(openai.APIStatusError):
+        client.complete("m", [{"role": "user", "content": "x"}])
+    assert stub.stats()["calls"] == 1
+
+
+def test_deadline_bounds_the_whole_call():
+    stub = StubClient(latency=1.0)
+    client = LLMClient(stub, retry=RetryPolicy(max_retries=5, base_delay=0.01), timeout=10, deadline=0.2)
+    started = time.monotonic()
+    with pytest.raises((openai.APITimeoutError, TimeoutError)):
+        client.complete("m", [{"role": "user", "content": "x"}])
+    assert time.monotonic() - started < 0.6
+
+
+def test_slow_call_is_hedged_and_the_backup_wins():
+    raw = ScriptedRaw([2.0, 0.0])
+    client = LLMClient(raw, deadline=0, hedge=True, hedge_min_samples=5, hedge_min_delay=0.05)
+    for _ in range(5):
+        client.latency.record("m", 0.01)
+    started = time.monotonic()
+    assert client.complete("m", []) == 1
+    assert time.monotonic() - started < 1.0
+    assert client.stats()["hedged"] == 1 and client.stats()["hedge_wins"] == 1
+
+
+def test_no_hedging_without_latency_history():
+    raw = ScriptedRaw([0.1])
+    client = LLMClient(raw, deadline=0, hedge=True, hedge_min_samples=5, hedge_min_delay=0.01)
+    assert client.complete("m", []) == 0
+    assert len(raw.params) == 1 and client.stats()["hedged"] == 0
+
+
+def test_build_llm_client_backends():
+    assert isinstance(build_llm_client("stub").raw, StubClient)
+    with pytest.raises(RuntimeError, match="Unknown LLM_BACKEND"):
+        build_llm_client("nope")
+    with pytest.raises(RuntimeError, match="OPENAI_API_KEY"):
+        build_llm_client("openai", api_key=None)
+    with pytest.raises(RuntimeError, match="LLM_BASE_URL"):
+        build_llm_client("openai_compatible", base_url=None)
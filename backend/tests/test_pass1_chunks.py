@@ -0,0 +1,38 @@
+from utils import chunk_toc_pages, merge_chunk_headings
+
+
+def _titles(articles):
+    return [a["title"] for a in articles]
+
+
+def _arts(*titles):
+    return [{"title": t, "content": "", "items": [], "path": []} for t in titles]
+
+
+def test_chunks_are_page_aligned_and_repeat_the_overlap_page():
+    pages = ["a" * 40, "b" * 40, "c" * 40, "d" * 40]
+    chunks = chunk_toc_pages(pages, max_chars=90, overlap_pages=1)
+    assert chunks == ["\n".join(pages[0:2]), "\n".join(pages[1:4])]
+
+
+def test_merge_drops_the_overlap_repeats():
+    merged = merge_chunk_headings([
+        _arts("Article 1", "Article 2", "Article 3"),
+        _arts("Article 3", "Article 4"),
+    ])
+    assert _titles(merged) == ["Article 1", "Article 2", "Article 3", "Article 4"]
+
+
+def test_merge_compares_case_and_whitespace_insensitively():
+    merged = merge_chunk_headings([_arts("Article 1", "Article  2"), _arts("ARTICLE 2", "Article 3")])
+    assert _titles(merged) == ["Article 1", "Article  2", "Article 3"]
+
+
+def test_merge_keeps_headings_that_differ_only_by_ocr_confusables():
+    merged = merge_chunk_headings([_arts("Article 9", "Article 1O"), _arts("Article 10", "Annex l"), _arts("Annex 1")])
+    assert _titles(merged) == ["Article 9", "Article 1O", "Article 10", "Annex l", "Annex 1"]
+
+
+def test_merge_keeps_later_legitimate_repeats():
+    merged = merge_chunk_headings([_arts("Part 1", "Section 1"), _arts("Section 1", "Part 2", "Section 1")])
+    assert _titles(merged) == ["Part 1", "Section 1", "Part 2", "Section 1"]
@@ -0,0 +1,32 @@
+import os
+
+import pdf_document
+from bench_pipeline import write_pdf
+from pdf_document import PdfDocument, extract_pages_parallel
+
+
+def _pages(tag, count):
+    return [[f"{tag} page {n}", f"Article {n}"] for n in range(count)]
+
+
+def test_parallel_extraction_reuses_one_pool_and_sees_file_changes(tmp_path):
+    path = str(tmp_path / "a.pdf")
+    with open(path, "wb") as f:
+        f.write(write_pdf(_pages("first", 6)))
+    serial = PdfDocument.open(path).pages_text(list(range(6)))
+
+    assert extract_pages_parallel(path, list(range(6)), workers=2) == serial
+    pool = pdf_document._shared_pool
+    assert extract_pages_parallel(path, [5, 0], workers=2) == [serial[5], serial[0]]
+    assert pdf_document._shared_pool is pool
+
+    with open(path, "wb") as f:
+        f.write(write_pdf(_pages("second", 3)))
+    os.utime(path, ns=(1, 1))
+    assert [t.split("\n")[0] for t in extract_pages_parallel(path, [0, 2], workers=2)] == ["second page 0", "second page 2"]
+    assert pdf_document._shared_pool is pool
+
+
+def test_bytes_are_extracted_by_a_pool_of_their_own():
+    pdf = write_pdf(_pages("bytes", 4))
+    assert extract_pages_parallel(pdf, [3, 1], workers=2) == PdfDocument(pdf).pages_text([3, 1])
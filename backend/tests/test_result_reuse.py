@@ -0,0 +1,86 @@
+import pytest
+
+import utils
+from heading_locator import locate_article_spans
+from spans import BodyText, split_articles
+from utils import ResultReuse, run_llm_pass_2, run_llm_pass_3
+
+BODY = """CHAPTER 1
+Scope
+
+Article 1
+Subject matter
+(a) the first point;
+(b) the second point.
+
+Article 2
+Definitions
+(a) provider means a person;
+(b) user means another person.
+"""
+
+
+def _document():
+    return {
+        "regulation": {"title": "Test Regulation", "url": ""},
+        "articles": [
+            {"title": "Article 1", "content": "(a) the first point;\n(b) the second point.", "items": [], "path": []},
+            {"title": "Article 2", "content": "(a) provider means a person;\n(b) user means another person.", "items": [], "path": []},
+        ],
+    }
+
+
+def _span_document():
+    body = BodyText([BODY])
+    headings = {"regulation": {"title": "Test Regulation", "url": ""},
+                "articles": [{"title": "Article 1", "content": "", "items": [], "path": []},
+                             {"title": "Article 2", "content": "", "items": [], "path": []}]}
+    return split_articles(body, headings, locate_article_spans(body.text, ["Article 1", "Article 2"]))
+
+
+def _pass_2(previous, **options):
+    reuse = ResultReuse("items", previous)
+    run_llm_pass_2(_document(), max_workers=1, batch_token_budget=0, reuse=reuse, **options)
+    return reuse
+
+
+def test_same_settings_reuse_every_article():
+    first = _pass_2(None, rules_first=True)
+    again = _pass_2(first.current, rules_first=True)
+    assert again.summary() == {"reused": 2, "recomputed": 0}
+
+
+def test_switching_items_mode_recomputes():
+    rules = _pass_2(None, rules_first=True)
+    llm = _pass_2(rules.current, rules_first=False)
+    assert llm.summary() == {"reused": 0, "recomputed": 2}
+    assert _pass_2(llm.current, rules_first=True).summary() == {"reused": 0, "recomputed": 2}
+
+
+def test_changing_model_or_prompt_recomputes(monkeypatch):
+    first = _pass_2(None, rules_first=False)
+    monkeypatch.setattr(utils, "OPENAI_MODEL", "another-model")
+    assert _pass_2(first.current, rules_first=False).summary()["recomputed"] == 2
+    monkeypatch.undo()
+    monkeypatch.setattr(utils, "_ITEMS_SYSTEM", utils._ITEMS_SYSTEM + " Be brief.")
+    assert _pass_2(first.current, rules_first=False).summary()["recomputed"] == 2
+
+
+@pytest.mark.parametrize("second", [
+    {"local_paths": False},
+    {"local_paths": True, "refine": False},
+])
+def test_switching_path_mode_recomputes(second):
+    first = ResultReuse("path")
+    run_llm_pass_3(_span_document(), max_workers=1, batch_token_budget=0, reuse=first,
+                   pdf_source=b"", local_paths=True, refine=True)
+    assert first.summary() == {"reused": 0, "recomputed": 2}
+
+    same = ResultReuse("path", first.current)
+    run_llm_pass_3(_span_document(), max_workers=1, batch_token_budget=0, reuse=same,
+                   pdf_source=b"", local_paths=True, refine=True)
+    assert same.summary() == {"reused": 2, "recomputed": 0}
+
+    switched = ResultReuse("path", first.current)
+    run_llm_pass_3(_span_document(), max_workers=1, batch_token_budget=0, reuse=switched, pdf_source=b"", **second)
+    assert switched.summary() == {"reused": 0, "recomputed": 2}
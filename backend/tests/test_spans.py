@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from bench_pipeline import write_pdf
+from spans import BodyText, SpanDocument, SpanItem, split_articles, to_json
+from utils import fill_contents_from_body, run_llm_pass_2, run_llm_pass_3
+
+PAGES = [
+    ["Test Regulation", "Article 1 Scope", "Article 2 Definitions", "Article 3 Duties"],
+    ["CHAPTER I", "General provisions", "Article 1 Scope", "1. This Regulation applies to providers.",
+     "2. It also applies to users:", "(a) in the Union;", "Page 2"],
+    ["(b) outside the Union.", "Article 2 Definitions", "For the purposes of this Regulation:",
+     "(1) provider means a person;", "(2) user means another person.", "Page 3"],
+    ["CHAPTER II", "Obligations", "Article 3 Duties", "Providers shall comply.", "Page 4"],
+]
+TOC = (1, 1)
+HEADINGS = {
+    "regulation": {"title": "Test Regulation", "url": ""},
+    "articles": [
+        {"title": t, "content": "", "items": [], "path": []}
+        for t in ("Article 1 Scope", "Article 2 Definitions", "Article 3 Duties", "Article 9 Missing")
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def pdf():
+    return write_pdf(PAGES)
+
+
+def _without_pages(data):
+    return {**data, "articles": [{k: v for k, v in art.items() if k != "pages"} for art in data["articles"]]}
+
+
+def test_body_text_pages_and_lines():
+    body = BodyText(["  first line \nPage 7", "second"], first_page=3)
+    assert body.page_at(0) == 3 and body.page_at(body.text.index("second")) == 4
+    assert body.page_range(0, len(body.text)) == [3, 4]
+    segments = body.line_segments(0, len(body.text))
+    assert body.join(segments) == "first line\nPage 7\nsecond"
+    assert body.join(body.line_segments(0, len(body.text), drop_footers=True)) == "first line\nsecond"
+
+
+def test_span_splitter_matches_the_plain_splitter(pdf):
+    plain = fill_contents_from_body(pdf, HEADINGS, index_pages=TOC)
+    doc = fill_contents_from_body(pdf, HEADINGS, index_pages=TOC, spans=True)
+    assert isinstance(doc, SpanDocument)
+    assert _without_pages(to_json(doc)) == plain
+    assert plain["articles"][0]["content"].endswith("Page 2\n(b) outside the Union.")
+    assert "pages" not in plain["articles"][0]
+
+
+def test_located_articles_get_their_pages(pdf):
+    doc = to_json(fill_contents_from_body(pdf, HEADINGS, index_pages=TOC, spans=True))
+    # Article 2 runs up to the next article heading, so it takes in the CHAPTER II lines on page 4
+    assert [art.get("pages") for art in doc["articles"]] == [[2, 3], [3, 4], [4, 4], None]
+    assert doc["articles"][3]["content"] == ""
+
+
+def _article(text, title="Article 1"):
+    body = BodyText([text])
+    return split_articles(body, {"articles": [{"title": title, "content": "", "items": []}]}, [(0, len(text))])["articles"][0]
+
+
+def test_verbatim_items_become_spans_and_others_stay_dicts():
+    art = _article("Article 1\n1. First point.\nPage 9\n2. Second\npoint.\n")
+    items = [
+        {"ref": "1", "content": "1. First point."},
+        {"ref": "2", "content": "2. Second\npoint."},
+        {"ref": "3", "content": "3. Rewritten by the model."},
+        {"ref": "x", "content": "1. First point.", "note": "kept"},
+    ]
+    art["items"] = items
+    kinds = [type(it).__name__ for it in art._items]
+    assert kinds == ["SpanItem", "SpanItem", "dict", "SpanItem"]
+    assert art["items"] == items
+    assert art._items[3].extra == {"ref": "x", "content": None, "note": "kept"}
+
+
+def test_items_spanning_a_footer_line_map_back_exactly():
+    art = _article("Article 1\n(a) starts here\nPage 2\ncontinues here.\n(b) next.")
+    art["items"] = [{"ref": "a", "content": "(a) starts here\ncontinues here."}, {"ref": "b", "content": "(b) next."}]
+    assert all(isinstance(it, SpanItem) for it in art._items)
+    assert art["items"][0]["content"] == "(a) starts here\ncontinues here."
+
+
+def test_unlocated_articles_and_replaced_content_keep_plain_values():
+    body = BodyText(["Article 1\ntext"])
+    doc = split_articles(body, {"articles": [{"title": "Article 1", "content": "", "items": []}]}, [None])
+    art = doc["articles"][0]
+    art["items"] = [{"ref": "1", "content": "text"}]
+    assert art._items == [{"ref": "1", "content": "text"}] and "pages" not in art
+
+    located = _article("Article 1\nold text")
+    located["content"] = "new text"
+    assert not located.located and located["content"] == "new text"
+
+
+def test_copies_are_independent_and_serialise_to_plain_json():
+    art = _article("Article 1\n1. First.")
+    art["items"] = [{"ref": "1", "content": "1. First."}]
+    copy = art.copy()
+    copy["items"] = []
+    copy["path"] = ["Chapter I"]
+    assert art["items"] == [{"ref": "1", "content": "1. First."}] and "path" not in art
+    assert json.loads(json.dumps(art.to_json())) == {"title": "Article 1", "content": "1. First.", "items": [{"ref": "1", "content": "1. First."}], "pages": [1, 1]}
+
+
+@pytest.mark.parametrize("rules_first", [True, False])
+def test_passes_on_spans_round_trip_to_the_plain_json(pdf, rules_first):
+    plain = fill_contents_from_body(pdf, HEADINGS, index_pages=TOC)
+    doc = fill_contents_from_body(pdf, HEADINGS, index_pages=TOC, spans=True)
+    before = to_json(doc)
+
+    plain2, _ = run_llm_pass_2(plain, max_workers=1, batch_token_budget=0, rules_first=rules_first)
+    doc2, _ = run_llm_pass_2(doc, max_workers=1, batch_token_budget=0, rules_first=rules_first)
+    assert isinstance(doc2, SpanDocument)
+    assert _without_pages(to_json(doc2)) == plain2
+    assert any(isinstance(it, SpanItem) for art in doc2["articles"] for it in art._items)
+
+    plain3, _ = run_llm_pass_3(plain2, max_workers=1, batch_token_budget=0, pdf_source=pdf, index_pages=TOC, local_paths=True)
+    doc3, _ = run_llm_pass_3(doc2, max_workers=1, batch_token_budget=0, pdf_source=pdf, index_pages=TOC, local_paths=True)
+    assert _without_pages(to_json(doc3)) == plain3
+    assert to_json(doc) == before  # the passes work on copies
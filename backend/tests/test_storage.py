@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from storage import FileSystemStorage, SQLiteStorage
+
+
+@pytest.fixture(params=["sqlite", "file"])
+def storage(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteStorage(str(tmp_path / "isplit.sqlite3"))
+    return FileSystemStorage(str(tmp_path / "docs"))
+
+
+def test_document_round_trip(storage):
+    sha = storage.create_document("doc", b"%PDF-1.4 one", "one.pdf")
+    storage.put_state("doc", data={"articles": []}, index_pages=[1, 2])
+    assert storage.get_meta("doc")["sha256"] == sha
+    assert storage.read_pdf("doc") == b"%PDF-1.4 one"
+    assert storage.get_state("doc") == {"data": {"articles": []}, "index_pages": [1, 2]}
+    assert [doc_id for doc_id, _ in storage.list_documents()] == ["doc"]
+    assert storage.delete_document("doc")
+    assert storage.get_meta("doc") is None and not storage.delete_document("doc")
+
+
+def test_sqlite_connections_are_closed(tmp_path, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        opened.append(connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(sqlite3, "connect", tracking_connect)
+    storage = SQLiteStorage(str(tmp_path / "isplit.sqlite3"))
+    storage.create_document("doc", b"%PDF-1.4", None)
+    storage.put_state("doc", data={})
+    storage.get_state("doc")
+    storage.delete_document("doc")
+    assert opened
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_sqlite_create_and_delete_of_a_shared_pdf_do_not_interleave(tmp_path, monkeypatch):
+    storage = SQLiteStorage(str(tmp_path / "isplit.sqlite3"))
+    sha = storage.create_document("old", b"%PDF-1.4 same", None)
+    blob = storage._blob_path(sha)
+    exists = os.path.exists
+    deleter = []
+
+    def exists_then_race(path):
+        found = exists(path)
+        if path == blob and not deleter:
+            # The last other document with this PDF is deleted while "new" is being created
+            deleter.append(threading.Thread(target=storage.delete_document, args=("old",)))
+            deleter[0].start()
+            deleter[0].join(0.5)
+        return found
+
+    monkeypatch.setattr(os.path, "exists", exists_then_race)
+    storage.create_document("new", b"%PDF-1.4 same", None)
+    deleter[0].join()
+    monkeypatch.undo()
+    assert storage.get_meta("old") is None
+    assert storage.read_pdf("new") == b"%PDF-1.4 same"
+    assert os.listdir(storage.blob_dir) == [f"{sha}.pdf"]
+
+
+def test_sqlite_blob_is_removed_with_its_last_document(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "isplit.sqlite3"))
+    sha = storage.create_document("a", b"%PDF-1.4 same", None)
+    storage.create_document("b", b"%PDF-1.4 same", None)
+    storage.delete_document("a")
+    assert os.path.exists(storage._blob_path(sha))
+    storage.delete_document("b")
+    assert os.listdir(storage.blob_dir) == []
+
+
+def test_deleting_a_document_removes_its_jobs(storage):
+    storage.create_document("doc", b"%PDF-1.4", None)
+    storage.create_document("other", b"%PDF-1.4 other", None)
+    for job_id in ("job1", "job1-partial-0", "job1-partial-1", "job1-cancel"):
+        storage.put_job(job_id, {"document_id": "doc", "partial": {"0": [1]}})
+    storage.put_job("job2", {"document_id": "other"})
+    storage.delete_document("doc")
+    for job_id in ("job1", "job1-partial-0", "job1-partial-1", "job1-cancel"):
+        assert storage.get_job(job_id) is None
+    assert storage.get_job("job2") == {"document_id": "other"}
+
+
+def test_expired_documents_take_their_jobs_with_them(storage):
+    storage.create_document("doc", b"%PDF-1.4", None)
+    storage.put_job("job1", {"document_id": "doc"})
+    assert storage.expire_idle(-1) == ["doc"]
+    assert storage.get_job("job1") is None
+
+
+def test_jobs_written_after_deletion_do_not_recreate_the_document(tmp_path):
+    storage = FileSystemStorage(str(tmp_path / "docs"))
+    storage.create_document("doc", b"%PDF-1.4", None)
+    storage.delete_document("doc")
+    storage.put_job("late", {"document_id": "doc"})
+    assert not os.path.exists(tmp_path / "docs" / "doc")
+    assert storage.list_documents() == []
@@ -0,0 +1,41 @@
+from bench_pipeline import synthetic_regulation, write_pdf
+from toc_detect import detect_toc, score_toc_page
+
+TOC_PAGE = "\n".join(["Table of Contents"] + [f"Article {n} Provision number {n} ........ {n + 2}" for n in range(1, 20)])
+PROSE = " ".join(["The provider shall ensure that the system complies with the requirements set out in this Regulation."] * 3)
+PROSE_PAGE = "\n".join([PROSE[i:i + 80] + "." for i in range(0, len(PROSE), 80)])
+
+
+def _pdf(*pages):
+    return write_pdf([page.split("\n") for page in pages])
+
+
+def test_toc_pages_score_above_prose():
+    assert score_toc_page(TOC_PAGE) >= 0.8
+    assert score_toc_page(PROSE_PAGE) == 0.0
+    assert score_toc_page("Article 1\nArticle 2") == 0.0  # too few lines to judge
+
+
+def test_toc_first_document():
+    pages, toc_pages = synthetic_regulation(60, 12)
+    detection = detect_toc(write_pdf(pages))
+    assert (detection["toc_start"], detection["toc_end"]) == (1, toc_pages)
+    assert detection["body_start"] == toc_pages + 1
+    assert len(detection["scores"]) == len(pages)
+
+
+def test_toc_after_a_cover_page_picks_the_strongest_run():
+    cover = "Official Journal\nRegulation of the Parliament\nof 1 January 2025\non benchmarks"
+    detection = detect_toc(_pdf(cover, TOC_PAGE, TOC_PAGE, PROSE_PAGE, PROSE_PAGE))
+    assert (detection["toc_start"], detection["toc_end"], detection["body_start"]) == (2, 3, 4)
+    assert 0 < detection["confidence"] <= 1
+
+
+def test_document_without_a_toc():
+    assert detect_toc(_pdf(PROSE_PAGE, PROSE_PAGE, PROSE_PAGE)) is None
+
+
+def test_only_the_first_pages_are_scanned():
+    pdf = _pdf(PROSE_PAGE, PROSE_PAGE, TOC_PAGE)
+    assert detect_toc(pdf, max_pages=2) is None
+    assert detect_toc(pdf, max_pages=3)["toc_start"] == 3
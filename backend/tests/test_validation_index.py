@@ -0,0 +1,76 @@
+from bench_pipeline import write_pdf
+from pdf_document import PdfDocument
+from validation_index import (
+    ShingleIndex,
+    get_validation_index,
+    iter_text_fields,
+    normalise_for_validation,
+    validate_json,
+    validation_report,
+)
+
+PAGES = [
+    "Article 1 Subject matter\nThis Regulation lays down harmonised rules on the placing on the market.",
+    "Article 2 Scope\nIt applies to “providers” placing systems on the market\nin the Union — irrespective of where they are established.",
+]
+
+
+def test_normalisation_unifies_quotes_dashes_and_punctuation():
+    assert normalise_for_validation("“Providers” — in the\nUnion; (a)") == '"providers" - in the union a'
+    assert normalise_for_validation("") == ""
+
+
+def test_match_partial_and_missing():
+    index = ShingleIndex(PAGES)
+    assert index.check("this regulation lays down harmonised rules") == {"status": "match", "coverage": 1.0, "pages": [1]}
+    partial = index.check("This Regulation lays down harmonised rules on cheese and wine for everyone")
+    assert partial["status"] == "partial" and 0 < partial["coverage"] < 1 and partial["pages"] == [1]
+    assert index.check("nothing of this appears in the document at all") == {"status": "missing", "coverage": 0.0, "pages": []}
+    assert index.check("  ")["status"] == "empty"
+
+
+def test_short_phrases_and_page_breaks():
+    index = ShingleIndex(PAGES)
+    assert index.check("Article 2 Scope")["pages"] == [2]
+    assert index.check("Scope Article")["status"] == "missing"
+    # Quotes, dashes and line breaks in the PDF do not matter
+    assert index.check('applies to "providers" placing systems on the market in the Union - irrespective')["status"] == "match"
+    # Shingles run across pages and belong to the page their first word is on
+    assert index.check("placing on the market. Article 2 Scope It applies")["status"] == "match"
+
+
+def test_field_paths_use_the_index_convention():
+    data = {"regulation": {"title": "T", "url": "http://x"},
+            "articles": [{"title": "A", "items": [{"ref": "1", "content": "c"}], "path": ["P", ""]}]}
+    assert list(iter_text_fields(data)) == [
+        ("regulation.title", "T"),
+        ("articles[0].title", "A"),
+        ("articles[0].items[0].content", "c"),
+        ("articles[0].path[0]", "P"),
+    ]
+    assert list(iter_text_fields(["a", ["b"]])) == [("[0]", "a"), ("[1][0]", "b")]
+
+
+def test_validate_json_reports_every_field_and_a_summary():
+    index = ShingleIndex(PAGES)
+    report = validate_json(index, {"articles": [
+        {"title": "Article 1 Subject matter", "content": "This Regulation lays down harmonised rules on the placing on the market."},
+        {"title": "Article 7 Invented", "content": "Entirely made up text that the model wrote itself."},
+    ]})
+    by_path = {f["path"]: f["status"] for f in report["fields"]}
+    assert by_path == {
+        "articles[0].title": "match",
+        "articles[0].content": "match",
+        "articles[1].title": "missing",
+        "articles[1].content": "missing",
+    }
+    assert report["summary"]["fields"] == 4 and report["summary"]["match"] == 2 and report["summary"]["missing"] == 2
+    assert 0 < report["summary"]["coverage"] < 1
+
+
+def test_report_on_a_pdf_reuses_its_index():
+    doc = PdfDocument(write_pdf([page.split("\n") for page in PAGES]))
+    report = validation_report(doc, {"articles": [{"title": "Article 2 Scope"}]}, ["harmonised rules on the placing", "not in the pdf"])
+    assert report["fields"][0]["path"] == "articles[0].title" and report["fields"][0]["pages"] == [2]
+    assert [s["status"] for s in report["snippets"]] == ["match", "missing"]
+    assert get_validation_index(doc) is get_validation_index(doc)
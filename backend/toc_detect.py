@@ -0,0 +1,92 @@
+import os
+import re
+from typing import List, Optional
+
+from pdf_document import get_document
+
+# Pages scanned from the front of the document, and the score a page needs to count as TOC
+TOC_DETECT_MAX_PAGES = int(os.getenv("TOC_DETECT_MAX_PAGES", "40"))
+TOC_DETECT_MIN_SCORE = float(os.getenv("TOC_DETECT_MIN_SCORE", "0.35"))
+
+_HEADING_LINE_RE = re.compile(
+    r"^(?:(?:article|art\.|section|chapter|part|title|annex|schedule|appendix)\s+[\divxlcdm]+\b"
+    r"|\d+(?:\.\d+)*\.?\s+\S)",
+    re.IGNORECASE,
+)
+_TRAILING_PAGE_RE = re.compile(r"(?:\s|\.)\d{1,4}$")
+_DOT_LEADER_RE = re.compile(r"(?:\.\s?){4,}|…{2,}|_{4,}|·{4,}")
+_PAGE_FOOTER_RE = re.compile(r"^(?:page\s*)?\d{1,4}$", re.IGNORECASE)
+_CONTENTS_RE = re.compile(r"\b(?:table of contents|contents|index)\b", re.IGNORECASE)
+
+# TOC entries are short; body paragraphs that start with a number ("1.1 Scope This Act applies ...") are not
+_MAX_ENTRY_CHARS = 90
+
+
+# ----------------------------
+# Page scoring
+# ----------------------------
+
+def score_toc_page(text: str) -> float:
+    """0..1 likelihood that a page is part of a table of contents.
+
+    Combines the share of short heading-like lines (Article/Section/Chapter/
+    numbered), lines ending in a page number or dot leaders, a 'Contents'
+    caption, and a penalty for running prose.
+    """
+    lines = [ln.strip() for ln in (text or "").split("\n")]
+    lines = [ln for ln in lines if ln and not _PAGE_FOOTER_RE.match(ln)]
+    if len(lines) < 3:
+        return 0.0
+    n = len(lines)
+    headings = sum(1 for ln in lines if len(ln) <= _MAX_ENTRY_CHARS and _HEADING_LINE_RE.match(ln))
+    page_refs = sum(1 for ln in lines if _TRAILING_PAGE_RE.search(ln))
+    leaders = sum(1 for ln in lines if _DOT_LEADER_RE.search(ln))
+    prose = sum(1 for ln in lines if len(ln) > 60 and ln.endswith((".", ";", ",")) and not _DOT_LEADER_RE.search(ln))
+    caption = 0.25 if any(_CONTENTS_RE.search(ln) for ln in lines[:8]) else 0.0
+
+    score = (
+        0.55 * headings / n
+        + 0.25 * max(page_refs, leaders) / n
+        + 0.15 * leaders / n
+        + caption
+        - 0.6 * prose / n
+    )
+    return round(max(0.0, min(1.0, score)), 4)
+
+
+# ----------------------------
+# Range detection
+# ----------------------------
+
+def detect_toc(pdf_source: object, max_pages: int = TOC_DETECT_MAX_PAGES, min_score: float = TOC_DETECT_MIN_SCORE) -> Optional[dict]:
+    """Propose the TOC page range (1-based, inclusive) and the first body page.
+
+    Scores the first `max_pages` pages from the cached page text and picks the
+    run of consecutive pages above `min_score` with the highest total score.
+    Returns None when no page looks like a TOC.
+    """
+    doc = get_document(pdf_source)
+    count = min(doc.num_pages, max_pages)
+    scores: List[float] = [score_toc_page(t) for t in doc.pages_text(list(range(count)))]
+
+    best = None  # (total, start, end)
+    start = None
+    for i, score in enumerate(scores + [0.0]):
+        if score >= min_score and start is None:
+            start = i
+        elif score < min_score and start is not None:
+            total = sum(scores[start:i])
+            if best is None or total > best[0]:
+                best = (total, start, i - 1)
+            start = None
+    if best is None:
+        return None
+
+    total, first, last = best
+    return {
+        "toc_start": first + 1,
+        "toc_end": last + 1,
+        "body_start": min(last + 2, doc.num_pages),
+        "confidence": round(total / (last - first + 1), 4),
+        "scores": scores,
+    }
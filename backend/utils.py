@@ -3,56 +3,85 @@
 import os
 import json
 import re
-from typing import Optional, Tuple, List
-from datetime import datetime
+import hashlib
+import time
+from typing import Callable, Dict, Optional, Tuple, List
 
-from pypdf import PdfReader
 from dotenv import load_dotenv
-from openai import OpenAI
-from io import BytesIO
-from io import IOBase
+
+from batching import LLM_BATCH_MAX_ARTICLES, LLM_BATCH_TOKEN_BUDGET, count_tokens, pack_batches
+from concurrency import RateLimiter, map_ordered
+from debug_artifacts import start_run
+from llm_cache import LLMCache, is_bypassed, make_key
+from llm_client import LLM_BACKEND, RetryPolicy, build_llm_client
+from logs import fields, get_logger
+from metrics import llm_cache_lookups, llm_call_seconds, llm_errors, llm_tokens, span, timed_stage
+from pdf_document import get_document
+from spans import BodyText, SpanDocument, split_articles
+from heading_locator import locate_article_spans, normalise_heading
+from hierarchy import PATH_LLM_REFINE, PATH_LOCAL_ENGINE, assign_paths
+from item_rules import ITEMS_RULES_FIRST, ITEMS_RULES_MIN_CONFIDENCE, score_item_split
+from toc_detect import detect_toc
 
 # ----------------------------
 # Env & client
 # ----------------------------
 load_dotenv()
+log = get_logger("utils")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_MODEL1 = os.getenv("OPENAI_MODEL1", "gpt-4o-mini")
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY missing. Add it to your .env")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Concurrency / rate limits for the per-article passes (0 = unlimited)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+
+# Pass 1: TOC excerpts longer than this are split into page-aligned chunks run concurrently
+PASS1_CHUNK_CHARS = int(os.getenv("PASS1_CHUNK_CHARS", "24000"))
+PASS1_CHUNK_OVERLAP_PAGES = int(os.getenv("PASS1_CHUNK_OVERLAP_PAGES", "1"))
+
+# On-disk cache of LLM responses keyed by request content
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache", "responses.sqlite3"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+rate_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+# Backend chosen by LLM_BACKEND (see llm_client.py); raises if OPENAI_API_KEY is needed and missing
+llm = build_llm_client(
+    LLM_BACKEND,
+    api_key=OPENAI_API_KEY,
+    rate_limiter=rate_limiter,
+    retry=RetryPolicy(max_retries=LLM_MAX_RETRIES),
+)
+llm_cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS) if LLM_CACHE_ENABLED else None
 
 
 # ----------------------------
 # PDF Extraction Helpers
 # ----------------------------
 
-def _open_pdf_reader(pdf_source: object) -> PdfReader:
-    """Return a PdfReader from a path, bytes, or file-like object.
-
-    Accepts:
-    - str path
-    - bytes/bytearray
-    - file-like object with .read()
-    """
-    if isinstance(pdf_source, (bytes, bytearray)):
-        return PdfReader(BytesIO(pdf_source))
-    if isinstance(pdf_source, IOBase) or hasattr(pdf_source, "read"):
-        return PdfReader(pdf_source)
-    # assume string-like path
-    return PdfReader(pdf_source)  # type: ignore[arg-type]
-
+@timed_stage("extract_pdf_text")
 def extract_pdf_text(
     pdf_source: object,
     index_pages: Optional[Tuple[int, int]] = None,
     max_chars: int = 128000,
 ) -> str:
-    """Extract text from a PDF (path, bytes, or file-like)."""
-    reader = _open_pdf_reader(pdf_source)
-    n = len(reader.pages)
+    """Extract text from a PDF (path, bytes, file-like, or PdfDocument)."""
+    merged = "\n".join(extract_pdf_pages(pdf_source, index_pages)).strip()
+    return merged[:max_chars]
+
+
+@timed_stage("extract_pdf_pages")
+def extract_pdf_pages(
+    pdf_source: object,
+    index_pages: Optional[Tuple[int, int]] = None,
+) -> List[str]:
+    """Text of each page in the 1-based inclusive range (default: the first 5 pages)."""
+    doc = get_document(pdf_source)
+    n = doc.num_pages
 
     if index_pages:
         start, end = index_pages
@@ -62,32 +91,17 @@ def extract_pdf_text(
     else:
         page_indices = list(range(min(n, 5)))
 
-    chunks: List[str] = []
-    for i in page_indices:
-        text = reader.pages[i].extract_text() or ""
-        chunks.append(text)
-
-    merged = "\n".join(chunks).strip()
-    return merged[:max_chars]
+    return doc.pages_text(page_indices)
 
 
+@timed_stage("extract_pdf_text_range")
 def extract_pdf_text_range(
     pdf_source: object,
     start_page_1based: int,
     end_page_1based: Optional[int] = None,
 ) -> str:
     """Concatenate text from start_page_1based..end_page_1based (inclusive)."""
-    reader = _open_pdf_reader(pdf_source)
-    total = len(reader.pages)
-    s = max(1, start_page_1based)
-    e = end_page_1based if end_page_1based is not None else total
-    e = min(e, total)
-
-    out: List[str] = []
-    for i in range(s - 1, e):
-        text = reader.pages[i].extract_text() or ""
-        out.append(text)
-    return "\n".join(out)
+    return get_document(pdf_source).text_range(start_page_1based, end_page_1based)
 
 
 # ----------------------------
@@ -186,17 +200,28 @@ def build_headings_prompt(pdf_excerpt: str) -> List[dict]:
     return [system, user]
 
 
+_ITEMS_SYSTEM = (
+    "You are a careful parser that returns strict JSON only. "
+    "Do NOT include code fences, backticks, or explanations. "
+    "Preserve the provided text verbatim; do not paraphrase or reflow. "
+    "Only remove standalone footer markers such as 'Page N'."
+)
+
+_ITEMS_RULES = (
+    "Rules:\n"
+    "- Prefer explicit markers at the start of lines: '1.', '(1)', '(i)', '(a)', '-', '•'.\n"
+    "- Each returned item must carry its marker as 'ref' (e.g., '1', '(a)', 'i').\n"
+    "- If no markers exist, split conservatively into sentences or paragraph blocks.\n"
+    "- Keep text verbatim; do NOT reformat, reflow, or alter punctuation.\n"
+    "- Remove standalone lines like 'Page 3' if present.\n"
+)
+
+_BATCH_KEY_RULE = "- Answer for every article, keyed by the number in its '=== Article N ===' header.\n"
+
+
 def build_items_prompt(article_title: str, article_content: str) -> List[dict]:
     """Build strict-JSON prompt for items extraction."""
-    system = {
-        "role": "system",
-        "content": (
-            "You are a careful parser that returns strict JSON only. "
-            "Do NOT include code fences, backticks, or explanations. "
-            "Preserve the provided text verbatim; do not paraphrase or reflow. "
-            "Only remove standalone footer markers such as 'Page N'."
-        ),
-    }
+    system = {"role": "system", "content": _ITEMS_SYSTEM}
 
     target = {
         "items": [
@@ -208,13 +233,8 @@ def build_items_prompt(article_title: str, article_content: str) -> List[dict]:
         "role": "user",
         "content": (
             "Task: Split the following Article body into items.\n"
-            "Rules:\n"
-            "- Prefer explicit markers at the start of lines: '1.', '(1)', '(i)', '(a)', '-', '•'.\n"
-            "- Each returned item must carry its marker as 'ref' (e.g., '1', '(a)', 'i').\n"
-            "- If no markers exist, split conservatively into sentences or paragraph blocks.\n"
-            "- Keep text verbatim; do NOT reformat, reflow, or alter punctuation.\n"
-            "- Remove standalone lines like 'Page 3' if present.\n"
-            "Return JSON only in the shape: \n" + json.dumps(target, indent=2, ensure_ascii=False) + "\n\n"
+            + _ITEMS_RULES
+            + "Return JSON only in the shape: \n" + json.dumps(target, indent=2, ensure_ascii=False) + "\n\n"
             f"Article title: {article_title}\n\n"
             f"Article content (verbatim):\n{article_content}"
         ),
@@ -222,35 +242,97 @@ def build_items_prompt(article_title: str, article_content: str) -> List[dict]:
     return [system, user]
 
 
-def build_path_prompt(article_title: str, article_content: str) -> List[dict]:
-    """Build strict-JSON prompt for path extraction."""
-    system = {
-        "role": "system",
+def items_batch_section(index: int, article_title: str, article_content: str) -> str:
+    """One article's block inside a batched items prompt."""
+    return f"=== Article {index} ===\nArticle title: {article_title}\n\nArticle content (verbatim):\n{article_content}\n\n"
+
+
+def build_items_batch_prompt(articles: List[Tuple[int, str, str]]) -> List[dict]:
+    """Strict-JSON items prompt for several (index, title, content) articles, answered by index."""
+    system = {"role": "system", "content": _ITEMS_SYSTEM}
+
+    target = {
+        "articles": {
+            "<N>": {"items": [{"ref": "<identifier>", "content": "<verbatim chunk>"}]}
+        }
+    }
+
+    user = {
+        "role": "user",
         "content": (
-            "You are a careful parser that returns strict JSON only. "
-            "Do NOT include code fences, backticks, or explanations. "
-            "Preserve text verbatim. Look for hierarchical structure in legal documents."
+            "Task: Split each of the following Article bodies into items.\n"
+            + _ITEMS_RULES
+            + _BATCH_KEY_RULE
+            + "Return JSON only in the shape: \n" + json.dumps(target, indent=2, ensure_ascii=False) + "\n\n"
+            + "".join(items_batch_section(i, title, content) for i, title, content in articles)
         ),
     }
+    return [system, user]
+
+
+_PATH_SYSTEM = (
+    "You are a careful parser that returns strict JSON only. "
+    "Do NOT include code fences, backticks, or explanations. "
+    "Preserve text verbatim. Look for hierarchical structure in legal documents."
+)
+
+_PATH_RULES = (
+    "RULES:\n"
+    "1. Look for higher-level headings that contain or precede this article\n"
+    "2. Common patterns: 'Chapter I', 'Part 1', 'Title II', 'Section A', '1 Something', '2 Something', etc.\n"
+    "3. If the article title itself is a chapter/part/title, include it in path\n"
+    "4. If no hierarchical structure found in article content and article title is empty, return empty list [], mostly return a heading if present\n"
+    "5. Return verbatim text of headings found\n\n"
+    "Examples:\n"
+    "- If content shows 'Chapter I - General Provisions' before articles → path: ['Chapter I - General Provisions']\n"
+    "- If title is 'Chapter I - General Provisions' → path: ['Chapter I - General Provisions']\n"
+    "- If just a regular article with no chapter structure → path: []\n\n"
+)
+
+
+def _path_excerpt(article_content: str) -> str:
+    """The start of an article's content, which is where its headings appear."""
+    return article_content[:1000] + "..." if len(article_content) > 1000 else article_content
+
+
+def build_path_prompt(article_title: str, article_content: str) -> List[dict]:
+    """Build strict-JSON prompt for path extraction."""
+    system = {"role": "system", "content": _PATH_SYSTEM}
 
     target = {"path": ["<higher-level heading>"]}
 
     instructions = (
         "Extract the hierarchical path for this legal article.\n\n"
-        "RULES:\n"
-        "1. Look for higher-level headings that contain or precede this article\n"
-        "2. Common patterns: 'Chapter I', 'Part 1', 'Title II', 'Section A', '1 Something', '2 Something', etc.\n"
-        "3. If the article title itself is a chapter/part/title, include it in path\n"
-        "4. If no hierarchical structure found in article content and article title is empty, return empty list [], mostly return a heading if present\n"
-        "5. Return verbatim text of headings found\n\n"
-        "Examples:\n"
-        "- If content shows 'Chapter I - General Provisions' before articles → path: ['Chapter I - General Provisions']\n"
-        "- If title is 'Chapter I - General Provisions' → path: ['Chapter I - General Provisions']\n"
-        "- If just a regular article with no chapter structure → path: []\n\n"
-        "Return JSON only:\n"
+        + _PATH_RULES
+        + "Return JSON only:\n"
         + json.dumps(target, indent=2, ensure_ascii=False)
         + "\n\nArticle title:\n" + (article_title or "")
-        + "\n\nArticle content:\n" + (article_content[:1000] + "..." if len(article_content) > 1000 else article_content)
+        + "\n\nArticle content:\n" + _path_excerpt(article_content)
+    )
+
+    user = {"role": "user", "content": instructions}
+    return [system, user]
+
+
+def path_batch_section(index: int, article_title: str, article_content: str) -> str:
+    """One article's block inside a batched path prompt."""
+    return f"=== Article {index} ===\nArticle title:\n{article_title or ''}\n\nArticle content:\n{_path_excerpt(article_content)}\n\n"
+
+
+def build_path_batch_prompt(articles: List[Tuple[int, str, str]]) -> List[dict]:
+    """Strict-JSON path prompt for several (index, title, content) articles, answered by index."""
+    system = {"role": "system", "content": _PATH_SYSTEM}
+
+    target = {"articles": {"<N>": {"path": ["<higher-level heading>"]}}}
+
+    instructions = (
+        "Extract the hierarchical path for each of the following legal articles.\n\n"
+        + _PATH_RULES
+        + _BATCH_KEY_RULE
+        + "Return JSON only:\n"
+        + json.dumps(target, indent=2, ensure_ascii=False)
+        + "\n\n"
+        + "".join(path_batch_section(i, title, content) for i, title, content in articles)
     )
 
     user = {"role": "user", "content": instructions}
@@ -261,38 +343,63 @@ def build_path_prompt(article_title: str, article_content: str) -> List[dict]:
 # OpenAI API Callers
 # ----------------------------
 
-def call_openai_for_headings(messages: List[dict]) -> dict:
+def estimate_tokens(messages: List[dict]) -> int:
+    """Rough prompt token estimate (~4 characters per token) for rate limiting."""
+    return sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+
+
+def _call_json(model: str, messages: List[dict], use_cache: bool = True, pass_name: str = "other") -> dict:
+    """Call the model in JSON mode, serving repeated requests from the cache.
+
+    With use_cache=False (or inside llm_cache.bypass_cache()) the cache is not
+    read, but the fresh response still replaces the stored one. Only responses
+    that parse as JSON are cached. Latency, tokens, cache lookups and errors
+    are recorded per pass (metrics.py).
+    """
+    with span("llm_call", llm_pass=pass_name, model=model) as current:
+        key = None
+        if llm_cache is not None:
+            key = make_key(model, 0, {"type": "json_object"}, messages)
+            if use_cache and not is_bypassed():
+                cached = llm_cache.get(key)
+                llm_cache_lookups.inc(llm_pass=pass_name, result="miss" if cached is None else "hit")
+                if cached is not None:
+                    if current is not None:
+                        current.attrs["cached"] = True
+                    return parse_json_strict_or_coerce(cached)
+
+        started = time.perf_counter()
+        try:
+            resp = llm.complete(model, messages, tokens=estimate_tokens(messages))
+        except Exception as e:
+            llm_errors.inc(llm_pass=pass_name, error=type(e).__name__)
+            raise
+        finally:
+            llm_call_seconds.observe(time.perf_counter() - started, llm_pass=pass_name)
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            llm_tokens.inc(usage.prompt_tokens or 0, llm_pass=pass_name, kind="prompt")
+            llm_tokens.inc(usage.completion_tokens or 0, llm_pass=pass_name, kind="completion")
+            if current is not None:
+                current.attrs.update(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+        content = resp.choices[0].message.content
+        parsed = parse_json_strict_or_coerce(content)
+        if key is not None:
+            llm_cache.put(key, content)
+        return parsed
+
+
+def call_openai_for_headings(messages: List[dict], use_cache: bool = True) -> dict:
     """Calls the model with JSON mode."""
-    resp = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=messages,
-        temperature=0,
-        response_format={"type": "json_object"},
-    )
-    content = resp.choices[0].message.content
-    return parse_json_strict_or_coerce(content)
+    return _call_json(OPENAI_MODEL, messages, use_cache=use_cache, pass_name="llm_pass_1")
 
 
-def call_openai_for_items(messages: List[dict]) -> dict:
-    resp = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=messages,
-        temperature=0,
-        response_format={"type": "json_object"},
-    )
-    content = resp.choices[0].message.content
-    return parse_json_strict_or_coerce(content)
+def call_openai_for_items(messages: List[dict], use_cache: bool = True) -> dict:
+    return _call_json(OPENAI_MODEL, messages, use_cache=use_cache, pass_name="llm_pass_2")
 
 
-def call_openai_for_path(messages: List[dict]) -> dict:
-    resp = client.chat.completions.create(
-        model=OPENAI_MODEL1,
-        messages=messages,
-        temperature=0,
-        response_format={"type": "json_object"},
-    )
-    content = resp.choices[0].message.content
-    return parse_json_strict_or_coerce(content)
+def call_openai_for_path(messages: List[dict], use_cache: bool = True) -> dict:
+    return _call_json(OPENAI_MODEL1, messages, use_cache=use_cache, pass_name="llm_pass_3")
 
 
 # ----------------------------
@@ -311,7 +418,11 @@ def build_title_regex(heading: str) -> re.Pattern:
         flexible = token.replace(r'o', r'[o0]').replace(r'i', r'[il1]').replace(r'v', r'[vw]')
         flexible_tokens.append(flexible)
 
-    pattern = r"\s*" + r"\s+".join(flexible_tokens) + r"\s*"
+    # Whole words only: "Article 1" must not match inside "Article 10" or "article is"
+    first, last = tokens[0][0], tokens[-1][-1]
+    lead = r"(?<!\w)" if re.match(r"\w", first) else ""
+    trail = r"(?!\w)" if re.match(r"\w", last) else ""
+    pattern = r"\s*" + lead + r"\s+".join(flexible_tokens) + trail + r"\s*"
     return re.compile(pattern, flags=re.DOTALL | re.IGNORECASE)
 
 
@@ -323,32 +434,14 @@ def fill_contents_from_excerpt(
     text = excerpt_text or ""
     articles = headings_json.get("articles", [])
 
-    # Find start positions of each heading in the excerpt
-    starts: List[Optional[int]] = []
-    cursor = 0
-    for art in articles:
-        title = (art.get("title") or "").strip()
-        if not title:
-            starts.append(None)
-            continue
-        pat = build_title_regex(title)
-        m = pat.search(text, pos=cursor)
-        if m:
-            starts.append(m.start())
-            cursor = m.start()
-        else:
-            starts.append(None)
+    # Find each heading's slice in the excerpt in one scan
+    spans = locate_article_spans(text, [(art.get("title") or "").strip() for art in articles])
 
     filled_articles: List[dict] = []
-    for i, art in enumerate(articles):
-        start_idx = starts[i]
+    for art, span in zip(articles, spans):
         content_text = ""
-        if start_idx is not None:
-            end_idx = len(text)
-            for j in range(i + 1, len(articles)):
-                if starts[j] is not None and starts[j] > start_idx:
-                    end_idx = starts[j]
-                    break
+        if span is not None:
+            start_idx, end_idx = span
             content_text = text[start_idx:end_idx].rstrip()
 
         new_art = dict(art)
@@ -360,65 +453,64 @@ def fill_contents_from_excerpt(
     return result
 
 
+def body_start_page(pdf_source: object, index_pages: Optional[Tuple[int, int]] = None) -> int:
+    """First body page (1-based): TOC end + 1, else detected from the page text, else page 6."""
+    if index_pages and len(index_pages) == 2 and index_pages[1]:
+        return int(index_pages[1]) + 1
+    detected = detect_toc(pdf_source)
+    if detected:
+        return detected["body_start"]
+    return 6  # Conservative default if no TOC is recognisable
+
+
+def extract_body_text(pdf_source: object, index_pages: Optional[Tuple[int, int]] = None) -> str:
+    """Text of the PDF body: page (TOC end + 1) through the last page."""
+    return extract_pdf_text_range(
+        pdf_source, start_page_1based=body_start_page(pdf_source, index_pages), end_page_1based=None
+    )
+
+
+def read_body(pdf_source: object, index_pages: Optional[Tuple[int, int]] = None) -> BodyText:
+    """The PDF body (same text as extract_body_text) with its page boundaries."""
+    doc = get_document(pdf_source)
+    start = max(1, body_start_page(doc, index_pages))
+    return BodyText(doc.pages_text(list(range(start - 1, doc.num_pages))), first_page=start)
+
+
+@timed_stage("fill_contents_from_body")
 def fill_contents_from_body(
     pdf_source: object,
     headings_json: dict,
     index_pages: Optional[Tuple[int, int]] = None,
-) -> dict:
+    spans: bool = False,
+):
     """
     Read the PDF body starting at page (TOC end + 1) through the end and
     slice verbatim content between headings found by Pass 1.
     The first heading line itself is removed from the content slice.
-    """
-    # Determine the page to start scanning body text
-    if index_pages and len(index_pages) == 2 and index_pages[1]:
-        body_start_page = int(index_pages[1]) + 1
-    else:
-        body_start_page = 6  # Conservative default if TOC unknown
 
-    body_text = extract_pdf_text_range(
-        pdf_source, start_page_1based=body_start_page, end_page_1based=None
-    )
+    With `spans`, returns a SpanDocument: contents (and later items) stay
+    offsets into one shared body text until read or serialised with
+    to_json(), and located articles also get 'pages'. Otherwise returns the
+    plain JSON dict.
+    """
+    body = read_body(pdf_source, index_pages)
 
     articles = headings_json.get("articles", [])
-    compiled: List[Tuple[str, re.Pattern]] = []
-    for art in articles:
-        title = (art.get("title") or "").strip()
-        compiled.append((title, build_title_regex(title)))
-
-    # Locate each heading occurrence in order using a moving cursor
-    starts: List[Optional[int]] = []
-    cursor = 0
-    for title, pat in compiled:
-        if not title:
-            starts.append(None)
-            continue
-        m = pat.search(body_text, pos=cursor)
-        if m:
-            starts.append(m.start())
-            cursor = m.start()
-        else:
-            starts.append(None)
+
+    # Locate all headings in one scan of the normalised body; boundaries in one pass
+    located = locate_article_spans(body.text, [(art.get("title") or "").strip() for art in articles])
+
+    if spans:
+        return split_articles(body, headings_json, located)
 
     filled_articles: List[dict] = []
-    for i, art in enumerate(articles):
-        start_idx = starts[i]
+    for art, span in zip(articles, located):
         content_text = ""
-        if start_idx is not None:
-            end_idx = len(body_text)
-            for j in range(i + 1, len(articles)):
-                if starts[j] is not None and starts[j] > start_idx:
-                    end_idx = starts[j]
-                    break
-
+        if span is not None:
             # Remove heading line itself
-            raw_slice = body_text[start_idx:end_idx]
-            lines = raw_slice.split('\n')
-            if lines:
-                content_text = '\n'.join([ln.strip() for ln in lines[1:] if ln.strip()])
-            else:
-                content_text = raw_slice.strip()
-
+            lines = body.text[span[0]:span[1]].split('\n')
+            content_text = '\n'.join([ln.strip() for ln in lines[1:] if ln.strip()])
         new_art = dict(art)
         new_art["content"] = content_text
         filled_articles.append(new_art)
@@ -439,10 +531,10 @@ def _remove_footers_and_page_numbers(text: str) -> str:
     return "\n".join(cleaned)
 
 
-def split_into_items_verbatim(content: str) -> List[dict]:
-    """Split a law-like article body into items preserving verbatim text."""
+def _split_items_with_markers(content: str) -> Tuple[List[dict], List[str]]:
+    """split_into_items_verbatim plus the raw marker of each item ([] for the sentence fallback)."""
     if not content:
-        return []
+        return [], []
 
     content = _remove_footers_and_page_numbers(content)
 
@@ -467,7 +559,7 @@ def split_into_items_verbatim(content: str) -> List[dict]:
         items: List[dict] = []
         for idx, part in enumerate(parts, start=1):
             items.append({"ref": str(idx), "content": part})
-        return items
+        return items, []
 
     items: List[dict] = []
     starts = [m.start() for m in matches]
@@ -490,27 +582,27 @@ def split_into_items_verbatim(content: str) -> List[dict]:
             "content": block
         })
 
-    return items
+    return items, [m.group('marker') for m in matches]
+
+
+def split_into_items_verbatim(content: str) -> List[dict]:
+    """Split a law-like article body into items preserving verbatim text."""
+    return _split_items_with_markers(content)[0]
+
+
+def split_items_by_rules(title: str, content: str) -> Tuple[List[dict], dict]:
+    """Local item split of one article and its confidence score (see item_rules.score_item_split)."""
+    cleaned = _remove_footers_and_page_numbers(content or "")
+    items, markers = _split_items_with_markers(cleaned)
+    return items, score_item_split(title, cleaned, items, markers)
 
 
 # ----------------------------
 # Main pipeline functions
 # ----------------------------
 
-def run_llm_pass_1(
-    pdf_source: object,
-    index_pages: Optional[Tuple[int, int]],
-    out_dir: str = "debug_outputs",
-) -> Tuple[dict, str, str]:
-    """Run LLM Pass 1: extract document title, URL, and headings from PDF."""
-    print(f"[UTILS] LLM Pass 1: Extracting text from pages {index_pages}")
-    excerpt = extract_pdf_text(pdf_source, index_pages=index_pages, max_chars=200000)
-    print(f"[UTILS] LLM Pass 1: Extracted {len(excerpt)} characters from PDF")
-    
-    msgs = build_headings_prompt(excerpt)
-    print(f"[UTILS] LLM Pass 1: Calling OpenAI for document info and headings extraction")
-    headings_raw = call_openai_for_headings(msgs)
-
+def _normalise_headings_response(headings_raw: dict) -> Tuple[str, str, List[dict]]:
+    """(regulation title, url, articles) from a headings response, with empty content/items/path."""
     # Extract regulation info from LLM response
     regulation_info = headings_raw.get("regulation", {})
     regulation_title = regulation_info.get("title", "").strip()
@@ -525,35 +617,111 @@ def run_llm_pass_1(
             "items": art.get("items", []) if isinstance(art.get("items", []), list) else [],
             "path": art.get("path", []) if isinstance(art.get("path", []), list) else [],
         })
+    return regulation_title, regulation_url, normalised_articles
+
+
+def chunk_toc_pages(pages: List[str], max_chars: int, overlap_pages: int) -> List[str]:
+    """Page-aligned chunks of at most ~max_chars, each repeating the previous chunk's last pages."""
+    groups = pack_batches([len(p) + 1 for p in pages], max_chars)
+    chunks = []
+    for group in groups:
+        first = max(0, group[0] - overlap_pages) if chunks else group[0]
+        chunks.append("\n".join(pages[first:group[-1] + 1]).strip())
+    return chunks
+
+
+def merge_chunk_headings(chunk_articles: List[List[dict]], window: int = 50) -> List[dict]:
+    """Concatenate per-chunk headings in order, dropping the repeats caused by chunk overlap.
+
+    A chunk's leading headings that already appear among the last `window`
+    merged headings are skipped; the first new heading ends the overlap, so
+    headings that legitimately repeat later (e.g. 'Section 1') are kept.
+    Titles are compared ignoring case and whitespace only, so headings that
+    differ by an OCR confusable ('Article 1O' / 'Article 10') stay distinct.
+    """
+    merged: List[dict] = []
+    for articles in chunk_articles:
+        tail = [normalise_heading(a["title"]) for a in merged[-window:]]
+        in_overlap = bool(merged)
+        for art in articles:
+            key = normalise_heading(art["title"])
+            if in_overlap and key in tail:
+                tail = tail[tail.index(key) + 1:]
+                continue
+            in_overlap = False
+            merged.append(art)
+    return merged
+
+
+@timed_stage("llm_pass_1")
+def run_llm_pass_1(
+    pdf_source: object,
+    index_pages: Optional[Tuple[int, int]],
+    out_dir: str = "debug_outputs",
+    chunk_chars: Optional[int] = None,
+) -> Tuple[dict, str, str]:
+    """Run LLM Pass 1: extract document title, URL, and headings from PDF.
+
+    TOC excerpts longer than `chunk_chars` (defaults to PASS1_CHUNK_CHARS; 0
+    disables chunking) are split into page-aligned, slightly overlapping chunks
+    that are sent concurrently; headings are merged in order and the title/url
+    come from the first chunk.
+    """
+    debug = start_run("llm_pass_1", out_dir)
+    pages = extract_pdf_pages(pdf_source, index_pages)
+    excerpt = "\n".join(pages).strip()
+    log.info("Pass 1: extracted TOC text", extra=fields(index_pages=index_pages, pages=len(pages), chars=len(excerpt)))
+
+    limit = PASS1_CHUNK_CHARS if chunk_chars is None else chunk_chars
+    if limit > 0 and len(excerpt) > limit and len(pages) > 1:
+        chunks = chunk_toc_pages(pages, limit, PASS1_CHUNK_OVERLAP_PAGES)
+        log.info("Pass 1: extracting headings from TOC chunks", extra=fields(chunks=len(chunks), pages=len(pages)))
+
+        def extract_chunk(chunk: str) -> Tuple[dict, List[dict]]:
+            chunk_msgs = build_headings_prompt(chunk)
+            return call_openai_for_headings(chunk_msgs), chunk_msgs
+
+        responses = map_ordered(extract_chunk, chunks, max_workers=LLM_MAX_CONCURRENCY)
+        parsed = [_normalise_headings_response(raw) for raw, _ in responses]
+        regulation_title, regulation_url, _ = parsed[0]
+        normalised_articles = merge_chunk_headings([arts for _, _, arts in parsed])
+        for chunk_index, (raw, chunk_msgs) in enumerate(responses):
+            debug.add(f"messages_chunk_{chunk_index}", chunk_msgs)
+            debug.add(f"headings_chunk_{chunk_index}", raw)
+    else:
+        excerpt = excerpt[:200000]
+        msgs = build_headings_prompt(excerpt)
+        log.debug("Pass 1: extracting headings in one request", extra=fields(chars=len(excerpt)))
+        headings_raw = call_openai_for_headings(msgs)
+        regulation_title, regulation_url, normalised_articles = _normalise_headings_response(headings_raw)
+        debug.add("messages", msgs)
 
     headings_json = {
         "regulation": {"title": regulation_title, "url": regulation_url},
         "articles": normalised_articles,
     }
     
-    print(f"[UTILS] LLM Pass 1: Extracted document title: '{regulation_title}'")
-    print(f"[UTILS] LLM Pass 1: Extracted document URL: '{regulation_url}'")
-    print(f"[UTILS] LLM Pass 1: Extracted {len(normalised_articles)} articles")
+    log.info(
+        "Pass 1: extracted headings",
+        extra=fields(articles=len(normalised_articles), title_chars=len(regulation_title), has_url=bool(regulation_url)),
+    )
 
-    os.makedirs(out_dir, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    with open(os.path.join(out_dir, f"excerpt_{ts}.txt"), "w", encoding="utf-8") as f:
-        f.write(excerpt)
-    with open(os.path.join(out_dir, f"messages_{ts}.json"), "w", encoding="utf-8") as f:
-        json.dump(msgs, f, indent=2, ensure_ascii=False)
-    with open(os.path.join(out_dir, f"headings_{ts}.json"), "w", encoding="utf-8") as f:
-        json.dump(headings_json, f, indent=2, ensure_ascii=False)
+    debug.add("excerpt", excerpt)
+    debug.add("headings", headings_json)
+    debug.close()
 
-    print(f"[LLM PASS 1] Wrote debug files with timestamp {ts} in {out_dir}/")
-    return headings_json, excerpt, ts
+    log.debug("Pass 1: recorded debug artifacts", extra=fields(run_id=debug.run_id))
+    return headings_json, excerpt, debug.run_id
 
 
+@timed_stage("splitter_1")
 def run_splitter_1(
     pdf_source: object,
     index_pages: Optional[Tuple[int, int]],
     headings_json: dict,
     source_excerpt: Optional[str] = None,
     out_dir: str = "debug_outputs",
+    spans: bool = False,
 ) -> Tuple[dict, str]:
     """Splitter 1: Slice verbatim content between headings.
 
@@ -561,103 +729,413 @@ def run_splitter_1(
     - TOC page range (index_pages) applies only to LLM Pass 1.
     - For splitting, we read from page (TOC end + 1) to the end of the PDF.
     - This ensures we capture the entire body text between headings, not the TOC excerpt.
+
+    With `spans` the result is a SpanDocument (see fill_contents_from_body),
+    which Pass 2 and Pass 3 accept and return without materialising content.
     """
-    body_start = (index_pages[1] + 1) if (index_pages and len(index_pages) > 1 and index_pages[1]) else 6
-    print(f"[UTILS] Splitter 1: Reading body from page {body_start} onwards")
     # Always prefer reading the body after TOC for splitting; ignore excerpt here
-    final_json = fill_contents_from_body(pdf_source, headings_json, index_pages=index_pages)
-    print(f"[UTILS] Splitter 1: Filled content for {len(final_json.get('articles', []))} articles")
+    final_json = fill_contents_from_body(pdf_source, headings_json, index_pages=index_pages, spans=spans)
+    articles = final_json.get("articles", [])
+    log.info(
+        "Splitter 1: filled article contents",
+        extra=fields(
+            articles=len(articles),
+            with_content=sum(1 for a in articles if a.get("content")),
+            content_chars=sum(len(a.get("content") or "") for a in articles),
+        ),
+    )
+
+    debug = start_run("splitter_1", out_dir)
+    debug.add("final", final_json)
+    debug.close()
+    log.debug("Splitter 1: recorded debug artifacts", extra=fields(run_id=debug.run_id))
+    return final_json, debug.run_id
+
+
+def _working_copy(json_data):
+    """A pass's copy of its input, sharing everything it does not change.
+
+    Passes only assign per-article keys ('items', 'path'), so copying the
+    top-level dict, the articles list and each article dict is enough:
+    contents, items and other nested values are shared with the input, which
+    is never modified. SpanDocuments copy their article views the same way.
+    """
+    if isinstance(json_data, SpanDocument):
+        return json_data.copy()
+    data = dict(json_data)
+    if isinstance(data.get("articles"), list):
+        data["articles"] = [dict(art) if isinstance(art, dict) else art for art in data["articles"]]
+    return data
+
+
+class PassCancelled(Exception):
+    """Raised when a pass is cancelled before every article was processed."""
+
+
+# progress(article_index, total_articles, article_result), called as each article finishes
+ProgressCallback = Callable[[int, int, object], None]
+
+
+def _check_cancelled(cancel_event, article_index: int) -> None:
+    """Stop before issuing another LLM call once cancellation was requested."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise PassCancelled(f"Cancelled before article {article_index}")
+
+
+def _extract_items_for_article(title: str, content: str) -> Tuple[List[dict], List[dict]]:
+    """Run the items prompt for one article; returns (items, messages)."""
+    raw_content = _remove_footers_and_page_numbers(content)
+    msgs = build_items_prompt(title, raw_content)
+    items_obj = call_openai_for_items(msgs)
+    items = items_obj.get("items", []) if isinstance(items_obj, dict) else []
+
+    if not items:
+        items = split_into_items_verbatim(raw_content)
+    return items, msgs
+
+
+def _extract_path_for_article(title: str, content: str) -> Tuple[List[str], List[dict]]:
+    """Run the path prompt for one article; returns (path, messages)."""
+    msgs = build_path_prompt(title, content)
+    result = call_openai_for_path(msgs)
+    path_list = result.get("path", []) if isinstance(result, dict) else []
+    if not isinstance(path_list, list):
+        path_list = []
+    return path_list, msgs
 
-    os.makedirs(out_dir, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    with open(os.path.join(out_dir, f"final_{ts}.json"), "w", encoding="utf-8") as f:
-        json.dump(final_json, f, indent=2, ensure_ascii=False)
-    print(f"[SPLITTER 1] Wrote final_{ts}.json to {out_dir}/")
-    return final_json, ts
+
+# ----------------------------
+# Incremental re-runs
+# ----------------------------
+
+def article_fingerprint(field: str, title: str, content: str, scope: str = "") -> str:
+    """Hash of what a pass sends for one article: title + content for items, title + truncated content for path.
+
+    `scope` describes how the pass answered (mode, model, prompt); results
+    produced under a different scope get a different fingerprint.
+    """
+    text = _path_excerpt(content) if field == "path" else content
+    return hashlib.sha256(json.dumps([field, scope, title, text], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def prompt_version(build_prompt: Callable[[str, str], List[dict]]) -> str:
+    """Short hash of a per-article prompt template, so editing a prompt invalidates reused results."""
+    template = json.dumps(build_prompt("", ""), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+class ResultReuse:
+    """Per-article results of a previous run of one pass, keyed by input fingerprint.
+
+    The pass calls set_scope() with its mode, model and prompt version before
+    fingerprinting, so results from other settings are never reused. After
+    the pass, `current` maps this run's fingerprints to their results (to be
+    stored for the next run) and `reused` / `recomputed` count articles.
+    """
+
+    def __init__(self, field: str, previous: Optional[Dict[str, object]] = None):
+        self.field = field
+        self.previous: Dict[str, object] = previous or {}
+        self.current: Dict[str, object] = {}
+        self.scope = ""
+        self.reused = 0
+        self.recomputed = 0
+
+    def set_scope(self, **settings: object) -> None:
+        self.scope = json.dumps(settings, sort_keys=True)
+
+    def fingerprint(self, art: dict) -> str:
+        return article_fingerprint(self.field, art.get("title", "") or "", art.get("content", "") or "", self.scope)
+
+    def summary(self) -> dict:
+        return {"reused": self.reused, "recomputed": self.recomputed}
+
+
+def _batch_answers(result: object) -> dict:
+    """The {"<index>": {...}} mapping of a batched response ({} if missing)."""
+    answers = result.get("articles") if isinstance(result, dict) else None
+    return answers if isinstance(answers, dict) else {}
+
+
+def _valid_items(items: object) -> bool:
+    return isinstance(items, list) and bool(items) and all(
+        isinstance(it, dict) and isinstance(it.get("content"), str) for it in items
+    )
+
+
+def _valid_path(path: object) -> bool:
+    return isinstance(path, list) and all(isinstance(p, str) for p in path)
 
 
+def _extract_batch(
+    batch: List[Tuple[int, dict]],
+    build_prompt: Callable[[List[Tuple[int, str, str]]], List[dict]],
+    call: Callable[[List[dict]], dict],
+    field: str,
+    is_valid: Callable[[object], bool],
+    clean: Callable[[str], str],
+    extract_one: Callable[[int, dict], Tuple[object, List[dict]]],
+) -> Dict[int, Tuple[object, List[dict]]]:
+    """One request for several articles; articles the response omitted or mangled get single calls."""
+    msgs = build_prompt([(i, art.get("title", ""), clean(art.get("content", "") or "")) for i, art in batch])
+    try:
+        answers = _batch_answers(call(msgs))
+    except ValueError as e:
+        log.warning("Batched response unusable; using single-article calls", extra=fields(field=field, articles=len(batch), error=str(e)[:120]))
+        answers = {}
+
+    out: Dict[int, Tuple[object, List[dict]]] = {}
+    retried = []
+    for i, art in batch:
+        entry = answers.get(str(i))
+        value = entry.get(field) if isinstance(entry, dict) else None
+        if is_valid(value):
+            out[i] = (value, msgs)
+        else:
+            retried.append(i)
+            out[i] = extract_one(i, art)
+    if retried:
+        log.info("Batched response incomplete; articles re-run individually", extra=fields(field=field, retried=len(retried), articles=len(batch)))
+    return out
+
+
+def _map_articles(
+    articles: List[dict],
+    extract_one: Callable[[int, dict], Tuple[object, List[dict]]],
+    extract_batch: Callable[[List[Tuple[int, dict]]], Dict[int, Tuple[object, List[dict]]]],
+    build_batch_prompt: Callable[[List[Tuple[int, str, str]]], List[dict]],
+    batch_section: Callable[[int, str, str], str],
+    model: str,
+    budget: int,
+    workers: int,
+    progress: Optional[ProgressCallback],
+    cancel_event,
+    reuse: Optional[ResultReuse] = None,
+    local: Optional[Callable[[int, dict], Optional[object]]] = None,
+) -> List[Tuple[object, Optional[List[dict]]]]:
+    """(result, messages) per article, in order.
+
+    With a positive token `budget`, consecutive articles are packed into
+    shared requests whose prompt stays within the budget (counted locally).
+    Articles whose fingerprint is in `reuse` keep their previous result
+    (messages None) without an LLM call, as do articles `local` can answer
+    (it returns None to send an article to the LLM).
+    """
+    total = len(articles)
+    results: Dict[int, Tuple[object, Optional[List[dict]]]] = {}
+    fingerprints = [reuse.fingerprint(art) for art in articles] if reuse is not None else []
+    if reuse is not None:
+        for i, fp in enumerate(fingerprints):
+            if fp in reuse.previous:
+                results[i] = (reuse.previous[fp], None)
+        log.info("Reusing unchanged articles", extra=fields(reused=len(results), recomputed=total - len(results)))
+    todo = [i for i in range(total) if i not in results]
+    remote = todo
+    if local is not None:
+        remote = []
+        for i in todo:
+            value = local(i, articles[i])
+            if value is None:
+                remote.append(i)
+            else:
+                results[i] = (value, None)
+        log.info("Answered articles locally", extra=fields(local=len(todo) - len(remote), remote=len(remote)))
+
+    if budget > 0 and len(remote) > 1:
+        overhead = sum(count_tokens(m["content"], model) for m in build_batch_prompt([]))
+        sizes = [
+            count_tokens(batch_section(i, articles[i].get("title", ""), articles[i].get("content", "") or ""), model)
+            for i in remote
+        ]
+        groups = [[remote[j] for j in group] for group in pack_batches(sizes, budget - overhead, LLM_BATCH_MAX_ARTICLES)]
+        log.info("Packed articles into batched requests", extra=fields(articles=len(remote), requests=len(groups), budget=budget))
+    else:
+        groups = [[i] for i in remote]
+
+    if progress is not None:
+        for i in sorted(results):
+            progress(i, total, results[i][0])
+
+    def process(group: List[int]) -> Dict[int, Tuple[object, List[dict]]]:
+        _check_cancelled(cancel_event, group[0])
+        if len(group) == 1:
+            out = {group[0]: extract_one(group[0], articles[group[0]])}
+        else:
+            out = extract_batch([(i, articles[i]) for i in group])
+        if progress is not None:
+            for i in group:
+                progress(i, total, out[i][0])
+        return out
+
+    for out in map_ordered(process, groups, max_workers=workers):
+        results.update(out)
+    if reuse is not None:
+        reuse.reused = total - len(todo)
+        reuse.recomputed = len(todo)
+        reuse.current = {fp: results[i][0] for i, fp in enumerate(fingerprints)}
+    return [results[i] for i in range(total)]
+
+
+@timed_stage("llm_pass_2")
 def run_llm_pass_2(
     json_data: dict,
     out_dir: str = "debug_outputs",
+    max_workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel_event=None,
+    batch_token_budget: Optional[int] = None,
+    reuse: Optional[ResultReuse] = None,
+    rules_first: Optional[bool] = None,
 ) -> Tuple[dict, str]:
-    """LLM Pass 2: Extract items for all articles."""
-    os.makedirs(out_dir, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    """LLM Pass 2: Extract items for all articles.
+
+    Articles are processed with up to `max_workers` requests in flight
+    (defaults to LLM_MAX_CONCURRENCY); results keep the original article order.
+    `progress` is called as each article finishes; once `cancel_event` is set
+    no further LLM calls are issued and PassCancelled is raised. With a
+    positive `batch_token_budget` (defaults to LLM_BATCH_TOKEN_BUDGET) short
+    articles share requests. Articles unchanged since the run recorded in
+    `reuse` keep their previous result. With `rules_first` (defaults to
+    ITEMS_RULES_FIRST) articles are split locally and only splits scoring
+    below ITEMS_RULES_MIN_CONFIDENCE go to the LLM. A SpanDocument input
+    (run_splitter_1 with spans=True) comes back as one, with items found
+    verbatim in their article stored as spans of the body.
+    """
+    debug = start_run("llm_pass_2", out_dir)
 
-    data = json.loads(json.dumps(json_data))  # deep copy
+    data = _working_copy(json_data)
     articles = data.get("articles", [])
-    
-    print(f"[UTILS] LLM Pass 2: Processing {len(articles)} articles for items extraction")
+    workers = LLM_MAX_CONCURRENCY if max_workers is None else max_workers
 
-    for article_index, art in enumerate(articles):
-        title = art.get("title", "")
-        raw_content = _remove_footers_and_page_numbers(art.get("content", ""))
-        
-        print(f"[UTILS] LLM Pass 2: Processing article {article_index + 1}/{len(articles)}: {title[:50]}...")
+    log.info("Pass 2: extracting items", extra=fields(articles=len(articles), workers=workers))
 
-        msgs = build_items_prompt(title, raw_content)
-        items_obj = call_openai_for_items(msgs)
-        items = items_obj.get("items", []) if isinstance(items_obj, dict) else []
-
-        if not items:
-            items = split_into_items_verbatim(raw_content)
+    def extract_one(article_index: int, art: dict) -> Tuple[List[dict], List[dict]]:
+        title = art.get("title", "")
+        items, msgs = _extract_items_for_article(title, art.get("content", ""))
+        log.debug("Pass 2: article done", extra=fields(article=article_index, items=len(items)))
+        return items, msgs
+
+    def extract_batch(batch: List[Tuple[int, dict]]):
+        log.debug("Pass 2: batched request", extra=fields(first=batch[0][0], last=batch[-1][0]))
+        return _extract_batch(batch, build_items_batch_prompt, call_openai_for_items, "items",
+                              _valid_items, _remove_footers_and_page_numbers, extract_one)
+
+    def split_locally(article_index: int, art: dict) -> Optional[List[dict]]:
+        items, score = split_items_by_rules(art.get("title", ""), art.get("content", ""))
+        debug.add(f"rules_article_{article_index}", score)
+        return items if score["confidence"] >= ITEMS_RULES_MIN_CONFIDENCE else None
+
+    use_rules = ITEMS_RULES_FIRST if rules_first is None else rules_first
+    if reuse is not None:
+        reuse.set_scope(
+            model=OPENAI_MODEL,
+            prompt=prompt_version(build_items_prompt),
+            rules_first=use_rules,
+            min_confidence=ITEMS_RULES_MIN_CONFIDENCE if use_rules else None,
+        )
+    results = _map_articles(
+        articles, extract_one, extract_batch, build_items_batch_prompt, items_batch_section, OPENAI_MODEL,
+        LLM_BATCH_TOKEN_BUDGET if batch_token_budget is None else batch_token_budget,
+        workers, progress, cancel_event, reuse, split_locally if use_rules else None,
+    )
 
+    for article_index, (art, (items, msgs)) in enumerate(zip(articles, results)):
         art["items"] = items
-        print(f"[UTILS] LLM Pass 2: Article {article_index}: {len(items)} items extracted")
 
-        # Save debug artifacts for this article
-        with open(os.path.join(out_dir, f"items_article_{article_index}_{ts}.json"), "w", encoding="utf-8") as f:
-            json.dump(items, f, indent=2, ensure_ascii=False)
-        with open(os.path.join(out_dir, f"messages_llm2_article_{article_index}_{ts}.json"), "w", encoding="utf-8") as f:
-            json.dump(msgs, f, indent=2, ensure_ascii=False)
+        debug.add(f"items_article_{article_index}", items)
+        if msgs is not None:
+            debug.add(f"messages_llm2_article_{article_index}", msgs)
 
-    # Save final result
-    with open(os.path.join(out_dir, f"final_pass2_{ts}.json"), "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    debug.add("final_pass2", data)
+    debug.close()
 
-    print(f"[UTILS] LLM Pass 2: Completed processing all articles")
-    return data, ts
+    log.info("Pass 2: completed", extra=fields(articles=len(articles)))
+    return data, debug.run_id
 
 
+@timed_stage("llm_pass_3")
 def run_llm_pass_3(
     json_data: dict,
     out_dir: str = "debug_outputs",
+    max_workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel_event=None,
+    batch_token_budget: Optional[int] = None,
+    reuse: Optional[ResultReuse] = None,
+    pdf_source: object = None,
+    index_pages: Optional[Tuple[int, int]] = None,
+    local_paths: Optional[bool] = None,
+    refine: Optional[bool] = None,
 ) -> Tuple[dict, str]:
-    """LLM Pass 3: Extract hierarchical path for all articles."""
-    os.makedirs(out_dir, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    """LLM Pass 3: Extract hierarchical path for all articles.
+
+    Articles are processed with up to `max_workers` requests in flight
+    (defaults to LLM_MAX_CONCURRENCY); results keep the original article order.
+    `progress` is called as each article finishes; once `cancel_event` is set
+    no further LLM calls are issued and PassCancelled is raised. With a
+    positive `batch_token_budget` (defaults to LLM_BATCH_TOKEN_BUDGET) short
+    articles share requests. Articles unchanged since the run recorded in
+    `reuse` keep their previous result. With `local_paths` (defaults to
+    PATH_LOCAL_ENGINE) and the PDF, paths come from one scan of the body for
+    hierarchy headings; only ambiguous ones go to the LLM when `refine`
+    (defaults to PATH_LLM_REFINE). A SpanDocument input comes back as one.
+    """
+    debug = start_run("llm_pass_3", out_dir)
 
-    data = json.loads(json.dumps(json_data))  # deep copy
+    data = _working_copy(json_data)
     articles = data.get("articles", [])
-    
-    print(f"[UTILS] LLM Pass 3: Processing {len(articles)} articles for path extraction")
+    workers = LLM_MAX_CONCURRENCY if max_workers is None else max_workers
 
-    for article_index, art in enumerate(articles):
-        art_title = art.get("title", "")
-        art_content = art.get("content", "") or ""
-        
-        print(f"[UTILS] LLM Pass 3: Processing article {article_index + 1}/{len(articles)}: {art_title[:50]}...")
+    log.info("Pass 3: extracting paths", extra=fields(articles=len(articles), workers=workers))
 
-        msgs = build_path_prompt(art_title, art_content)
-        result = call_openai_for_path(msgs)
-        path_list = result.get("path", []) if isinstance(result, dict) else []
-        if not isinstance(path_list, list):
-            path_list = []
+    def extract_one(article_index: int, art: dict) -> Tuple[List[str], List[dict]]:
+        art_title = art.get("title", "")
+        path_list, msgs = _extract_path_for_article(art_title, art.get("content", "") or "")
+        log.debug("Pass 3: article done", extra=fields(article=article_index, depth=len(path_list)))
+        return path_list, msgs
+
+    def extract_batch(batch: List[Tuple[int, dict]]):
+        log.debug("Pass 3: batched request", extra=fields(first=batch[0][0], last=batch[-1][0]))
+        return _extract_batch(batch, build_path_batch_prompt, call_openai_for_path, "path",
+                              _valid_path, lambda content: content, extract_one)
+
+    local = None
+    use_local = (PATH_LOCAL_ENGINE if local_paths is None else local_paths) and pdf_source is not None
+    send_ambiguous = PATH_LLM_REFINE if refine is None else refine
+    if reuse is not None:
+        reuse.set_scope(
+            model=OPENAI_MODEL1,
+            prompt=prompt_version(build_path_prompt),
+            local_paths=use_local,
+            refine=send_ambiguous if use_local else None,
+        )
+    if use_local:
+        # A SpanDocument already holds the body text
+        body_text = data.body.text if isinstance(data, SpanDocument) else extract_body_text(pdf_source, index_pages)
+        local_results = assign_paths(body_text, [(art.get("title") or "").strip() for art in articles])
+        ambiguous = [i for i, (_, unsure) in enumerate(local_results) if unsure]
+        debug.add("local_paths", {"paths": [p for p, _ in local_results], "ambiguous": ambiguous})
+        log.info("Pass 3: local path engine", extra=fields(resolved=len(articles) - len(ambiguous), ambiguous=len(ambiguous)))
+
+        def local(article_index: int, art: dict) -> Optional[List[str]]:
+            path_list, unsure = local_results[article_index]
+            return None if unsure and send_ambiguous else path_list
+
+    results = _map_articles(
+        articles, extract_one, extract_batch, build_path_batch_prompt, path_batch_section, OPENAI_MODEL1,
+        LLM_BATCH_TOKEN_BUDGET if batch_token_budget is None else batch_token_budget,
+        workers, progress, cancel_event, reuse, local,
+    )
 
+    for article_index, (art, (path_list, msgs)) in enumerate(zip(articles, results)):
         art["path"] = path_list
-        print(f"[UTILS] LLM Pass 3: Article {article_index}: path={path_list}")
-
-        # Save debug artifacts for this article
-        with open(os.path.join(out_dir, f"messages_llm3_article_{article_index}_{ts}.json"), "w", encoding="utf-8") as f:
-            json.dump(msgs, f, indent=2, ensure_ascii=False)
-        with open(os.path.join(out_dir, f"path_article_{article_index}_{ts}.json"), "w", encoding="utf-8") as f:
-            json.dump({"path": path_list}, f, indent=2, ensure_ascii=False)
-
-    # Save final result
-    with open(os.path.join(out_dir, f"final_pass3_{ts}.json"), "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
 
-    print(f"[UTILS] LLM Pass 3: Completed processing all articles")
-    return data, ts
+        if msgs is not None:
+            debug.add(f"messages_llm3_article_{article_index}", msgs)
+        debug.add(f"path_article_{article_index}", {"path": path_list})
 
+    debug.add("final_pass3", data)
+    debug.close()
 
+    log.info("Pass 3: completed", extra=fields(articles=len(articles)))
+    return data, debug.run_id
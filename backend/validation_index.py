@@ -0,0 +1,207 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from pdf_document import PdfDocument
+
+# Words per shingle; shorter fields are matched via word positions
+SHINGLE_WORDS = 5
+# Page numbers remembered per shingle / reported per field
+MAX_PAGES = 16
+# JSON keys whose values are identifiers rather than document text
+SKIP_KEYS = {"ref", "url"}
+
+# ----------------------------
+# Normalisation (mirrors normalizeText in JSONEditor.jsx)
+# ----------------------------
+
+_QUOTES = str.maketrans({"“": '"', "”": '"', "«": '"', "»": '"',
+                         "‘": "'", "’": "'", "‛": "'", "`": "'", "´": "'",
+                         "–": "-", "—": "-", "‐": "-", "‒": "-"})
+_UNSAFE_RE = re.compile(r"[^a-z0-9\"'\-\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalise_for_validation(text: str) -> str:
+    """Lower-case, unify quotes/dashes, drop other punctuation and collapse whitespace."""
+    if not text:
+        return ""
+    s = text.lower().translate(_QUOTES)
+    s = s.replace("\\n", " ")
+    s = _UNSAFE_RE.sub(" ", s)
+    return _SPACE_RE.sub(" ", s).strip()
+
+
+# ----------------------------
+# Shingle index
+# ----------------------------
+
+class ShingleIndex:
+    """Hashed k-word shingles of a document's normalised text, with page numbers.
+
+    Built once per document; each lookup is a dict probe per shingle, so a
+    field costs O(words in field) regardless of document size.
+    """
+
+    def __init__(self, pages: List[str], k: int = SHINGLE_WORDS):
+        self.k = k
+        self._vocab: Dict[str, int] = {}
+        word_ids: List[int] = []
+        word_pages: List[int] = []
+        normalised_pages: List[str] = []
+        for page_no, page in enumerate(pages, start=1):
+            norm = normalise_for_validation(page)
+            normalised_pages.append(norm)
+            for word in norm.split():
+                word_ids.append(self._vocab.setdefault(word, len(self._vocab)))
+                word_pages.append(page_no)
+        # Shingles run across page breaks; a shingle belongs to the page its first word is on
+        self._shingles: Dict[int, Tuple[int, ...]] = {}
+        for i in range(len(word_ids) - k + 1):
+            h = hash(tuple(word_ids[i:i + k]))
+            pages_for = self._shingles.get(h)
+            page_no = word_pages[i]
+            if pages_for is None:
+                self._shingles[h] = (page_no,)
+            elif page_no not in pages_for and len(pages_for) < MAX_PAGES:
+                self._shingles[h] = pages_for + (page_no,)
+        # Word positions, for phrases shorter than a shingle
+        self._word_ids = word_ids
+        self._word_pages = word_pages
+        self._positions: Dict[int, List[int]] = {}
+        for pos, wid in enumerate(word_ids):
+            self._positions.setdefault(wid, []).append(pos)
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def _phrase_pages(self, ids: List[int]) -> List[int]:
+        """Pages where the exact word sequence `ids` starts, probing from its rarest word."""
+        if -1 in ids:
+            return []
+        pivot = min(range(len(ids)), key=lambda j: len(self._positions[ids[j]]))
+        n = len(ids)
+        pages = set()
+        for pos in self._positions[ids[pivot]]:
+            start = pos - pivot
+            if start >= 0 and self._word_ids[start:start + n] == ids:
+                pages.add(self._word_pages[start])
+                if len(pages) >= MAX_PAGES:
+                    break
+        return sorted(pages)
+
+    def check(self, text: str) -> dict:
+        """Match status, coverage ratio and 1-based pages for one text value."""
+        words = normalise_for_validation(text).split()
+        if not words:
+            return {"status": "empty", "coverage": 0.0, "pages": []}
+
+        ids = [self._vocab.get(w, -1) for w in words]
+        if len(words) < self.k:
+            pages = self._phrase_pages(ids)
+            found = bool(pages)
+            return {"status": "match" if found else "missing", "coverage": 1.0 if found else 0.0, "pages": pages}
+
+        covered = [False] * len(words)
+        pages_seen: Dict[int, int] = {}
+        for i in range(len(words) - self.k + 1):
+            window = tuple(ids[i:i + self.k])
+            if -1 in window:
+                continue
+            pages_for = self._shingles.get(hash(window))
+            if pages_for is None:
+                continue
+            for j in range(i, i + self.k):
+                covered[j] = True
+            for p in pages_for:
+                pages_seen[p] = pages_seen.get(p, 0) + 1
+
+        coverage = sum(covered) / len(words)
+        if coverage == 1.0:
+            status = "match"
+        elif coverage > 0:
+            status = "partial"
+        else:
+            status = "missing"
+        # Report the pages that account for most of the matched shingles, in page order
+        pages = sorted(p for p, hits in pages_seen.items() if hits * 4 >= max(pages_seen.values()))
+        return {"status": status, "coverage": round(coverage, 4), "pages": pages}
+
+
+def iter_text_fields(obj: object, path: str = ""):
+    """Yield (path, value) for every non-empty string leaf, skipping SKIP_KEYS; paths look like 'articles[0].title'."""
+    if isinstance(obj, str):
+        if obj.strip():
+            yield path, obj
+    elif isinstance(obj, list):
+        for i, item in enumerate(obj):
+            yield from iter_text_fields(item, f"{path}[{i}]")
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in SKIP_KEYS:
+                continue
+            yield from iter_text_fields(value, f"{path}.{key}" if path else key)
+
+
+def validate_json(index: ShingleIndex, json_data: dict) -> dict:
+    """Check every text field of an articles/items JSON against the index."""
+    fields = []
+    total_words = 0
+    covered_words = 0.0
+    counts = {"match": 0, "partial": 0, "missing": 0}
+    for path, value in iter_text_fields(json_data):
+        result = index.check(value)
+        if result["status"] == "empty":
+            continue
+        counts[result["status"]] += 1
+        n = len(value.split())
+        total_words += n
+        covered_words += n * result["coverage"]
+        fields.append({"path": path, **result})
+    summary = {
+        "fields": len(fields),
+        **counts,
+        "coverage": round(covered_words / total_words, 4) if total_words else 0.0,
+    }
+    return {"summary": summary, "fields": fields}
+
+
+# ----------------------------
+# Per-document index cache
+# ----------------------------
+
+_INDEXES: "OrderedDict[str, ShingleIndex]" = OrderedDict()
+_INDEXES_LOCK = threading.Lock()
+_MAX_INDEXES = 4
+
+
+def get_validation_index(doc: PdfDocument) -> ShingleIndex:
+    """Build (once) and return the shingle index over all pages of `doc`."""
+    key = doc.sha256
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is not None:
+            _INDEXES.move_to_end(key)
+            return index
+    index = ShingleIndex(doc.pages_text(list(range(doc.num_pages))))
+    with _INDEXES_LOCK:
+        _INDEXES[key] = index
+        while len(_INDEXES) > _MAX_INDEXES:
+            _INDEXES.popitem(last=False)
+    return index
+
+
+def check_snippets(index: ShingleIndex, snippets: List[str]) -> List[dict]:
+    return [{"snippet": s, **index.check(s)} for s in snippets]
+
+
+def validation_report(doc: PdfDocument, json_data: Optional[dict], snippets: Optional[List[str]]) -> dict:
+    """Validate a JSON document and/or a batch of snippets against `doc`."""
+    index = get_validation_index(doc)
+    report: dict = {}
+    if json_data:
+        report.update(validate_json(index, json_data))
+    if snippets:
+        report["snippets"] = check_snippets(index, snippets)
+    return report
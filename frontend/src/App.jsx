@@ -7,6 +7,7 @@ import './App.css';
 function App() {
   const [jsonData, setJsonData] = useState(null);
   const [pdfFile, setPdfFile] = useState(null);
+  const [documentId, setDocumentId] = useState(null);
   const [pageStart, setPageStart] = useState('');
   const [pageEnd, setPageEnd] = useState('');
   const [loading, setLoading] = useState(false);
@@ -28,6 +29,46 @@ function App() {
     console.log('🔗 === END PDF TEXT RECEIVED ===\n');
   };
 
+  // Passes whose per-article results are streamed into the editor as they finish
+  const STREAMED_PASSES = { 'llm-pass-2': 'items', 'llm-pass-3': 'path' };
+
+  const streamPass = async (endpoint, payload, field) => {
+    const res = await fetch(`/api/${endpoint}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...payload, stream: 'ndjson' }),
+    });
+    if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let summary = null;
+    const handleEvent = (event) => {
+      if (event.event === 'article') {
+        setJsonData((prev) => {
+          if (!prev || !Array.isArray(prev.articles) || !prev.articles[event.index]) return prev;
+          const articles = prev.articles.slice();
+          articles[event.index] = { ...articles[event.index], [field]: event[field] };
+          return { ...prev, articles };
+        });
+      } else if (event.event === 'summary') {
+        summary = event;
+      }
+    };
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+    }
+    if (buffer.trim()) handleEvent(JSON.parse(buffer));
+    if (!summary) throw new Error('Stream ended without a summary');
+    return { data: summary };
+  };
+
   const handleApiCall = async (endpoint, includeJsonData = false) => {
     setLoading(true);
     setActiveButton(endpoint);
@@ -41,16 +82,20 @@ function App() {
         form.append('pdf', pdfFile);
         form.append('index_page_start', pageStart);
         form.append('index_page_end', pageEnd);
+        if (documentId) form.append('document_id', documentId);
         response = await axios.post(`/api/${endpoint}`, form, { headers: { 'Content-Type': 'multipart/form-data' } });
       } else {
         // For Splitter and later passes, TOC range is not needed by backend
-        const payload = {};
+        const payload = { document_id: documentId };
         if (includeJsonData && jsonData) payload.json_data = jsonData;
-        response = await axios.post(`/api/${endpoint}`, payload);
+        response = STREAMED_PASSES[endpoint]
+          ? await streamPass(endpoint, payload, STREAMED_PASSES[endpoint])
+          : await axios.post(`/api/${endpoint}`, payload);
       }
       
       if (response.data.status === 'success') {
         setJsonData(response.data.data);
+        if (response.data.document_id) setDocumentId(response.data.document_id);
         if (endpoint === 'llm-pass-1') {
           setLlm1Done(true);
           setSplitter1Done(false);
@@ -84,6 +129,7 @@ function App() {
     const file = e.target.files && e.target.files[0];
     if (!file) return;
     setPdfFile(file);
+    setDocumentId(null);
     setJsonData(null);
     setLlm1Done(false);
     setSplitter1Done(false);